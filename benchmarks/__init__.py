@@ -0,0 +1,7 @@
+"""
+Benchmarks de la API.
+
+Se ejecutan desde la raíz del repositorio, por ejemplo:
+
+    python -m benchmarks.bench_partidos
+"""
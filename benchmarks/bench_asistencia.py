@@ -0,0 +1,120 @@
+"""
+Mide el throughput de POST /api/asistencia en tres variantes:
+
+- "anterior": SELECT sin índice + INSERT + COMMIT por cada asistencia (la
+  implementación original, reproducida en una ruta del benchmark);
+- "sincrono": ventana en memoria y un INSERT por petición
+  (`ATTENDANCE_FLUSH_INTERVAL=0`);
+- "buffer": escritura en lotes.
+
+Los nombres nuevos siempre se comprueban contra la autoridad compartida:
+Redis si `ATTENDANCE_REDIS_URL` responde, si no la base de datos (la columna
+"autoridad" del resultado indica cuál se usó).
+
+    python -m benchmarks.bench_asistencia --historial 50000 --registros 2000 --concurrencia 8
+"""
+import argparse
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from benchmarks.common import crear_app, ContadorConsultas
+
+INDICE = "ix_asistencia_nombre_fecha_hora"
+
+
+def registrar_asistencia_anterior():
+    """Copia de la implementación original de POST /api/asistencia."""
+    from flask import request, jsonify
+    from api.models import db, Asistencia
+
+    nombre = request.get_json().get("nombre", "").strip()
+    hace_un_minuto = datetime.utcnow() - timedelta(minutes=1)
+    repetido = Asistencia.query.filter_by(nombre=nombre).filter(Asistencia.fecha_hora >= hace_un_minuto).first()
+    if repetido:
+        return jsonify({"message": "Ya registraste asistencia recientemente"}), 429
+    db.session.add(Asistencia(nombre=nombre, ip=request.remote_addr))
+    db.session.commit()
+    return jsonify({"message": "Asistencia registrada correctamente"}), 201
+
+
+def rafaga(app, url, nombres, concurrencia):
+    def enviar(nombre):
+        respuesta = app.test_client().post(url, json={"nombre": nombre})
+        return respuesta.status_code
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        codigos = list(executor.map(enviar, nombres))
+    return time.perf_counter() - inicio, codigos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--historial", type=int, default=50000, help="asistencias antiguas en la tabla")
+    parser.add_argument("--registros", type=int, default=2000)
+    parser.add_argument("--duplicados", type=float, default=0.2, help="fracción de nombres repetidos")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    app = crear_app(args.database_url)
+    app.add_url_rule("/bench/asistencia-anterior", view_func=registrar_asistencia_anterior, methods=["POST"])
+    from extensions import limiter
+    from api.models import db, Asistencia
+    from api.attendance import attendance_buffer
+
+    limiter.enabled = False
+    rnd = random.Random(1)
+
+    with app.app_context():
+        antiguo = datetime.utcnow() - timedelta(days=7)
+        db.session.bulk_insert_mappings(Asistencia, [
+            {"nombre": f"historial_{i}", "ip": "127.0.0.1", "fecha_hora": antiguo} for i in range(args.historial)
+        ])
+        db.session.commit()
+        contador = ContadorConsultas(db.engine)
+
+    resultados = []
+    for variante in ("anterior", "sincrono", "buffer"):
+        unicos = [f"{variante}-{i}" for i in range(int(args.registros * (1 - args.duplicados)))]
+        nombres = unicos + rnd.choices(unicos, k=args.registros - len(unicos))
+        rnd.shuffle(nombres)
+
+        with app.app_context():
+            if variante == "anterior":
+                db.session.execute(db.text(f"DROP INDEX IF EXISTS {INDICE}"))
+            else:
+                db.session.execute(db.text(f"CREATE INDEX IF NOT EXISTS {INDICE} ON asistencia (nombre, fecha_hora)"))
+            db.session.commit()
+
+        app.config["ATTENDANCE_FLUSH_INTERVAL"] = 0 if variante == "sincrono" else 0.5
+        attendance_buffer.init_app(app)
+        url = "/bench/asistencia-anterior" if variante == "anterior" else "/api/asistencia"
+
+        with contador.medir() as medicion:
+            segundos, codigos = rafaga(app, url, nombres, args.concurrencia)
+            with app.app_context():
+                attendance_buffer.flush()
+
+        with app.app_context():
+            guardadas = Asistencia.query.filter(Asistencia.nombre.like(f"{variante}-%")).count()
+        resultados.append({
+            "variante": variante,
+            "autoridad": "redis" if attendance_buffer.redis is not None and variante != "anterior" else "base",
+            "peticiones": len(nombres),
+            "aceptadas": codigos.count(201),
+            "rechazadas": codigos.count(429),
+            "guardadas": guardadas,
+            "segundos": round(segundos, 3),
+            "peticiones_por_segundo": round(len(nombres) / segundos, 1),
+            "consultas": medicion["consultas"],
+        })
+
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
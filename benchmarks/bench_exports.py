@@ -0,0 +1,78 @@
+"""
+Mide el pico de memoria (tracemalloc) y el tiempo hasta el primer byte de
+GET /api/asistencia frente a GET /api/asistencia/export con tablas de
+distinto tamaño. El pico del export debe mantenerse constante.
+
+    python -m benchmarks.bench_exports --filas 10000 50000 200000
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.common import crear_app
+
+
+def medir(cliente, url):
+    """Consume la respuesta bloque a bloque y devuelve (primer_byte_s, total_s, pico_mb, bytes)."""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    respuesta = cliente.get(url, buffered=False)
+    primer_byte = None
+    total_bytes = 0
+    for bloque in respuesta.response:
+        if primer_byte is None:
+            primer_byte = time.perf_counter() - inicio
+        total_bytes += len(bloque)
+    respuesta.close()
+    total = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "primer_byte_ms": round((primer_byte or total) * 1000, 1),
+        "segundos": round(total, 3),
+        "pico_mb": round(pico / 1024 / 1024, 2),
+        "bytes": total_bytes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filas", type=int, nargs="+", default=[10000, 50000, 200000])
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    app = crear_app(args.database_url)
+    from api.models import db, Asistencia
+    from api.cache import response_cache
+
+    app.config["RESPONSE_CACHE_MAX_ENTRIES"] = 0
+    response_cache.init_app(app)
+    cliente = app.test_client()
+
+    resultados = []
+    existentes = 0
+    for filas in sorted(args.filas):
+        with app.app_context():
+            ahora = datetime.utcnow()
+            for inicio in range(existentes, filas, 10000):
+                db.session.bulk_insert_mappings(Asistencia, [
+                    {"nombre": f"bench_{i}", "ip": "127.0.0.1", "fecha_hora": ahora}
+                    for i in range(inicio, min(filas, inicio + 10000))
+                ])
+                db.session.commit()
+        existentes = filas
+
+        resultados.append({
+            "filas": filas,
+            "lista_json": medir(cliente, "/api/asistencia"),
+            "export_ndjson": medir(cliente, "/api/asistencia/export"),
+            "export_csv": medir(cliente, "/api/asistencia/export?format=csv"),
+        })
+
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Mide POST /api/torneos/<id>/fixture para cada formato y varios tamaños de
+torneo: tiempo total de la petición (cálculo de cruces + INSERT por lotes en
+una transacción) y partidos generados.
+
+    python -m benchmarks.bench_fixture --equipos 16 64 128 256
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import crear_app
+
+FORMATOS = ("liga", "eliminacion", "grupos_playoffs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--equipos", type=int, nargs="+", default=[16, 64, 128, 256])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    app = crear_app(args.database_url)
+    from flask_jwt_extended import create_access_token
+    from api.models import db, Jugador, Torneo, Equipo
+
+    with app.app_context():
+        admin = Jugador(nickhabbo="bench_fixture_admin", role="admin", is_active=True)
+        db.session.add(admin)
+        db.session.commit()
+        cabeceras = {"Authorization": "Bearer " + create_access_token(identity=str(admin.id))}
+
+        torneos = {}
+        for formato in FORMATOS:
+            for cantidad in args.equipos:
+                torneo = Torneo(nombre=f"Bench fixture {formato} {cantidad}", modalidad="HFA", formato=formato)
+                db.session.add(torneo)
+                db.session.flush()
+                db.session.bulk_insert_mappings(Equipo, [
+                    {"nombre": f"Bench {formato} {cantidad}-{i}", "torneo_id": torneo.id} for i in range(cantidad)
+                ])
+                torneos[(formato, cantidad)] = torneo.id
+        db.session.commit()
+
+    cliente = app.test_client()
+    resultados = []
+    for (formato, cantidad), torneo_id in torneos.items():
+        tiempos = []
+        for _ in range(args.repeticiones):
+            inicio = time.perf_counter()
+            respuesta = cliente.post(f"/api/torneos/{torneo_id}/fixture", json={"reemplazar": True}, headers=cabeceras)
+            tiempos.append(time.perf_counter() - inicio)
+            assert respuesta.status_code == 201, respuesta.get_data(as_text=True)
+        resumen = respuesta.get_json()
+        resultados.append({
+            "formato": formato,
+            "equipos": cantidad,
+            "partidos": resumen["partidos"],
+            "jornadas": resumen["jornadas"],
+            "ms_min": round(min(tiempos) * 1000, 1),
+            "ms_max": round(max(tiempos) * 1000, 1),
+        })
+
+    print(json.dumps({"base_de_datos": app.config["SQLALCHEMY_DATABASE_URI"].split(":", 1)[0],
+                      "resultados": resultados}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
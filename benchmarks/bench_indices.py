@@ -0,0 +1,146 @@
+"""
+Planes de consulta y tiempos de los caminos más usados, sin y con los índices
+secundarios declarados en los modelos.
+
+Siembra un volumen parecido al de producción, borra los índices `ix_*`,
+mide, los vuelve a crear y mide otra vez. Para cada consulta muestra el plan
+(`EXPLAIN QUERY PLAN` en SQLite, `EXPLAIN` en PostgreSQL) y el tiempo mínimo;
+además mide los endpoints afectados.
+
+    python -m benchmarks.bench_indices --torneos 20 --partidos 20000 --asistencias 200000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import crear_app
+
+
+def consultas(db, modelos):
+    """Consultas representativas de los endpoints, con valores fijos."""
+    from sqlalchemy import select, or_
+    Torneo, Equipo, Jugador, JugadorEquipo, Partido, EstadisticaJugador, Asistencia, Convocatoria, Oferta, Noticia = modelos
+    hace_un_minuto = datetime.utcnow() - timedelta(minutes=1)
+    return {
+        "jugador_en_modalidad": select(JugadorEquipo.__table__).where(
+            JugadorEquipo.jugador_id == 50, JugadorEquipo.modalidad == "HFA"
+        ),
+        "jugadores_de_equipo": select(JugadorEquipo.__table__).where(JugadorEquipo.equipo_id == 10),
+        "equipos_de_torneo": select(Equipo.__table__).where(Equipo.torneo_id == 3),
+        "partidos_de_torneo": select(Partido.id).where(Partido.torneo_id == 3),
+        "partidos_de_equipo": select(Partido.id).where(or_(Partido.equipo_a_id == 10, Partido.equipo_b_id == 10)),
+        "partidos_como_mvp": select(Partido.id).where(Partido.mvp_id == 50),
+        "partidos_recientes": select(Partido.id).order_by(Partido.fecha.desc(), Partido.id.desc()).limit(50),
+        "estadisticas_de_partidos": select(EstadisticaJugador.__table__).where(EstadisticaJugador.partido_id.in_(range(100, 150))),
+        "estadisticas_de_jugador": select(EstadisticaJugador.__table__).where(EstadisticaJugador.jugador_id == 50),
+        "convocatoria_existente": select(Convocatoria.id).where(Convocatoria.jugador_id == 50, Convocatoria.modalidad == "HFA"),
+        "ofertas_de_jugador": select(Oferta.id).where(Oferta.jugador_id == 50),
+        "asistencia_repetida": select(Asistencia.id).where(Asistencia.nombre == "s1_jugador_50", Asistencia.fecha_hora >= hace_un_minuto),
+        "noticias_recientes": select(Noticia.id).order_by(Noticia.fecha_publicacion.desc(), Noticia.id.desc()).limit(50),
+    }
+
+
+ENDPOINTS = [
+    "/api/partidos?limit=50",
+    "/api/partidos/export?torneo_id=3",
+    "/api/estadisticas/export?torneo_id=3",
+    "/api/equipos/torneo/3",
+    "/api/equipos/10/jugadores",
+    "/api/noticias?limit=50",
+]
+
+
+def plan(db, consulta):
+    engine = db.engine
+    sql = str(consulta.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    prefijo = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    return [" ".join(str(c) for c in fila) for fila in db.session.execute(db.text(prefijo + sql))]
+
+
+def cronometrar(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return round(min(tiempos) * 1000, 3)
+
+
+def medir(app, db, modelos, repeticiones):
+    cliente = app.test_client()
+    resultado = {"consultas": {}, "endpoints": {}}
+    with app.app_context():
+        for nombre, consulta in consultas(db, modelos).items():
+            resultado["consultas"][nombre] = {
+                "plan": plan(db, consulta),
+                "ms": cronometrar(lambda: db.session.execute(consulta).all(), repeticiones),
+            }
+    for url in ENDPOINTS:
+        resultado["endpoints"][url] = cronometrar(lambda: cliente.get(url).get_data(), repeticiones)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--torneos", type=int, default=20)
+    parser.add_argument("--equipos-por-torneo", type=int, default=16)
+    parser.add_argument("--jugadores-por-equipo", type=int, default=8)
+    parser.add_argument("--partidos", type=int, default=20000)
+    parser.add_argument("--asistencias", type=int, default=200000)
+    parser.add_argument("--noticias", type=int, default=2000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    app = crear_app(args.database_url)
+    from api.models import (db, Torneo, Equipo, Jugador, JugadorEquipo, Partido, EstadisticaJugador,
+                            Asistencia, Convocatoria, Oferta, Noticia)
+    from api.cache import response_cache
+    modelos = (Torneo, Equipo, Jugador, JugadorEquipo, Partido, EstadisticaJugador, Asistencia, Convocatoria, Oferta, Noticia)
+
+    app.config["RESPONSE_CACHE_MAX_ENTRIES"] = 0
+    response_cache.init_app(app)
+
+    from api.seed import generar_liga
+
+    with app.app_context():
+        generar_liga(torneos=args.torneos, equipos_por_torneo=args.equipos_por_torneo,
+                     jugadores_por_equipo=args.jugadores_por_equipo, partidos=args.partidos,
+                     asistencias=args.asistencias, noticias=args.noticias, reconstruir=False)
+        indices = [indice for tabla in db.metadata.sorted_tables for indice in tabla.indexes
+                   if indice.name and indice.name.startswith("ix_")]
+
+        for indice in indices:
+            indice.drop(db.engine, checkfirst=True)
+        db.session.execute(db.text("ANALYZE"))
+        db.session.commit()
+    sin_indices = medir(app, db, modelos, args.repeticiones)
+
+    with app.app_context():
+        for indice in indices:
+            indice.create(db.engine, checkfirst=True)
+        db.session.execute(db.text("ANALYZE"))
+        db.session.commit()
+    con_indices = medir(app, db, modelos, args.repeticiones)
+
+    print(json.dumps({
+        "indices": [indice.name for indice in indices],
+        "consultas": {
+            nombre: {
+                "ms_sin_indices": sin_indices["consultas"][nombre]["ms"],
+                "ms_con_indices": con_indices["consultas"][nombre]["ms"],
+                "plan_sin_indices": sin_indices["consultas"][nombre]["plan"],
+                "plan_con_indices": con_indices["consultas"][nombre]["plan"],
+            }
+            for nombre in sin_indices["consultas"]
+        },
+        "endpoints_ms": {
+            url: {"sin_indices": sin_indices["endpoints"][url], "con_indices": con_indices["endpoints"][url]}
+            for url in ENDPOINTS
+        },
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
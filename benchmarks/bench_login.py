@@ -0,0 +1,111 @@
+"""
+Mide la latencia (p50/p95) y el throughput de POST /api/login con varios
+clientes simultáneos, verificando las contraseñas dentro de la petición
+(`PASSWORD_POOL_WORKERS=0`) frente al pool de procesos. También mide un GET
+liviano lanzado durante la ráfaga de logins para ver cuánto lo retrasan.
+
+    python -m benchmarks.bench_login --usuarios 20 --concurrencia 8 --workers 0 2 4
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import crear_app, percentil
+
+
+def resumen(latencias):
+    return {
+        "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 2),
+    }
+
+
+def rafaga(app, credenciales, concurrencia, rondas):
+    """Lanza `rondas` logins por usuario repartidos en `concurrencia` hilos y mide /api/torneos en paralelo."""
+    logins = []
+    livianas = []
+    lock = threading.Lock()
+    terminado = threading.Event()
+
+    def hacer_login(credencial):
+        cliente = app.test_client()
+        inicio = time.perf_counter()
+        respuesta = cliente.post("/api/login", json=credencial)
+        duracion = time.perf_counter() - inicio
+        assert respuesta.status_code == 200, respuesta.get_data(as_text=True)
+        with lock:
+            logins.append(duracion)
+
+    def sondear():
+        cliente = app.test_client()
+        while not terminado.is_set():
+            inicio = time.perf_counter()
+            cliente.get("/api/torneos")
+            livianas.append(time.perf_counter() - inicio)
+            time.sleep(0.005)
+
+    sonda = threading.Thread(target=sondear)
+    sonda.start()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        list(executor.map(hacer_login, credenciales * rondas))
+    total = time.perf_counter() - inicio
+    terminado.set()
+    sonda.join()
+
+    return {
+        "logins": len(logins),
+        "segundos": round(total, 3),
+        "logins_por_segundo": round(len(logins) / total, 1),
+        "login": resumen(logins),
+        "get_torneos_durante_rafaga": resumen(livianas) if livianas else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--usuarios", type=int, default=20)
+    parser.add_argument("--rondas", type=int, default=2)
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4])
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    app = crear_app(args.database_url)
+    from api.models import db, Jugador
+    from api.passwords import password_hasher
+    from api.cache import response_cache
+
+    app.config["RESPONSE_CACHE_MAX_ENTRIES"] = 0  # Que el GET de control llegue a la base de datos
+    response_cache.init_app(app)
+
+    credenciales = []
+    with app.app_context():
+        for i in range(args.usuarios):
+            password = f"bench-password-{i}"
+            salt = b64encode(os.urandom(32)).decode("utf-8")
+            email = f"bench_login_{i}@habbofutbol.local"
+            db.session.add(Jugador(
+                nickhabbo=f"bench_login_{i}", email=email, salt=salt,
+                password=password_hasher.hash(f"{password}{salt}"),
+            ))
+            credenciales.append({"email": email, "password": password})
+        db.session.commit()
+
+    resultados = []
+    for workers in args.workers:
+        app.config["PASSWORD_POOL_WORKERS"] = workers
+        password_hasher.init_app(app)
+        resultado = rafaga(app, credenciales, args.concurrencia, args.rondas)
+        resultados.append({"workers": workers, "concurrencia": args.concurrencia, **resultado})
+    password_hasher.shutdown()
+
+    print(json.dumps({"metodo": app.config["PASSWORD_HASH_METHOD"], "resultados": resultados}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Mide GET /api/partidos con un número creciente de partidos.
+
+El número de consultas debe mantenerse constante aunque crezcan los partidos
+y las estadísticas.
+
+    python -m benchmarks.bench_partidos --partidos 100 500 2000
+"""
+import argparse
+import json
+import random
+
+from benchmarks.common import crear_app, ContadorConsultas
+
+
+def sembrar(db, modelos, partidos, jugadores_por_equipo=5, equipos=8, semilla=1):
+    """Inserta un torneo con `equipos` equipos y agrega partidos hasta llegar a `partidos`."""
+    Torneo, Equipo, Jugador, JugadorEquipo, Partido, EstadisticaJugador = modelos
+    rnd = random.Random(semilla)
+
+    torneo = Torneo.query.filter_by(nombre="Bench").first()
+    if torneo is None:
+        torneo = Torneo(nombre="Bench", modalidad="HFA", formato="liga")
+        db.session.add(torneo)
+        db.session.flush()
+        for e in range(equipos):
+            equipo = Equipo(nombre=f"Bench {e}", torneo_id=torneo.id)
+            db.session.add(equipo)
+            db.session.flush()
+            for j in range(jugadores_por_equipo):
+                jugador = Jugador(nickhabbo=f"bench_{e}_{j}")
+                db.session.add(jugador)
+                db.session.flush()
+                db.session.add(JugadorEquipo(jugador_id=jugador.id, equipo_id=equipo.id, modalidad="HFA"))
+        db.session.commit()
+
+    plantillas = {}
+    for je in JugadorEquipo.query.all():
+        plantillas.setdefault(je.equipo_id, []).append(je.jugador_id)
+    equipo_ids = sorted(plantillas)
+
+    for _ in range(partidos - Partido.query.count()):
+        a, b = rnd.sample(equipo_ids, 2)
+        partido = Partido(
+            torneo_id=torneo.id, equipo_a_id=a, equipo_b_id=b, juez="bench",
+            goles_equipo_a=rnd.randint(0, 5), goles_equipo_b=rnd.randint(0, 5),
+            mvp_id=plantillas[a][0], mencion_equipo_a_id=plantillas[a][1], mencion_equipo_b_id=plantillas[b][1]
+        )
+        db.session.add(partido)
+        db.session.flush()
+        for jugador_id in plantillas[a] + plantillas[b]:
+            db.session.add(EstadisticaJugador(
+                partido_id=partido.id, jugador_id=jugador_id,
+                goles=rnd.randint(0, 2), asistencias=rnd.randint(0, 2)
+            ))
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--partidos", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    app = crear_app()
+    from api.models import db, Torneo, Equipo, Jugador, JugadorEquipo, Partido, EstadisticaJugador
+    modelos = (Torneo, Equipo, Jugador, JugadorEquipo, Partido, EstadisticaJugador)
+
+    resultados = []
+    with app.app_context():
+        contador = ContadorConsultas(db.engine)
+        cliente = app.test_client()
+        for total in sorted(args.partidos):
+            sembrar(db, modelos, total)
+            mediciones = []
+            for _ in range(args.repeticiones):
+                with contador.medir() as medicion:
+                    respuesta = cliente.get("/api/partidos")
+                assert respuesta.status_code == 200, respuesta.get_data(as_text=True)
+                mediciones.append(medicion)
+            resultados.append({
+                "partidos": total,
+                "consultas": mediciones[-1]["consultas"],
+                "segundos_min": round(min(m["segundos"] for m in mediciones), 4)
+            })
+
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
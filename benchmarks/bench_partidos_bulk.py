@@ -0,0 +1,89 @@
+"""
+Compara registrar una jornada con N llamadas a POST /api/partidos frente a una
+sola llamada a POST /api/partidos/bulk.
+
+    python -m benchmarks.bench_partidos_bulk --partidos 50 200
+"""
+import argparse
+import json
+import random
+
+from benchmarks.common import crear_app, ContadorConsultas
+from benchmarks.bench_partidos import sembrar
+
+
+def jornada(plantillas, torneo_id, total, rnd):
+    equipo_ids = sorted(plantillas)
+    partidos = []
+    for _ in range(total):
+        a, b = rnd.sample(equipo_ids, 2)
+        partidos.append({
+            "torneo_id": torneo_id, "equipo_a_id": a, "equipo_b_id": b, "juez": "bench",
+            "goles_equipo_a": rnd.randint(0, 5), "goles_equipo_b": rnd.randint(0, 5),
+            "mvp_id": plantillas[a][0], "mencion_equipo_a_id": plantillas[a][1], "mencion_equipo_b_id": plantillas[b][1],
+            "estadisticas": [
+                {"jugador_id": jugador_id, "goles": rnd.randint(0, 2), "asistencias": rnd.randint(0, 2)}
+                for jugador_id in plantillas[a] + plantillas[b]
+            ]
+        })
+    return partidos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--partidos", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    app = crear_app(args.database_url)
+    from flask_jwt_extended import create_access_token
+    from api.models import db, Torneo, Equipo, Jugador, JugadorEquipo, Partido, EstadisticaJugador
+
+    resultados = []
+    with app.app_context():
+        sembrar(db, (Torneo, Equipo, Jugador, JugadorEquipo, Partido, EstadisticaJugador), 0)
+        arbitro = Jugador(nickhabbo="bench_arbitro", role="arbitro")
+        db.session.add(arbitro)
+        db.session.commit()
+        headers = {"Authorization": "Bearer " + create_access_token(identity=str(arbitro.id))}
+
+        torneo_id = Torneo.query.filter_by(nombre="Bench").one().id
+        plantillas = {}
+        for je in JugadorEquipo.query.all():
+            plantillas.setdefault(je.equipo_id, []).append(je.jugador_id)
+
+        contador = ContadorConsultas(db.engine)
+        cliente = app.test_client()
+        rnd = random.Random(1)
+
+        for total in args.partidos:
+            partidos = jornada(plantillas, torneo_id, total, rnd)
+
+            with contador.medir() as individual:
+                for partido in partidos:
+                    respuesta = cliente.post("/api/partidos", json=partido, headers=headers)
+                    assert respuesta.status_code == 201, respuesta.get_data(as_text=True)
+
+            with contador.medir() as bulk:
+                respuesta = cliente.post("/api/partidos/bulk", json=partidos, headers=headers)
+                assert respuesta.status_code == 201, respuesta.get_data(as_text=True)
+
+            resultados.append({
+                "partidos": total,
+                "individual": {
+                    "segundos": round(individual["segundos"], 4),
+                    "consultas": individual["consultas"],
+                    "partidos_por_segundo": round(total / individual["segundos"], 1)
+                },
+                "bulk": {
+                    "segundos": round(bulk["segundos"], 4),
+                    "consultas": bulk["consultas"],
+                    "partidos_por_segundo": round(total / bulk["segundos"], 1)
+                }
+            })
+
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
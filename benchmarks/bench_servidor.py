@@ -0,0 +1,255 @@
+"""
+Workers `sync` contra `gthread` (`gunicorn.conf.py`) con tráfico mixto de
+lecturas y subidas de imágenes.
+
+Arranca un gunicorn local por perfil con la misma base sembrada y lanza
+`--clientes` clientes concurrentes: la mayoría lee (partidos, posiciones,
+noticias) y una parte (`--proporcion-subidas`) crea noticias con imagen. La
+subida a Cloudinary se simula con el backend local más una espera de
+`--latencia-subida` segundos y, como en producción, es un trabajo del pool de
+subidas (`--upload-workers`, `--upload-cola`): el POST responde con la imagen
+"pendiente" y el cliente consulta `/noticias/<id>/imagen` cada
+`--intervalo-consulta` segundos hasta que queda "lista", como hace el frontend.
+
+Informa por perfil throughput, p50/p95 de lecturas, de los POST de subida y
+del tiempo hasta la imagen lista, las subidas rechazadas por cola llena (503)
+y los errores.
+
+    python -m benchmarks.bench_servidor --workers 2 --threads 8 --clientes 16 --peticiones 400
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import crear_app, percentil, SRC_DIR
+from benchmarks.suite import puerto_libre
+
+RAIZ = os.path.dirname(SRC_DIR)
+LECTURAS = ["/api/partidos?limit=50", "/api/tablas/posiciones/{torneo_id}", "/api/noticias?limit=20"]
+IMAGEN = b"\x89PNG\r\n\x1a\n" + b"\x00" * 20000
+
+
+def crear_aplicacion():
+    """Punto de entrada de los workers: la app con la subida lenta simulada (en el pool de subidas)."""
+    app = crear_app(os.environ["DATABASE_URL"])
+    from api.uploads import upload_pool, LocalUploader
+
+    latencia = float(os.environ["BENCH_LATENCIA_SUBIDA"])
+
+    class UploaderLento(LocalUploader):
+        def upload(self, contenido, nombre):
+            time.sleep(latencia)  # Ida y vuelta a Cloudinary
+            return super().upload(contenido, nombre)
+
+    upload_pool.uploader = UploaderLento(tempfile.mkdtemp(prefix="habbofutbol-bench-uploads-"), "/uploads")
+    return app
+
+
+def iniciar(perfil, args, entorno):
+    """Arranca gunicorn con `gunicorn.conf.py` y el perfil indicado; espera a que responda."""
+    puerto = puerto_libre()
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "benchmarks.bench_servidor:crear_aplicacion()",
+         "--config", os.path.join(RAIZ, "gunicorn.conf.py"), "--chdir", RAIZ,
+         "-b", f"127.0.0.1:{puerto}", "--log-level", "warning"],
+        env={**os.environ, **entorno, "GUNICORN_WORKER_CLASS": perfil,
+             "WEB_CONCURRENCY": str(args.workers), "GUNICORN_THREADS": str(args.threads)}
+    )
+    base_url = f"http://127.0.0.1:{puerto}"
+    limite = time.monotonic() + 60
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f"gunicorn ({perfil}) terminó antes de arrancar")
+        try:
+            urllib.request.urlopen(base_url + "/api/torneos", timeout=5).read()
+            return proceso, base_url
+        except OSError:
+            time.sleep(0.2)
+    proceso.terminate()
+    raise RuntimeError(f"gunicorn ({perfil}) no respondió en 60 segundos")
+
+
+def _multipart(campos, archivo):
+    limite = uuid.uuid4().hex
+    partes = []
+    for nombre, valor in campos.items():
+        partes.append(f'--{limite}\r\nContent-Disposition: form-data; name="{nombre}"\r\n\r\n{valor}\r\n'.encode())
+    partes.append(
+        f'--{limite}\r\nContent-Disposition: form-data; name="imagen"; filename="bench.png"\r\n'
+        f"Content-Type: image/png\r\n\r\n".encode() + archivo + b"\r\n"
+    )
+    partes.append(f"--{limite}--\r\n".encode())
+    return b"".join(partes), f"multipart/form-data; boundary={limite}"
+
+
+def enviar(base_url, url, token=None, i=0):
+    """Devuelve (código, cuerpo JSON o None)."""
+    if token is None:
+        peticion = urllib.request.Request(base_url + url)
+    else:
+        cuerpo, tipo = _multipart({"titulo": f"Noticia bench {i}", "contenido": "Texto de prueba"}, IMAGEN)
+        peticion = urllib.request.Request(base_url + url, data=cuerpo, method="POST", headers={
+            "Content-Type": tipo, "Authorization": f"Bearer {token}"
+        })
+    try:
+        with urllib.request.urlopen(peticion, timeout=120) as respuesta:
+            return respuesta.status, _json(respuesta.read())
+    except urllib.error.HTTPError as e:
+        return e.code, _json(e.read())
+
+
+def _json(cuerpo):
+    try:
+        return json.loads(cuerpo)
+    except ValueError:
+        return None
+
+
+def esperar_imagen(base_url, noticia_id, intervalo, limite=120):
+    """Consulta el estado de la imagen hasta que deja de estar pendiente; devuelve el estado final."""
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        estado, cuerpo = enviar(base_url, f"/api/noticias/{noticia_id}/imagen")
+        if estado >= 400:
+            return "error"
+        if cuerpo["imagen_estado"] != "pendiente":
+            return cuerpo["imagen_estado"]
+        time.sleep(intervalo)
+    return "pendiente"
+
+
+def ejecutar(base_url, args, torneo_id, token):
+    rnd = random.Random(args.semilla)
+    plan = [
+        ("subida", "/api/noticias") if rnd.random() < args.proporcion_subidas
+        else ("lectura", rnd.choice(LECTURAS).format(torneo_id=torneo_id))
+        for _ in range(args.peticiones)
+    ]
+    latencias = {"lectura": [], "subida": [], "imagen": []}
+    errores = {"lectura": 0, "subida": 0, "imagen": 0}
+    sin_cupo = [0]
+    lock = threading.Lock()
+
+    def una(i):
+        tipo, url = plan[i]
+        inicio = time.perf_counter()
+        estado, cuerpo = enviar(base_url, url, token if tipo == "subida" else None, i)
+        duracion = time.perf_counter() - inicio
+        with lock:
+            latencias[tipo].append(duracion)
+            if estado == 503 and tipo == "subida":
+                sin_cupo[0] += 1  # Cola de subidas llena: la noticia se crea con la imagen en error
+            elif estado >= 400:
+                errores[tipo] += 1
+        if tipo != "subida" or estado != 201:
+            return
+
+        final = esperar_imagen(base_url, cuerpo["id"], args.intervalo_consulta)
+        duracion = time.perf_counter() - inicio
+        with lock:
+            latencias["imagen"].append(duracion)
+            if final != "listo":
+                errores["imagen"] += 1
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clientes) as executor:
+        list(executor.map(una, range(len(plan))))
+    total = time.perf_counter() - inicio
+
+    def resumen(tipo):
+        valores = latencias[tipo]
+        return {
+            "peticiones": len(valores),
+            "errores": errores[tipo],
+            "p50_ms": round(percentil(valores, 50) * 1000, 2) if valores else None,
+            "p95_ms": round(percentil(valores, 95) * 1000, 2) if valores else None,
+        }
+
+    return {
+        "segundos": round(total, 2),
+        "peticiones_por_segundo": round(len(plan) / total, 1),
+        "lecturas": resumen("lectura"),
+        "subidas": {**resumen("subida"), "sin_cupo": sin_cupo[0]},
+        "imagen_lista": resumen("imagen"),
+    }
+
+
+def sembrar(app, args):
+    """Liga de prueba y un token para crear noticias; devuelve (torneo_id, token)."""
+    from flask_jwt_extended import create_access_token
+    from api.models import Torneo, Jugador
+    from api.seed import generar_liga
+
+    with app.app_context():
+        if Torneo.query.first() is None:
+            generar_liga(torneos=2, equipos_por_torneo=12, jugadores_por_equipo=6,
+                         partidos=args.partidos, noticias=50, semilla=args.semilla)
+        admin = Jugador.query.filter(Jugador.role.in_(["admin", "superadmin"])).first() or Jugador.query.first()
+        token = create_access_token(identity=str(admin.id), additional_claims={"role": admin.role})
+        return Torneo.query.order_by(Torneo.id).first().id, token
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--perfiles", nargs="+", choices=["sync", "gthread"], default=["sync", "gthread"])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8, help="hilos por worker en gthread")
+    parser.add_argument("--clientes", type=int, default=16)
+    parser.add_argument("--peticiones", type=int, default=400)
+    parser.add_argument("--proporcion-subidas", type=float, default=0.2)
+    parser.add_argument("--latencia-subida", type=float, default=0.3, help="segundos de la subida simulada")
+    parser.add_argument("--upload-workers", type=int, default=2, help="hilos del pool de subidas por worker")
+    parser.add_argument("--upload-cola", type=int, default=20, help="subidas en espera por worker")
+    parser.add_argument("--intervalo-consulta", type=float, default=0.25,
+                        help="segundos entre consultas del estado de la imagen")
+    parser.add_argument("--partidos", type=int, default=2000)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    entorno = {
+        "RATELIMIT_ENABLED": "false",
+        "UPLOAD_BACKEND": "local",
+        "UPLOAD_WORKERS": str(args.upload_workers),
+        "UPLOAD_QUEUE_SIZE": str(args.upload_cola),
+        "BENCH_LATENCIA_SUBIDA": str(args.latencia_subida),
+    }
+    os.environ.update(entorno)
+    app = crear_app(args.database_url)
+    entorno["DATABASE_URL"] = os.environ["DATABASE_URL"]
+    entorno["JWT_SECRET_KEY"] = os.environ["JWT_SECRET_KEY"]
+    torneo_id, token = sembrar(app, args)
+
+    resultados = {}
+    for perfil in args.perfiles:
+        proceso, base_url = iniciar(perfil, args, entorno)
+        try:
+            resultados[perfil] = ejecutar(base_url, args, torneo_id, token)
+        finally:
+            proceso.terminate()
+            proceso.wait()
+
+    print(json.dumps({
+        "base_de_datos": app.config["SQLALCHEMY_DATABASE_URI"].split(":", 1)[0],
+        "workers": args.workers,
+        "threads": args.threads,
+        "clientes": args.clientes,
+        "proporcion_subidas": args.proporcion_subidas,
+        "latencia_subida_s": args.latencia_subida,
+        "upload_workers": args.upload_workers,
+        "resultados": resultados,
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Utilidades compartidas por los benchmarks: arranque de la app contra una base
+de datos desechable y conteo de consultas SQL.
+"""
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def crear_app(database_url=None):
+    """
+    Importa la app de Flask apuntando a `database_url` (por defecto un SQLite
+    temporal). Debe llamarse antes de importar cualquier módulo de `api`.
+    """
+    if database_url is None:
+        database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="habbofutbol-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret-key-benchmark-secret")
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+
+    from app import app
+    return app
+
+
+class ContadorConsultas:
+    """Cuenta las sentencias SQL que se ejecutan sobre un engine."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.total = 0
+        event.listen(engine, "before_cursor_execute", self._contar)
+
+    def _contar(self, conn, cursor, statement, parameters, context, executemany):
+        self.total += 1
+
+    @contextmanager
+    def medir(self):
+        """Devuelve un dict que al salir contiene `consultas` y `segundos`."""
+        resultado = {}
+        inicio_consultas = self.total
+        inicio = time.perf_counter()
+        try:
+            yield resultado
+        finally:
+            resultado["segundos"] = time.perf_counter() - inicio
+            resultado["consultas"] = self.total - inicio_consultas
+
+
+def percentil(valores, p):
+    """Percentil `p` (0-100) por el método del rango más cercano; None si no hay valores."""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return None
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
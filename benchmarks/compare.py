@@ -0,0 +1,78 @@
+"""
+Compara dos informes de `benchmarks.suite` (p. ej. de dos commits) y marca
+los escenarios que empeoraron más allá del umbral. Sale con código 1 si hay
+alguna regresión, para usarlo en CI.
+
+    python -m benchmarks.compare base.json nuevo.json --umbral 0.15
+"""
+import argparse
+import json
+import sys
+
+
+def variacion(antes, despues):
+    if not antes:
+        return None
+    return (despues - antes) / antes
+
+
+def comparar(base, nuevo, umbral):
+    """Devuelve (filas, regresiones) con la variación de p95, throughput y consultas por escenario."""
+    filas, regresiones = [], []
+    for nombre, actual in nuevo["resultados"].items():
+        anterior = base["resultados"].get(nombre)
+        if anterior is None:
+            continue
+        p95 = variacion(anterior["p95_ms"], actual["p95_ms"])
+        rps = variacion(anterior["peticiones_por_segundo"], actual["peticiones_por_segundo"])
+        consultas_antes, consultas_despues = anterior.get("consultas_max"), actual.get("consultas_max")
+
+        motivos = []
+        if p95 is not None and p95 > umbral:
+            motivos.append(f"p95 +{p95:.0%}")
+        if rps is not None and rps < -umbral:
+            motivos.append(f"throughput {rps:.0%}")
+        if consultas_antes is not None and consultas_despues is not None and consultas_despues > consultas_antes:
+            motivos.append(f"consultas {consultas_antes} → {consultas_despues}")
+        if actual["errores"] > anterior["errores"]:
+            motivos.append(f"errores {anterior['errores']} → {actual['errores']}")
+
+        filas.append((nombre, anterior, actual, p95, rps, motivos))
+        if motivos:
+            regresiones.append(nombre)
+    return filas, regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("nuevo")
+    parser.add_argument("--umbral", type=float, default=0.15, help="variación relativa tolerada (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.nuevo, encoding="utf-8") as f:
+        nuevo = json.load(f)
+
+    filas, regresiones = comparar(base, nuevo, args.umbral)
+
+    print(f"{base.get('commit') or 'base'} → {nuevo.get('commit') or 'nuevo'}")
+    print(f"{'escenario':<14}{'p95 ms':>20}{'req/s':>20}{'consultas':>12}")
+    for nombre, anterior, actual, p95, rps, motivos in filas:
+        print(
+            f"{nombre:<14}"
+            f"{anterior['p95_ms']:>9} → {actual['p95_ms']:<8}"
+            f"{anterior['peticiones_por_segundo']:>9} → {actual['peticiones_por_segundo']:<8}"
+            f"{str(anterior.get('consultas_max')):>5} → {str(actual.get('consultas_max')):<4}"
+            + ("  ⚠️ " + ", ".join(motivos) if motivos else "")
+        )
+
+    if regresiones:
+        print(f"\n❌ Regresiones en: {', '.join(regresiones)}")
+        sys.exit(1)
+    print("\n✅ Sin regresiones")
+
+
+if __name__ == "__main__":
+    main()
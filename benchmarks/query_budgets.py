@@ -0,0 +1,61 @@
+"""
+Comprueba que los endpoints públicos más usados no superen su presupuesto de
+consultas SQL con un volumen de datos sembrado (falla con AssertionError y la
+lista de sentencias si alguno lo supera).
+
+    python -m benchmarks.query_budgets --partidos 200
+"""
+import argparse
+
+from benchmarks.common import crear_app
+from benchmarks.bench_partidos import sembrar
+
+PRESUPUESTOS = {
+    "/api/partidos": 3,
+    "/api/partidos?limit=50": 3,
+    "/api/jugadores": 1,
+    "/api/equipos": 1,
+    "/api/torneos": 1,
+    "/api/noticias?limit=20": 1,
+    "/api/tablas/posiciones/{torneo_id}": 2,
+    "/api/tablas/grupos/{torneo_id}": 2,
+    # Los rankings incluyen la carga inicial desde jugador_stats (1 agregado + nicks)
+    "/api/tablas/goleadores/{torneo_id}": 3,
+    "/api/tablas/mvps": 3,
+    "/api/tablas/mvps?torneo_id={torneo_id}": 3,
+    "/api/jugadores/1/estadisticas": 2,
+    "/api/jugadores/1/perfil": 3,
+    "/api/equipos/1/vs/2": 3,
+    "/api/equipos/1/forma?n=10": 2,
+    "/api/torneos/{torneo_id}/bracket": 2,
+    "/api/buscar?q=bench": 2,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--partidos", type=int, default=200)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    app = crear_app(args.database_url)
+    from api.models import db, Torneo, Equipo, Jugador, JugadorEquipo, Partido, EstadisticaJugador
+    from api.cache import response_cache
+    from api.metrics import assert_query_budgets
+
+    app.config["RESPONSE_CACHE_MAX_ENTRIES"] = 0  # Medir siempre la consulta real, no la caché
+    response_cache.init_app(app)
+
+    with app.app_context():
+        sembrar(db, (Torneo, Equipo, Jugador, JugadorEquipo, Partido, EstadisticaJugador), args.partidos)
+        torneo_id = Torneo.query.filter_by(nombre="Bench").one().id
+
+    assert_query_budgets(
+        app.test_client(),
+        {url.format(torneo_id=torneo_id): maximo for url, maximo in PRESUPUESTOS.items()}
+    )
+    print(f"✅ {len(PRESUPUESTOS)} endpoints dentro de su presupuesto de consultas")
+
+
+if __name__ == "__main__":
+    main()
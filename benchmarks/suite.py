@@ -0,0 +1,267 @@
+"""
+Prueba de carga reproducible de los endpoints más usados.
+
+Siembra una liga con la escala indicada (SQLite temporal o la base de
+`--database-url`, p. ej. un Postgres local) y lanza peticiones concurrentes
+contra el test client de Flask o contra un gunicorn local. Para cada escenario
+informa latencias p50/p95/p99, throughput, errores y consultas SQL por
+petición (leídas de la cabecera `Server-Timing`) en JSON, para comparar
+commits con `python -m benchmarks.compare`.
+
+    python -m benchmarks.suite --partidos 5000 --peticiones 300 --concurrencia 8 --output base.json
+    python -m benchmarks.suite --objetivo gunicorn --gunicorn-workers 4 --database-url postgresql://localhost/bench
+    python -m benchmarks.suite --objetivo gunicorn --gunicorn-worker-class sync --output sync.json
+
+El gunicorn local usa `gunicorn.conf.py`, como en producción.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmarks.common import crear_app, percentil, SRC_DIR
+
+GUNICORN_CONF = os.path.join(os.path.dirname(SRC_DIR), "gunicorn.conf.py")
+
+PASSWORD_BENCH = "Bench-password-1!"
+CONSULTAS_SERVER_TIMING = re.compile(r'db;[^,]*desc="(\d+) consultas"')
+
+# Nombre, método, URL (con {torneo_id}) y, para los POST, el generador del cuerpo
+ESCENARIOS = [
+    ("partidos", "GET", "/api/partidos?limit=50", None),
+    ("jugadores", "GET", "/api/jugadores?limit=50", None),
+    ("posiciones", "GET", "/api/tablas/posiciones/{torneo_id}", None),
+    ("goleadores", "GET", "/api/tablas/goleadores/{torneo_id}", None),
+    ("asistidores", "GET", "/api/tablas/asistidores/{torneo_id}", None),
+    ("mvps", "GET", "/api/tablas/mvps", None),
+    ("menciones", "GET", "/api/tablas/menciones", None),
+    ("login", "POST", "/api/login", lambda i, emails: {
+        "email": emails[i % len(emails)], "password": PASSWORD_BENCH
+    }),
+    ("asistencia", "POST", "/api/asistencia", lambda i, emails: {"nombre": f"bench_asistencia_{i}"}),
+]
+
+
+class ClienteFlask:
+    """Envía las peticiones al test client (sin red ni servidor)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def enviar(self, metodo, url, cuerpo=None):
+        respuesta = self.app.test_client().open(url, method=metodo, json=cuerpo)
+        respuesta.get_data()
+        return respuesta.status_code, respuesta.headers.get("Server-Timing", "")
+
+
+class ClienteHTTP:
+    """Envía las peticiones por HTTP a un servidor local."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def enviar(self, metodo, url, cuerpo=None):
+        datos = json.dumps(cuerpo).encode("utf-8") if cuerpo is not None else None
+        peticion = urllib.request.Request(
+            self.base_url + url, data=datos, method=metodo, headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(peticion, timeout=60) as respuesta:
+                respuesta.read()
+                return respuesta.status, ", ".join(respuesta.headers.get_all("Server-Timing") or [])
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code, ", ".join(e.headers.get_all("Server-Timing") or [])
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_gunicorn(workers, entorno):
+    """Arranca `gunicorn wsgi` con `gunicorn.conf.py` (como en el Procfile) y espera a que responda."""
+    puerto = puerto_libre()
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "wsgi", "--chdir", SRC_DIR, "--config", GUNICORN_CONF,
+         "-b", f"127.0.0.1:{puerto}", "-w", str(workers), "--log-level", "warning"],
+        env={**os.environ, **entorno}
+    )
+    base_url = f"http://127.0.0.1:{puerto}"
+    limite = time.monotonic() + 60
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError("gunicorn terminó antes de arrancar")
+        try:
+            urllib.request.urlopen(base_url + "/api/torneos", timeout=5).read()
+            return proceso, base_url
+        except OSError:  # Conexión rechazada o sin respuesta mientras arrancan los workers
+            time.sleep(0.2)
+    proceso.terminate()
+    raise RuntimeError("gunicorn no respondió en 60 segundos")
+
+
+def ejecutar(cliente, metodo, url, cuerpo, peticiones, concurrencia, emails):
+    latencias, consultas, codigos = [], [], {}
+    lock = threading.Lock()
+
+    def una(i):
+        inicio = time.perf_counter()
+        estado, server_timing = cliente.enviar(metodo, url, cuerpo(i, emails) if cuerpo else None)
+        duracion = time.perf_counter() - inicio
+        encontrado = CONSULTAS_SERVER_TIMING.search(server_timing)
+        with lock:
+            latencias.append(duracion)
+            codigos[estado] = codigos.get(estado, 0) + 1
+            if encontrado:
+                consultas.append(int(encontrado.group(1)))
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        list(executor.map(una, range(peticiones)))
+    total = time.perf_counter() - inicio
+
+    return {
+        "peticiones": peticiones,
+        "errores": sum(n for estado, n in codigos.items() if estado >= 400),
+        "codigos": {str(estado): n for estado, n in sorted(codigos.items())},
+        "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 2),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+        "peticiones_por_segundo": round(peticiones / total, 1),
+        "consultas_p50": percentil(consultas, 50),
+        "consultas_max": max(consultas) if consultas else None,
+    }
+
+
+def commit_actual():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(SRC_DIR), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def sembrar(app, args):
+    """Siembra la liga con `flask seed` si la base está vacía; devuelve (torneo_id, emails para /login)."""
+    from api.models import Torneo, Jugador
+    from api.seed import generar_liga
+
+    with app.app_context():
+        if Torneo.query.first() is None:
+            # Todos los jugadores sembrados comparten PASSWORD_BENCH
+            generar_liga(torneos=args.torneos, equipos_por_torneo=args.equipos_por_torneo,
+                         jugadores_por_equipo=args.jugadores_por_equipo, partidos=args.partidos,
+                         asistencias=args.asistencias, noticias=args.noticias, semilla=args.semilla,
+                         password=PASSWORD_BENCH)
+        emails = [email for email, in Jugador.query.with_entities(Jugador.email)
+                  .filter(Jugador.email.like("%@seed.habbofutbol.local"))
+                  .order_by(Jugador.id).limit(args.usuarios)]
+        return Torneo.query.order_by(Torneo.id).first().id, emails
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--objetivo", choices=["flask", "gunicorn"], default="flask")
+    parser.add_argument("--gunicorn-workers", type=int, default=2)
+    parser.add_argument("--gunicorn-worker-class", choices=["gthread", "sync"], default=None,
+                        help="GUNICORN_WORKER_CLASS de gunicorn.conf.py (por defecto gthread)")
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--torneos", type=int, default=6)
+    parser.add_argument("--equipos-por-torneo", type=int, default=12)
+    parser.add_argument("--jugadores-por-equipo", type=int, default=7)
+    parser.add_argument("--partidos", type=int, default=3000)
+    parser.add_argument("--asistencias", type=int, default=20000)
+    parser.add_argument("--noticias", type=int, default=200)
+    parser.add_argument("--usuarios", type=int, default=50, help="jugadores sembrados que se turnan en /login")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--peticiones", type=int, default=200, help="peticiones por escenario")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--escenarios", nargs="+", choices=[e[0] for e in ESCENARIOS], default=None)
+    parser.add_argument("--sin-cache", action="store_true", help="desactiva la caché de respuestas")
+    parser.add_argument("--hash-method", default=None, help="PASSWORD_HASH_METHOD de las contraseñas sembradas")
+    parser.add_argument("--output", default=None, help="archivo JSON de salida (por defecto stdout)")
+    args = parser.parse_args()
+
+    # Configuración compartida por el proceso actual y por los workers de gunicorn
+    entorno = {
+        "RATELIMIT_ENABLED": "false",
+        "RESPONSE_CACHE_MAX_ENTRIES": "0" if args.sin_cache else os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"),
+    }
+    if args.hash_method:
+        entorno["PASSWORD_HASH_METHOD"] = args.hash_method
+    if args.gunicorn_worker_class:
+        entorno["GUNICORN_WORKER_CLASS"] = args.gunicorn_worker_class
+    os.environ.update(entorno)
+    app = crear_app(args.database_url)
+    entorno["DATABASE_URL"] = os.environ["DATABASE_URL"]
+    entorno["JWT_SECRET_KEY"] = os.environ["JWT_SECRET_KEY"]
+
+    torneo_id, emails = sembrar(app, args)
+
+    proceso = None
+    if args.objetivo == "gunicorn":
+        proceso, base_url = iniciar_gunicorn(args.gunicorn_workers, entorno)
+        cliente = ClienteHTTP(base_url)
+    else:
+        cliente = ClienteFlask(app)
+
+    resultados = {}
+    try:
+        for nombre, metodo, url, cuerpo in ESCENARIOS:
+            if args.escenarios and nombre not in args.escenarios:
+                continue
+            resultados[nombre] = {
+                "metodo": metodo,
+                "url": url.format(torneo_id=torneo_id),
+                **ejecutar(cliente, metodo, url.format(torneo_id=torneo_id), cuerpo,
+                           args.peticiones, args.concurrencia, emails),
+            }
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait()
+
+    informe = {
+        "commit": commit_actual(),
+        "fecha": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "base_de_datos": app.config["SQLALCHEMY_DATABASE_URI"].split(":", 1)[0],
+        "objetivo": args.objetivo,
+        "gunicorn_workers": args.gunicorn_workers if args.objetivo == "gunicorn" else None,
+        "gunicorn_worker_class": (
+            os.getenv("GUNICORN_WORKER_CLASS", "gthread") if args.objetivo == "gunicorn" else None
+        ),
+        "concurrencia": args.concurrencia,
+        "cache": not args.sin_cache,
+        "hash_method": app.config["PASSWORD_HASH_METHOD"],
+        "escala": {
+            "torneos": args.torneos, "equipos_por_torneo": args.equipos_por_torneo,
+            "jugadores_por_equipo": args.jugadores_por_equipo, "partidos": args.partidos,
+            "asistencias": args.asistencias, "usuarios": args.usuarios, "semilla": args.semilla,
+        },
+        "resultados": resultados,
+    }
+
+    salida = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(salida + "\n")
+    else:
+        print(salida)
+
+
+if __name__ == "__main__":
+    main()
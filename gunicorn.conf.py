@@ -0,0 +1,57 @@
+"""
+Configuración de gunicorn para producción (Procfile y render.yaml):
+
+    gunicorn wsgi --chdir ./src/ --config gunicorn.conf.py
+
+Por defecto los workers son `gthread`: cada proceso atiende `GUNICORN_THREADS`
+peticiones a la vez, así que una subida a Cloudinary, una consulta lenta de
+Postgres o un cliente de `/stream/torneos/<id>` ocupan un hilo y no el worker
+entero. Se eligió `gthread` y no gevent porque psycopg2 bloquearía el bucle de
+gevent (haría falta psycogreen) y la app ya usa hilos propios (subidas, hash
+de contraseñas, asistencias, eventos de Redis) que no cooperan con él.
+
+    WEB_CONCURRENCY        procesos (2; el plan gratuito tiene poca memoria)
+    GUNICORN_THREADS       hilos por proceso (8)
+    GUNICORN_WORKER_CLASS  `gthread`, o `sync` para el modo anterior
+    GUNICORN_TIMEOUT       segundos sin señales antes de reiniciar un worker (60)
+
+El pool de conexiones de Postgres se ajusta a los hilos: cada hilo tiene a lo
+sumo una conexión (`DATABASE_POOL_SIZE` = hilos) y el desborde cubre los hilos
+en segundo plano. En total se abren hasta
+WEB_CONCURRENCY × (DATABASE_POOL_SIZE + DATABASE_MAX_OVERFLOW) conexiones, que
+deben caber en el límite de la base. Las variables que ya estén definidas en
+el entorno tienen prioridad.
+
+Los streams de `/stream/torneos/<id>` ocupan un hilo cada uno mientras están
+abiertos: `EVENTS_MAX_STREAMS` (por proceso) es por defecto la mitad de los
+hilos, para que siempre queden hilos para las demás rutas.
+
+La app no se precarga (`preload_app = False`): cada worker la importa tras el
+fork, con sus propios engines, hilos y conexiones a Redis.
+"""
+import os
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+threads = int(os.getenv("GUNICORN_THREADS", 8)) if worker_class == "gthread" else 1
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = 5
+preload_app = False
+
+
+def _pool_de_conexiones(prefijo, url):
+    """Valores por defecto de `{prefijo}_POOL_*` (ver `api.replicas.opciones_de_pool`) para Postgres."""
+    if not url or not url.startswith(("postgres://", "postgresql")):
+        return  # SQLite usa su propio pool y no acepta estas opciones
+    # Hilos de la app que usan la base fuera de las peticiones: subidas y el volcado de asistencias
+    en_segundo_plano = int(os.getenv("UPLOAD_WORKERS", 2)) + 1
+    os.environ.setdefault(f"{prefijo}_POOL_SIZE", str(threads))
+    os.environ.setdefault(f"{prefijo}_MAX_OVERFLOW", str(en_segundo_plano))
+    os.environ.setdefault(f"{prefijo}_POOL_TIMEOUT", "10")
+    os.environ.setdefault(f"{prefijo}_POOL_PRE_PING", "true")
+
+
+os.environ.setdefault("EVENTS_MAX_STREAMS", str(max(1, threads // 2)))
+_pool_de_conexiones("DATABASE", os.getenv("DATABASE_URL"))
+_pool_de_conexiones("DATABASE_REPLICA", os.getenv("DATABASE_REPLICA_URL"))
@@ -90,9 +90,19 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # Los índices de búsqueda (api.search) se crean con SQL propio de cada motor:
+    # autogenerate no debe proponer borrarlos
+    def include_object(obj, name, type_, reflected, compare_to):
+        if type_ == "table" and name.startswith("noticia_fts"):
+            return False
+        if type_ == "index" and name in ("ix_noticia_busqueda", "ix_jugadores_nickhabbo_trgm"):
+            return False
+        return True
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
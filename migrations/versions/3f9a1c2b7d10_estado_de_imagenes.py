@@ -0,0 +1,36 @@
+"""estado de subida de logos e imágenes
+
+Revision ID: 3f9a1c2b7d10
+Revises: 
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c2b7d10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# app.py ejecuta db.create_all() al importarse, antes que `flask db upgrade`,
+# por lo que en una base nueva las columnas ya pueden existir.
+def _columnas(tabla):
+    return {c["name"] for c in sa.inspect(op.get_bind()).get_columns(tabla)}
+
+
+def upgrade():
+    if "logo_estado" not in _columnas("equipos"):
+        op.add_column('equipos', sa.Column('logo_estado', sa.String(length=20), nullable=True))
+    if "imagen_estado" not in _columnas("noticia"):
+        op.add_column('noticia', sa.Column('imagen_estado', sa.String(length=20), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('noticia') as batch_op:
+        batch_op.drop_column('imagen_estado')
+    with op.batch_alter_table('equipos') as batch_op:
+        batch_op.drop_column('logo_estado')
@@ -0,0 +1,76 @@
+"""tabla de posiciones persistida
+
+Revision ID: 7a2d9f3c1b56
+Revises: c5b2e7a91d48
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a2d9f3c1b56'
+down_revision = 'c5b2e7a91d48'
+branch_labels = None
+depends_on = None
+
+CAMPOS = ('puntos', 'partidos_jugados', 'ganados', 'empatados', 'perdidos', 'goles_favor', 'goles_contra')
+
+
+def _rellenar(conexion, tabla):
+    # Mismo cálculo que `flask rebuild-standings`, en SQL para no depender de los modelos
+    totales = {}
+
+    def sumar(torneo_id, equipo_id, goles_favor, goles_contra):
+        fila = totales.setdefault((torneo_id, equipo_id), dict.fromkeys(CAMPOS, 0))
+        fila['partidos_jugados'] += 1
+        fila['goles_favor'] += goles_favor
+        fila['goles_contra'] += goles_contra
+        if goles_favor > goles_contra:
+            fila['puntos'] += 3
+            fila['ganados'] += 1
+        elif goles_favor == goles_contra:
+            fila['puntos'] += 1
+            fila['empatados'] += 1
+        else:
+            fila['perdidos'] += 1
+
+    # Sin estado cuenta como finalizado (los partidos anteriores al fixture)
+    for torneo_id, equipo_a_id, equipo_b_id, goles_a, goles_b in conexion.execute(sa.text(
+        "SELECT torneo_id, equipo_a_id, equipo_b_id, goles_equipo_a, goles_equipo_b FROM partidos "
+        "WHERE estado = 'finalizado' OR estado IS NULL"
+    )):
+        goles_a, goles_b = int(goles_a or 0), int(goles_b or 0)
+        sumar(torneo_id, equipo_a_id, goles_a, goles_b)
+        sumar(torneo_id, equipo_b_id, goles_b, goles_a)
+
+    if totales:
+        op.bulk_insert(tabla, [
+            {'torneo_id': torneo_id, 'equipo_id': equipo_id, **valores}
+            for (torneo_id, equipo_id), valores in totales.items()
+        ])
+
+
+def upgrade():
+    conexion = op.get_bind()
+    # db.create_all() puede haber creado ya la tabla (vacía) antes de la migración
+    if sa.inspect(conexion).has_table('tabla_posiciones'):
+        conexion.execute(sa.text("DELETE FROM tabla_posiciones"))
+        tabla = sa.table('tabla_posiciones', sa.column('torneo_id'), sa.column('equipo_id'),
+                         *[sa.column(campo) for campo in CAMPOS])
+    else:
+        tabla = op.create_table('tabla_posiciones',
+            sa.Column('torneo_id', sa.Integer(), nullable=False),
+            sa.Column('equipo_id', sa.Integer(), nullable=False),
+            *[sa.Column(campo, sa.Integer(), nullable=False) for campo in CAMPOS],
+            sa.ForeignKeyConstraint(['equipo_id'], ['equipos.id'], ),
+            sa.ForeignKeyConstraint(['torneo_id'], ['torneos.id'], ),
+            sa.PrimaryKeyConstraint('torneo_id', 'equipo_id')
+        )
+
+    _rellenar(conexion, tabla)
+
+
+def downgrade():
+    op.drop_table('tabla_posiciones')
@@ -0,0 +1,30 @@
+"""índice compuesto de asistencia por nombre y fecha
+
+Revision ID: 8c41d2e5a7b3
+Revises: 3f9a1c2b7d10
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41d2e5a7b3'
+down_revision = '3f9a1c2b7d10'
+branch_labels = None
+depends_on = None
+
+
+# db.create_all() puede haber creado ya el índice en una base nueva
+def _indices(tabla):
+    return {i["name"] for i in sa.inspect(op.get_bind()).get_indexes(tabla)}
+
+
+def upgrade():
+    if "ix_asistencia_nombre_fecha_hora" not in _indices("asistencia"):
+        op.create_index('ix_asistencia_nombre_fecha_hora', 'asistencia', ['nombre', 'fecha_hora'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_asistencia_nombre_fecha_hora', table_name='asistencia')
@@ -0,0 +1,39 @@
+"""grupo de cada equipo y tarjetas de cada partido
+
+Revision ID: a6d1e8f4c392
+Revises: f3c7a9d2b814
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d1e8f4c392'
+down_revision = 'f3c7a9d2b814'
+branch_labels = None
+depends_on = None
+
+TARJETAS = ('amarillas_equipo_a', 'amarillas_equipo_b', 'rojas_equipo_a', 'rojas_equipo_b')
+
+
+# db.create_all() puede haber creado ya las columnas en una base nueva
+def _columnas(tabla):
+    return {c["name"] for c in sa.inspect(op.get_bind()).get_columns(tabla)}
+
+
+def upgrade():
+    if 'grupo' not in _columnas('equipos'):
+        op.add_column('equipos', sa.Column('grupo', sa.String(length=10), nullable=True))
+    for columna in TARJETAS:
+        if columna not in _columnas('partidos'):
+            op.add_column('partidos', sa.Column(columna, sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('partidos') as batch_op:
+        for columna in reversed(TARJETAS):
+            batch_op.drop_column(columna)
+    with op.batch_alter_table('equipos') as batch_op:
+        batch_op.drop_column('grupo')
@@ -0,0 +1,51 @@
+"""índices de claves foráneas y columnas de filtro
+
+Revision ID: b7e2f9c41a65
+Revises: 8c41d2e5a7b3
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2f9c41a65'
+down_revision = '8c41d2e5a7b3'
+branch_labels = None
+depends_on = None
+
+# El índice de asistencia (nombre, fecha_hora) se creó en 8c41d2e5a7b3
+INDICES = [
+    ('ix_jugadores_equipos_jugador_id_modalidad', 'jugadores_equipos', ['jugador_id', 'modalidad']),
+    ('ix_jugadores_equipos_equipo_id', 'jugadores_equipos', ['equipo_id']),
+    ('ix_equipos_torneo_id', 'equipos', ['torneo_id']),
+    ('ix_partidos_torneo_id', 'partidos', ['torneo_id']),
+    ('ix_partidos_equipo_a_id', 'partidos', ['equipo_a_id']),
+    ('ix_partidos_equipo_b_id', 'partidos', ['equipo_b_id']),
+    ('ix_partidos_mvp_id', 'partidos', ['mvp_id']),
+    ('ix_partidos_mencion_equipo_a_id', 'partidos', ['mencion_equipo_a_id']),
+    ('ix_partidos_mencion_equipo_b_id', 'partidos', ['mencion_equipo_b_id']),
+    ('ix_partidos_fecha_id', 'partidos', ['fecha', 'id']),
+    ('ix_estadisticas_jugador_partido_id', 'estadisticas_jugador', ['partido_id']),
+    ('ix_estadisticas_jugador_jugador_id', 'estadisticas_jugador', ['jugador_id']),
+    ('ix_convocatorias_jugador_id_modalidad', 'convocatorias', ['jugador_id', 'modalidad']),
+    ('ix_ofertas_jugador_id', 'ofertas', ['jugador_id']),
+    ('ix_noticia_fecha_publicacion_id', 'noticia', ['fecha_publicacion', 'id']),
+]
+
+
+# db.create_all() puede haber creado ya los índices en una base nueva
+def _indices(tabla):
+    return {i["name"] for i in sa.inspect(op.get_bind()).get_indexes(tabla)}
+
+
+def upgrade():
+    for nombre, tabla, columnas in INDICES:
+        if nombre not in _indices(tabla):
+            op.create_index(nombre, tabla, columnas, unique=False)
+
+
+def downgrade():
+    for nombre, tabla, _ in reversed(INDICES):
+        op.drop_index(nombre, table_name=tabla)
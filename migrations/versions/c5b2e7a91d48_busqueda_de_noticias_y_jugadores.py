@@ -0,0 +1,54 @@
+"""índices de búsqueda de noticias y jugadores
+
+Revision ID: c5b2e7a91d48
+Revises: a6d1e8f4c392
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5b2e7a91d48'
+down_revision = 'a6d1e8f4c392'
+branch_labels = None
+depends_on = None
+
+# Las mismas sentencias que crea api.search con db.create_all() (todas idempotentes)
+POSTGRES = [
+    "CREATE INDEX IF NOT EXISTS ix_noticia_busqueda ON noticia "
+    "USING gin (to_tsvector('spanish', titulo || ' ' || contenido))",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_jugadores_nickhabbo_trgm ON jugadores USING gin (nickhabbo gin_trgm_ops)",
+]
+
+SQLITE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS noticia_fts USING fts5("
+    "titulo, contenido, content='noticia', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS noticia_fts_insert AFTER INSERT ON noticia BEGIN "
+    "INSERT INTO noticia_fts(rowid, titulo, contenido) VALUES (new.id, new.titulo, new.contenido); END",
+    "CREATE TRIGGER IF NOT EXISTS noticia_fts_delete AFTER DELETE ON noticia BEGIN "
+    "INSERT INTO noticia_fts(noticia_fts, rowid, titulo, contenido) VALUES ('delete', old.id, old.titulo, old.contenido); END",
+    "CREATE TRIGGER IF NOT EXISTS noticia_fts_update AFTER UPDATE OF titulo, contenido ON noticia BEGIN "
+    "INSERT INTO noticia_fts(noticia_fts, rowid, titulo, contenido) VALUES ('delete', old.id, old.titulo, old.contenido); "
+    "INSERT INTO noticia_fts(rowid, titulo, contenido) VALUES (new.id, new.titulo, new.contenido); END",
+    # Indexa las noticias que ya existían
+    "INSERT INTO noticia_fts(noticia_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade():
+    dialecto = op.get_bind().dialect.name
+    for sentencia in POSTGRES if dialecto == 'postgresql' else SQLITE if dialecto == 'sqlite' else []:
+        op.execute(sentencia)
+
+
+def downgrade():
+    dialecto = op.get_bind().dialect.name
+    if dialecto == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_jugadores_nickhabbo_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_noticia_busqueda")
+    elif dialecto == 'sqlite':
+        for trigger in ('noticia_fts_insert', 'noticia_fts_delete', 'noticia_fts_update'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS noticia_fts")
@@ -0,0 +1,76 @@
+"""estadísticas acumuladas por jugador y torneo
+
+Revision ID: d4a8c3e1f927
+Revises: b7e2f9c41a65
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a8c3e1f927'
+down_revision = 'b7e2f9c41a65'
+branch_labels = None
+depends_on = None
+
+CAMPOS = ('partidos_jugados', 'goles', 'asistencias', 'autogoles', 'mvps', 'menciones')
+
+
+def _rellenar(conexion, tabla):
+    # Mismo cálculo que `flask rebuild-player-stats`, en SQL para no depender de los modelos
+    totales = {}
+
+    def sumar(jugador_id, torneo_id, campo, valor):
+        fila = totales.setdefault((jugador_id, torneo_id), dict.fromkeys(CAMPOS, 0))
+        fila[campo] += int(valor or 0)
+
+    for jugador_id, torneo_id, jugados, goles, asistencias, autogoles in conexion.execute(sa.text(
+        "SELECT e.jugador_id, p.torneo_id, COUNT(*), SUM(e.goles), SUM(e.asistencias), SUM(e.autogoles) "
+        "FROM estadisticas_jugador e JOIN partidos p ON p.id = e.partido_id "
+        "GROUP BY e.jugador_id, p.torneo_id"
+    )):
+        sumar(jugador_id, torneo_id, 'partidos_jugados', jugados)
+        sumar(jugador_id, torneo_id, 'goles', goles)
+        sumar(jugador_id, torneo_id, 'asistencias', asistencias)
+        sumar(jugador_id, torneo_id, 'autogoles', autogoles)
+
+    for columna, campo in (('mvp_id', 'mvps'), ('mencion_equipo_a_id', 'menciones'), ('mencion_equipo_b_id', 'menciones')):
+        for jugador_id, torneo_id, total in conexion.execute(sa.text(
+            f"SELECT {columna}, torneo_id, COUNT(*) FROM partidos "
+            f"WHERE {columna} IS NOT NULL GROUP BY {columna}, torneo_id"
+        )):
+            sumar(jugador_id, torneo_id, campo, total)
+
+    if totales:
+        op.bulk_insert(tabla, [
+            {'jugador_id': jugador_id, 'torneo_id': torneo_id, **valores}
+            for (jugador_id, torneo_id), valores in totales.items()
+        ])
+
+
+def upgrade():
+    conexion = op.get_bind()
+    # db.create_all() puede haber creado ya la tabla (vacía) en una base nueva
+    if sa.inspect(conexion).has_table('jugador_stats'):
+        conexion.execute(sa.text("DELETE FROM jugador_stats"))
+        tabla = sa.table('jugador_stats', sa.column('jugador_id'), sa.column('torneo_id'),
+                         *[sa.column(campo) for campo in CAMPOS])
+    else:
+        tabla = op.create_table('jugador_stats',
+            sa.Column('jugador_id', sa.Integer(), nullable=False),
+            sa.Column('torneo_id', sa.Integer(), nullable=False),
+            *[sa.Column(campo, sa.Integer(), nullable=False) for campo in CAMPOS],
+            sa.ForeignKeyConstraint(['jugador_id'], ['jugadores.id'], ),
+            sa.ForeignKeyConstraint(['torneo_id'], ['torneos.id'], ),
+            sa.PrimaryKeyConstraint('jugador_id', 'torneo_id')
+        )
+        op.create_index('ix_jugador_stats_torneo_id', 'jugador_stats', ['torneo_id'], unique=False)
+
+    _rellenar(conexion, tabla)
+
+
+def downgrade():
+    op.drop_index('ix_jugador_stats_torneo_id', table_name='jugador_stats')
+    op.drop_table('jugador_stats')
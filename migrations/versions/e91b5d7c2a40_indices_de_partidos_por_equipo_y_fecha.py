@@ -0,0 +1,41 @@
+"""índices de partidos por equipo y fecha
+
+Revision ID: e91b5d7c2a40
+Revises: d4a8c3e1f927
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e91b5d7c2a40'
+down_revision = 'd4a8c3e1f927'
+branch_labels = None
+depends_on = None
+
+# (índice de una columna que se reemplaza, índice compuesto nuevo, columnas)
+REEMPLAZOS = [
+    ('ix_partidos_equipo_a_id', 'ix_partidos_equipo_a_id_fecha', ['equipo_a_id', 'fecha']),
+    ('ix_partidos_equipo_b_id', 'ix_partidos_equipo_b_id_fecha', ['equipo_b_id', 'fecha']),
+]
+
+
+# db.create_all() puede haber creado ya los índices nuevos en una base nueva
+def _indices():
+    return {i["name"] for i in sa.inspect(op.get_bind()).get_indexes('partidos')}
+
+
+def upgrade():
+    for anterior, nuevo, columnas in REEMPLAZOS:
+        if nuevo not in _indices():
+            op.create_index(nuevo, 'partidos', columnas, unique=False)
+        if anterior in _indices():
+            op.drop_index(anterior, table_name='partidos')
+
+
+def downgrade():
+    for anterior, nuevo, columnas in REEMPLAZOS:
+        op.create_index(anterior, 'partidos', columnas[:1], unique=False)
+        op.drop_index(nuevo, table_name='partidos')
@@ -0,0 +1,46 @@
+"""cuadro de eliminación
+
+Revision ID: f3c7a9d2b814
+Revises: e91b5d7c2a40
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c7a9d2b814'
+down_revision = 'e91b5d7c2a40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() puede haber creado ya la tabla en una base nueva
+    if sa.inspect(op.get_bind()).has_table('cruces_eliminacion'):
+        return
+
+    op.create_table('cruces_eliminacion',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('torneo_id', sa.Integer(), nullable=False),
+        sa.Column('ronda', sa.Integer(), nullable=False),
+        sa.Column('posicion', sa.Integer(), nullable=False),
+        sa.Column('equipo_a_id', sa.Integer(), nullable=True),
+        sa.Column('equipo_b_id', sa.Integer(), nullable=True),
+        sa.Column('partido_id', sa.Integer(), nullable=True),
+        sa.Column('ganador_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['torneo_id'], ['torneos.id'], ),
+        sa.ForeignKeyConstraint(['equipo_a_id'], ['equipos.id'], ),
+        sa.ForeignKeyConstraint(['equipo_b_id'], ['equipos.id'], ),
+        sa.ForeignKeyConstraint(['partido_id'], ['partidos.id'], ),
+        sa.ForeignKeyConstraint(['ganador_id'], ['equipos.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('torneo_id', 'ronda', 'posicion', name='uq_cruces_eliminacion_torneo_ronda_posicion')
+    )
+    op.create_index('ix_cruces_eliminacion_partido_id', 'cruces_eliminacion', ['partido_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_cruces_eliminacion_partido_id', table_name='cruces_eliminacion')
+    op.drop_table('cruces_eliminacion')
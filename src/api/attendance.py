@@ -0,0 +1,208 @@
+"""
+Registro de asistencias con deduplicación y escritura diferida.
+
+Al inicio de un evento cientos de jugadores marcan asistencia en pocos
+segundos. En vez de un SELECT + INSERT + COMMIT por cada uno:
+
+- una ventana acotada en memoria rechaza sin más consultas el mismo nombre
+  repetido en este proceso dentro de `ATTENDANCE_DEDUPE_WINDOW` segundos;
+- la decisión final es compartida por todos los workers: con Redis, un
+  `SET NX EX` por nombre (que también cubre las filas que otro worker tiene
+  todavía en su buffer); sin Redis, la consulta a la base de datos apoyada
+  en el índice (nombre, fecha_hora);
+- las asistencias aceptadas se acumulan en un buffer que un hilo vuelca en
+  lotes cada `ATTENDANCE_FLUSH_INTERVAL` segundos o al llegar a
+  `ATTENDANCE_BATCH_SIZE` filas.
+
+La ventana en memoria solo sirve para decir "ya lo vi": que un nombre no esté
+en ella no prueba nada, porque pudo registrarse en otro worker.
+"""
+import atexit
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from api.models import db, Asistencia
+from extensions import REDIS_URL
+
+PREFIJO = "habbofutbol:asistencia"
+
+
+class BufferLleno(Exception):
+    """El buffer de asistencias alcanzó su máximo sin poder volcarse."""
+
+
+class VentanaReciente:
+    """Nombres vistos en los últimos `segundos`, con un máximo de `max_entries`."""
+
+    def __init__(self, segundos=60, max_entries=10000):
+        self.segundos = segundos
+        self.max_entries = max_entries
+        self._vistos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _purgar(self, ahora):
+        while self._vistos:
+            nombre, visto = next(iter(self._vistos.items()))
+            if ahora - visto < self.segundos:
+                break
+            del self._vistos[nombre]
+
+    def reciente(self, nombre):
+        """True si `nombre` se registró dentro de la ventana."""
+        ahora = time.monotonic()
+        with self._lock:
+            self._purgar(ahora)
+            return nombre in self._vistos
+
+    def registrar(self, nombre):
+        """Agrega `nombre` a la ventana; devuelve False si ya estaba dentro de ella."""
+        ahora = time.monotonic()
+        with self._lock:
+            self._purgar(ahora)
+            if nombre in self._vistos:
+                return False
+            self._vistos[nombre] = ahora
+            while len(self._vistos) > self.max_entries:
+                self._vistos.popitem(last=False)  # Olvidarlo solo cuesta volver a consultar la autoridad
+            return True
+
+
+class AttendanceBuffer:
+    def __init__(self):
+        self.app = None
+        self.ventana = VentanaReciente()
+        self.redis = None
+        self.intervalo = 1.0
+        self.tamano_lote = 100
+        self.maximo = 5000
+        self._pendientes = []
+        self._lock = threading.Lock()
+        self._volcado = threading.Lock()
+        self._despertar = threading.Event()
+        self._hilo = None
+
+    def init_app(self, app):
+        segundos = app.config.setdefault("ATTENDANCE_DEDUPE_WINDOW", 60)
+        max_entries = app.config.setdefault("ATTENDANCE_DEDUPE_MAX_ENTRIES", 10000)
+        # Con intervalo 0 cada asistencia se escribe dentro de la petición (modo síncrono para pruebas)
+        self.intervalo = app.config.setdefault("ATTENDANCE_FLUSH_INTERVAL", 1.0)
+        self.tamano_lote = app.config.setdefault("ATTENDANCE_BATCH_SIZE", 100)
+        self.maximo = app.config.setdefault("ATTENDANCE_BUFFER_MAX", 5000)
+        self.ventana = VentanaReciente(segundos, max_entries)
+        self.app = app
+
+        self.redis = None
+        url = app.config.setdefault("ATTENDANCE_REDIS_URL", REDIS_URL)
+        if url:
+            try:
+                client = Redis.from_url(url, socket_connect_timeout=0.5, socket_timeout=1)
+                client.ping()
+                self.redis = client
+            except RedisError as e:
+                print(f"⚠️ Redis no disponible para las asistencias ({e}); los duplicados se buscan en la base")
+
+    def _reservar(self, nombre):
+        """
+        Decide, para todos los workers, si `nombre` puede registrar ahora.
+        Con Redis lo reserva durante la ventana; si no, consulta la base.
+        """
+        if self.redis is not None:
+            try:
+                return bool(self.redis.set(f"{PREFIJO}:{nombre}", 1, nx=True, ex=self.ventana.segundos))
+            except RedisError as e:
+                print(f"⚠️ No se pudo consultar Redis para la asistencia ({e}); se consulta la base")
+
+        desde = datetime.utcnow() - timedelta(seconds=self.ventana.segundos)
+        repetido = db.session.query(Asistencia.id).filter(
+            Asistencia.nombre == nombre, Asistencia.fecha_hora >= desde
+        ).first()
+        return repetido is None
+
+    def _liberar(self, nombre):
+        if self.redis is not None:
+            try:
+                self.redis.delete(f"{PREFIJO}:{nombre}")
+            except RedisError:
+                pass  # Vence sola al terminar la ventana
+
+    def registrar(self, nombre, ip):
+        """
+        Acepta la asistencia de `nombre` o devuelve False si ya registró dentro
+        de la ventana. Lanza BufferLleno si no hay lugar para más pendientes.
+        """
+        if self.ventana.reciente(nombre):
+            return False
+        if not self._reservar(nombre):
+            return False
+
+        with self._lock:
+            if len(self._pendientes) >= self.maximo:
+                self._liberar(nombre)  # No se guardó: puede volver a intentarlo
+                raise BufferLleno()
+            if not self.ventana.registrar(nombre):
+                return False  # Otro hilo de este proceso lo aceptó mientras tanto
+            self._pendientes.append({"nombre": nombre, "ip": ip, "fecha_hora": datetime.utcnow()})
+            lleno = len(self._pendientes) >= self.tamano_lote
+
+        if not self.intervalo:
+            self.flush()
+        else:
+            self._arrancar()
+            if lleno:
+                self._despertar.set()
+        return True
+
+    def flush(self):
+        """Escribe en la base de datos todas las asistencias pendientes. Devuelve cuántas se guardaron."""
+        with self._volcado:
+            with self._lock:
+                filas, self._pendientes = self._pendientes, []
+            if not filas:
+                return 0
+            try:
+                db.session.bulk_insert_mappings(Asistencia, filas)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"⚠️ No se pudieron guardar {len(filas)} asistencias: {e}")
+                with self._lock:
+                    # Se reintentan en el próximo volcado mientras quepan en el buffer
+                    self._pendientes[:0] = filas[:max(0, self.maximo - len(self._pendientes))]
+                return 0
+            return len(filas)
+
+    def pendientes(self):
+        with self._lock:
+            return len(self._pendientes)
+
+    def _arrancar(self):
+        # El hilo se crea al primer uso para que cada worker de gunicorn (tras el fork) tenga el suyo
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._bucle, name="attendance-flush", daemon=True)
+                self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            self._volcar_en_contexto()
+
+    def _volcar_en_contexto(self):
+        if self.app is None:
+            return
+        with self.app.app_context():
+            self.flush()
+
+
+attendance_buffer = AttendanceBuffer()
+
+# Al apagar el proceso se escriben las asistencias que quedaron en el buffer
+atexit.register(attendance_buffer._volcar_en_contexto)
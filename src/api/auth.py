@@ -0,0 +1,252 @@
+"""
+Autorización por rol para las rutas protegidas.
+
+`roles_required("admin", ...)` valida el JWT y comprueba el rol del usuario
+sin cargar la fila completa de `Jugador` (que además arrastra la relación
+`jugadores_equipos` con un JOIN). El rol y el estado de la cuenta de cada
+usuario se guardan en una caché pequeña con TTL; se invalida cuando cambia
+el rol o `is_active` de un jugador, o cuando se elimina.
+
+La caché vive en Redis para que una revocación valga en todos los workers a
+la vez. Sin Redis solo se usa memoria del proceso en modo debug (un único
+proceso); en producción no se cachea y cada petición lee el rol de la base.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+
+from flask import g, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from redis import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import event, inspect
+
+from api.models import db, Jugador
+from extensions import REDIS_URL
+
+Principal = namedtuple("Principal", ["id", "role", "is_active"])
+
+PREFIJO = "habbofutbol:principal"
+# Tras una invalidación, la clave queda bloqueada este tiempo para que otro worker
+# que leyó el rol anterior justo antes del commit no lo vuelva a guardar
+BLOQUEO_TRAS_INVALIDAR = 10
+REVOCADO = b"-"
+
+
+class MemoryPrincipals:
+    """Caché LRU con TTL en memoria del proceso (solo válida con un único proceso)."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, jugador_id):
+        with self._lock:
+            entrada = self._entradas.get(jugador_id)
+            if entrada is None:
+                return None
+            principal, expira = entrada
+            if expira < time.monotonic():
+                del self._entradas[jugador_id]
+                return None
+            self._entradas.move_to_end(jugador_id)
+            return principal
+
+    def set(self, principal):
+        with self._lock:
+            self._entradas[principal.id] = (principal, time.monotonic() + self.ttl)
+            self._entradas.move_to_end(principal.id)
+            while len(self._entradas) > self.max_entries:
+                self._entradas.popitem(last=False)
+
+    def invalidate(self, *jugador_ids):
+        with self._lock:
+            for jugador_id in jugador_ids:
+                self._entradas.pop(jugador_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+class RedisPrincipals:
+    """Caché compartida por todos los workers: "<rol>|<activo>" por jugador con vencimiento."""
+
+    def __init__(self, client, ttl):
+        self.client = client
+        self.ttl = ttl
+
+    def _clave(self, jugador_id):
+        return f"{PREFIJO}:{jugador_id}"
+
+    def get(self, jugador_id):
+        valor = self.client.get(self._clave(jugador_id))
+        if valor is None or valor == REVOCADO:
+            return None
+        role, activo = valor.decode().rsplit("|", 1)
+        return Principal(jugador_id, role, activo == "1")
+
+    def set(self, principal):
+        # NX: no pisa el bloqueo que deja una invalidación reciente
+        self.client.set(
+            self._clave(principal.id), f"{principal.role}|{int(bool(principal.is_active))}",
+            px=int(self.ttl * 1000), nx=True
+        )
+
+    def invalidate(self, *jugador_ids):
+        pipe = self.client.pipeline(transaction=False)
+        for jugador_id in jugador_ids:
+            pipe.set(self._clave(jugador_id), REVOCADO, px=BLOQUEO_TRAS_INVALIDAR * 1000)
+        pipe.execute()
+
+    def clear(self):
+        claves = list(self.client.scan_iter(f"{PREFIJO}:*"))
+        if claves:
+            self.client.delete(*claves)
+
+
+class PrincipalCache:
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = MemoryPrincipals(max_entries, ttl)
+
+    def init_app(self, app):
+        self.max_entries = app.config.setdefault("PRINCIPAL_CACHE_MAX_ENTRIES", self.max_entries)
+        self.ttl = app.config.setdefault("PRINCIPAL_CACHE_TTL", self.ttl)
+        url = app.config.setdefault("PRINCIPAL_CACHE_REDIS_URL", REDIS_URL)
+
+        self.backend = None
+        if not self.ttl or self.ttl <= 0:
+            return
+        if url:
+            try:
+                client = Redis.from_url(url, socket_connect_timeout=0.5, socket_timeout=1)
+                client.ping()
+                self.backend = RedisPrincipals(client, self.ttl)
+                return
+            except RedisError as e:
+                motivo = e
+        else:
+            motivo = "sin REDIS_URL"
+        if app.debug or app.testing:
+            print(f"⚠️ Redis no disponible para la caché de roles ({motivo}); se usa memoria del proceso")
+            self.backend = MemoryPrincipals(self.max_entries, self.ttl)
+        else:
+            # Una caché por worker haría que una revocación tarde hasta el TTL en los demás
+            print(f"⚠️ Redis no disponible para la caché de roles ({motivo}); los roles se leen de la base en cada petición")
+
+    def get(self, jugador_id):
+        if self.backend is None:
+            return None
+        try:
+            return self.backend.get(jugador_id)
+        except RedisError as e:
+            print(f"⚠️ No se pudo leer la caché de roles: {e}")
+            return None
+
+    def set(self, principal):
+        if self.backend is None:
+            return
+        try:
+            self.backend.set(principal)
+        except RedisError as e:
+            print(f"⚠️ No se pudo guardar en la caché de roles: {e}")
+
+    def invalidate(self, *jugador_ids):
+        if self.backend is None or not jugador_ids:
+            return
+        try:
+            self.backend.invalidate(*jugador_ids)
+        except RedisError as e:
+            print(f"⚠️ No se pudo invalidar la caché de roles de {sorted(jugador_ids)}: {e}")
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+def get_principal():
+    """
+    Devuelve el `Principal` del usuario del JWT de la petición (o None si no
+    hay token o el usuario no existe). Debe llamarse con el JWT ya verificado.
+    """
+    identidad = get_jwt_identity()
+    resuelto = g.get("_principal")
+    if resuelto is not None and resuelto[0] == identidad:
+        return resuelto[1]
+
+    principal = None
+    if identidad is not None:
+        try:
+            jugador_id = int(identidad)
+        except (TypeError, ValueError):
+            jugador_id = None
+
+        if jugador_id is not None:
+            principal = principal_cache.get(jugador_id)
+            if principal is None:
+                fila = db.session.query(Jugador.role, Jugador.is_active).filter(Jugador.id == jugador_id).first()
+                if fila is not None:
+                    principal = Principal(jugador_id, fila.role, fila.is_active is not False)
+                    principal_cache.set(principal)
+
+    g._principal = (identidad, principal)
+    return principal
+
+
+def get_optional_principal():
+    """Como `get_principal`, pero para rutas públicas: sin token (o con un token inválido) devuelve None."""
+    try:
+        if not verify_jwt_in_request(optional=True):
+            return None
+    except Exception:
+        return None
+    return get_principal()
+
+
+def roles_required(*roles, mensaje="Acceso denegado"):
+    """Exige un JWT válido de un usuario activo con alguno de los `roles`; si no, responde 403."""
+    def decorator(view):
+        @wraps(view)
+        @jwt_required()
+        def wrapper(*args, **kwargs):
+            principal = get_principal()
+            if principal is None or not principal.is_active or principal.role not in roles:
+                return jsonify({"error": mensaje}), 403
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# 🔹 Invalidación: cualquier cambio de rol o de is_active (incluido Flask-Admin) o el borrado del jugador
+
+@event.listens_for(db.session, "before_flush")
+def registrar_cambios_principales(session, flush_context, instances):
+    cambiados = session.info.setdefault("principales_cambiados", set())
+    for obj in session.dirty:
+        if isinstance(obj, Jugador):
+            estado = inspect(obj)
+            if estado.attrs.role.history.has_changes() or estado.attrs.is_active.history.has_changes():
+                cambiados.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Jugador):
+            cambiados.add(obj.id)
+
+
+@event.listens_for(db.session, "after_commit")
+def invalidar_principales(session):
+    cambiados = session.info.pop("principales_cambiados", None)
+    if cambiados:
+        principal_cache.invalidate(*cambiados)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def descartar_cambios_principales(session, previous_transaction):
+    session.info.pop("principales_cambiados", None)
@@ -0,0 +1,279 @@
+"""
+Cuadro de los torneos de `eliminacion`.
+
+El cuadro se guarda como filas de `CruceEliminacion`, una por ronda y posición:
+el ganador del cruce (ronda, posicion) pasa al lado A (posición par) o B
+(impar) del cruce (ronda + 1, posicion // 2). Se crea con el fixture
+(`crear_cuadro`), con los byes de la primera ronda ya resueltos.
+
+Un listener de la sesión hace avanzar el cuadro cuando se escribe un `Partido`
+del torneo (incluido Flask-Admin): un partido finalizado entre los dos equipos
+de un cruce abierto se enlaza a ese cruce (reemplazando al programado, si lo
+había), su ganador pasa al cruce siguiente y, si ese cruce ya tiene sus dos
+equipos, se programa su partido. Solo se tocan el cruce del partido y el
+siguiente, nunca el cuadro entero.
+
+`/torneos/<id>/bracket` devuelve el árbol armado con una consulta y cacheado
+con la etiqueta `bracket:<id>`, que se invalida al confirmar cualquier cambio
+del cuadro.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, event, inspect, or_
+from sqlalchemy.orm import aliased
+
+from api.models import db, Torneo, Equipo, Partido, CruceEliminacion
+from api.cache import response_cache
+from api.standings import ESTADO_FINALIZADO, ESTADO_PROGRAMADO, CAMPOS_RESULTADO
+
+FORMATO_ELIMINACION = "eliminacion"
+DIAS_ENTRE_RONDAS = 7
+NOMBRES_DE_RONDA = {1: "Final", 2: "Semifinal", 4: "Cuartos de final", 8: "Octavos de final"}
+
+
+def _etiqueta(torneo_id):
+    return f"bracket:{torneo_id}"
+
+
+def _lado(cruce):
+    """Columna del cruce siguiente que ocupa el ganador de `cruce`."""
+    return "equipo_a_id" if cruce.posicion % 2 == 0 else "equipo_b_id"
+
+
+def _partido_programado(cruce, fecha):
+    return Partido(
+        torneo_id=cruce.torneo_id, equipo_a_id=cruce.equipo_a_id, equipo_b_id=cruce.equipo_b_id,
+        fecha=fecha, estado=ESTADO_PROGRAMADO, goles_equipo_a=0, goles_equipo_b=0
+    )
+
+
+def _ganador(partido):
+    """Equipo que gana el partido, o None si no está finalizado o terminó empatado."""
+    if (partido.estado or ESTADO_FINALIZADO) != ESTADO_FINALIZADO:
+        return None
+    goles_a, goles_b = partido.goles_equipo_a or 0, partido.goles_equipo_b or 0
+    if goles_a == goles_b:
+        return None
+    return partido.equipo_a_id if goles_a > goles_b else partido.equipo_b_id
+
+
+def _siguiente(session, cruce):
+    with session.no_autoflush:
+        return session.query(CruceEliminacion).filter_by(
+            torneo_id=cruce.torneo_id, ronda=cruce.ronda + 1, posicion=cruce.posicion // 2
+        ).first()
+
+
+def fijar_ganador(session, cruce, ganador_id, fecha_siguiente):
+    """
+    Decide (o deshace, con None) el ganador de `cruce` y lo lleva al cruce
+    siguiente. Si ese cruce queda con sus dos equipos, su partido se programa
+    en `fecha_siguiente`.
+    """
+    if cruce.ganador_id == ganador_id:
+        return
+    cruce.ganador_id = ganador_id
+
+    siguiente = _siguiente(session, cruce)
+    if siguiente is None:
+        return  # Era la final: `ganador_id` es el campeón
+
+    lado = _lado(cruce)
+    setattr(siguiente, lado, ganador_id)
+    partido = siguiente.partido
+    if partido is not None:
+        # ⚠️ Si el partido siguiente ya se jugó, su resultado se respeta aunque cambie un equipo
+        if partido.estado == ESTADO_PROGRAMADO:
+            if ganador_id is None:
+                siguiente.partido = None
+                session.delete(partido)
+            else:
+                setattr(partido, lado, ganador_id)
+    elif siguiente.equipo_a_id is not None and siguiente.equipo_b_id is not None:
+        siguiente.partido = _partido_programado(siguiente, fecha_siguiente)
+        session.add(siguiente.partido)
+
+
+def crear_cuadro(torneo_id, sembrados, fecha, dias_entre_rondas=DIAS_ENTRE_RONDAS):
+    """
+    Crea los cruces de todas las rondas para `sembrados` (equipos por posición
+    del cuadro, con None en los huecos; longitud potencia de 2) y los partidos
+    programados de la primera ronda. Los equipos con bye pasan directo a la
+    segunda. No confirma la transacción. Devuelve los partidos creados.
+    """
+    session = db.session
+    tamano = len(sembrados)
+    rondas = tamano.bit_length() - 1
+
+    cruces, primera = [], []
+    for ronda in range(1, rondas + 1):
+        for posicion in range(tamano >> ronda):
+            cruce = CruceEliminacion(torneo_id=torneo_id, ronda=ronda, posicion=posicion)
+            if ronda == 1:
+                cruce.equipo_a_id, cruce.equipo_b_id = sembrados[2 * posicion], sembrados[2 * posicion + 1]
+                primera.append(cruce)
+            cruces.append(cruce)
+            session.add(cruce)
+
+    for cruce in primera:
+        if cruce.equipo_a_id is not None and cruce.equipo_b_id is not None:
+            cruce.partido = _partido_programado(cruce, fecha)
+    session.flush()  # Los byes buscan su cruce siguiente en la base
+
+    for cruce in primera:
+        if cruce.partido is None:
+            bye = cruce.equipo_a_id if cruce.equipo_a_id is not None else cruce.equipo_b_id
+            fijar_ganador(session, cruce, bye, fecha + timedelta(days=dias_entre_rondas))
+    return [cruce.partido for cruce in cruces if cruce.partido is not None]
+
+
+def obtener_cuadro(torneo_id):
+    """Árbol del cuadro por rondas, con equipos, partidos y campeón. None si el torneo no existe."""
+    torneo = db.session.query(Torneo.id, Torneo.nombre, Torneo.formato).filter(Torneo.id == torneo_id).first()
+    if torneo is None:
+        return None
+
+    equipo_a = aliased(Equipo)
+    equipo_b = aliased(Equipo)
+    filas = db.session.query(
+        CruceEliminacion, equipo_a.nombre, equipo_b.nombre,
+        Partido.fecha, Partido.estado, Partido.goles_equipo_a, Partido.goles_equipo_b
+    ).outerjoin(
+        equipo_a, equipo_a.id == CruceEliminacion.equipo_a_id
+    ).outerjoin(
+        equipo_b, equipo_b.id == CruceEliminacion.equipo_b_id
+    ).outerjoin(
+        Partido, Partido.id == CruceEliminacion.partido_id
+    ).filter(
+        CruceEliminacion.torneo_id == torneo_id
+    ).order_by(CruceEliminacion.ronda, CruceEliminacion.posicion).all()
+
+    def equipo(equipo_id, nombre):
+        return {"id": equipo_id, "nombre": nombre} if equipo_id is not None else None
+
+    rondas = {}
+    for cruce, nombre_a, nombre_b, fecha, estado, goles_a, goles_b in filas:
+        rondas.setdefault(cruce.ronda, []).append({
+            "posicion": cruce.posicion,
+            "equipo_a": equipo(cruce.equipo_a_id, nombre_a),
+            "equipo_b": equipo(cruce.equipo_b_id, nombre_b),
+            "ganador_id": cruce.ganador_id,
+            "partido": {
+                "id": cruce.partido_id,
+                "fecha": fecha.strftime("%Y-%m-%d %H:%M:%S"),
+                "estado": estado,
+                "goles_equipo_a": goles_a,
+                "goles_equipo_b": goles_b
+            } if cruce.partido_id is not None else None
+        })
+
+    campeon = None
+    if rondas:
+        final = rondas[max(rondas)][0]
+        for lado in ("equipo_a", "equipo_b"):
+            if final[lado] and final[lado]["id"] == final["ganador_id"]:
+                campeon = final[lado]
+
+    return {
+        "torneo_id": torneo.id,
+        "torneo": torneo.nombre,
+        "formato": torneo.formato,
+        "rondas": [
+            {"ronda": ronda, "nombre": NOMBRES_DE_RONDA.get(len(cruces), f"Ronda {ronda}"), "cruces": cruces}
+            for ronda, cruces in sorted(rondas.items())
+        ],
+        "campeon": campeon
+    }
+
+
+# 🔹 Avance del cuadro con cada partido escrito
+
+def _es_eliminacion(session, torneo_id, formatos):
+    if torneo_id not in formatos:
+        with session.no_autoflush:
+            torneo = session.get(Torneo, torneo_id) if torneo_id is not None else None
+        eliminacion = torneo is not None and torneo.formato == FORMATO_ELIMINACION and torneo not in session.deleted
+        formatos[torneo_id] = eliminacion
+    return formatos[torneo_id]
+
+
+def _cruce_del_partido(session, partido):
+    """Cruce ya enlazado al partido o, si está finalizado, el cruce abierto entre sus dos equipos."""
+    with session.no_autoflush:
+        if partido.id is not None:
+            cruce = session.query(CruceEliminacion).filter(CruceEliminacion.partido_id == partido.id).first()
+            if cruce is not None:
+                return cruce
+        if _ganador(partido) is None:
+            return None
+
+        a, b = partido.equipo_a_id, partido.equipo_b_id
+        cruce = session.query(CruceEliminacion).filter(
+            CruceEliminacion.torneo_id == partido.torneo_id,
+            CruceEliminacion.ganador_id.is_(None),
+            or_(
+                and_(CruceEliminacion.equipo_a_id == a, CruceEliminacion.equipo_b_id == b),
+                and_(CruceEliminacion.equipo_a_id == b, CruceEliminacion.equipo_b_id == a),
+            )
+        ).first()
+    if cruce is None:
+        return None
+
+    # El partido cargado reemplaza al programado del cruce
+    anterior = cruce.partido
+    if anterior is not None and anterior is not partido and anterior.estado == ESTADO_PROGRAMADO:
+        session.delete(anterior)
+    cruce.partido = partido
+    return cruce
+
+
+def _resultado_modificado(partido):
+    estado = inspect(partido)
+    return any(estado.attrs[campo].history.has_changes() for campo in CAMPOS_RESULTADO)
+
+
+@event.listens_for(db.session, "before_flush")
+def avanzar_cuadros(session, flush_context, instances):
+    """Enlaza los partidos cargados a su cruce y hace avanzar a los ganadores."""
+    cambiados = session.info.setdefault("cuadros_cambiados", set())
+    formatos = {}
+    # Lo que agrega o borra el propio cuadro durante el flush no se vuelve a procesar
+    nuevos, modificados, eliminados = list(session.new), list(session.dirty), list(session.deleted)
+
+    for obj in nuevos + modificados + eliminados:
+        if isinstance(obj, CruceEliminacion):
+            cambiados.add(obj.torneo_id)
+
+    for obj in eliminados:
+        if isinstance(obj, Partido) and obj.id is not None and _es_eliminacion(session, obj.torneo_id, formatos):
+            with session.no_autoflush:
+                cruce = session.query(CruceEliminacion).filter(CruceEliminacion.partido_id == obj.id).first()
+            if cruce is not None and cruce not in session.deleted and cruce.partido is obj:
+                cambiados.add(obj.torneo_id)
+                cruce.partido = None
+                fijar_ganador(session, cruce, None, None)
+
+    for obj in nuevos + [obj for obj in modificados if isinstance(obj, Partido) and _resultado_modificado(obj)]:
+        if isinstance(obj, Partido) and _es_eliminacion(session, obj.torneo_id, formatos):
+            cruce = _cruce_del_partido(session, obj)
+            if cruce is not None:
+                cambiados.add(obj.torneo_id)
+                fecha = obj.fecha or datetime.utcnow()  # El default de `fecha` se aplica al insertar
+                fijar_ganador(session, cruce, _ganador(obj), fecha + timedelta(days=DIAS_ENTRE_RONDAS))
+
+
+def registrar_cuadro_eliminado(session, torneo_id):
+    """Marca para invalidar el cuadro de `torneo_id` borrado con `Query.delete`, que no pasa por `before_flush`."""
+    session.info.setdefault("cuadros_cambiados", set()).add(torneo_id)
+
+
+@event.listens_for(db.session, "after_commit")
+def invalidar_cuadros(session):
+    cambiados = session.info.pop("cuadros_cambiados", None)
+    if cambiados:
+        response_cache.invalidate(*[_etiqueta(torneo_id) for torneo_id in cambiados])
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def descartar_cuadros_cambiados(session, previous_transaction):
+    session.info.pop("cuadros_cambiados", None)
@@ -0,0 +1,153 @@
+"""
+Caché de respuestas para los GET públicos del blueprint `api`.
+
+Guarda el cuerpo serializado de cada respuesta por endpoint y argumentos, con
+expulsión LRU y un ETag fuerte para que el navegador reciba `304 Not Modified`.
+Cada entrada lleva etiquetas ("torneos", "tablas:3", ...) y los endpoints de
+escritura invalidan solo las etiquetas que afectan. Las tablas y los rankings
+("tablas", "tablas:<torneo_id>") se invalidan tras el commit desde
+`api.standings` y `api.leaderboards`, así que también los cubren las
+ediciones del panel de Flask-Admin.
+
+Una respuesta calculada mientras se invalidaba alguna de sus etiquetas se
+sirve pero no se guarda: pudo leer los datos de antes del commit.
+
+La caché vive en cada proceso: con varios workers de gunicorn la invalidación
+solo llega al worker que atendió la escritura, por eso las entradas caducan
+además tras `RESPONSE_CACHE_TTL` segundos.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from hashlib import sha1
+
+from flask import current_app, request, make_response
+
+RespuestaCacheada = namedtuple("RespuestaCacheada", ["body", "mimetype", "etag", "expira"])
+
+
+class ResponseCache:
+    def __init__(self, max_entries=512, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entradas = OrderedDict()
+        self._claves_por_etiqueta = {}
+        self._etiquetas_por_clave = {}
+        self._generacion = 0  # Sube con cada invalidación
+        self._invalidada_en = {}  # etiqueta → generación de su última invalidación
+        self._limpiada_en = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_entries = app.config.setdefault("RESPONSE_CACHE_MAX_ENTRIES", self.max_entries)
+        self.ttl = app.config.setdefault("RESPONSE_CACHE_TTL", self.ttl)
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            if entrada.expira < time.monotonic():
+                self._quitar(clave)
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada
+
+    def generacion(self):
+        """Marca a pasar a `set(desde=...)`, tomada antes de leer los datos de la respuesta."""
+        with self._lock:
+            return self._generacion
+
+    def set(self, clave, body, mimetype, etiquetas, desde=None):
+        """
+        Guarda la respuesta y la devuelve. Con `desde`, no la guarda si alguna
+        de sus etiquetas se invalidó después de esa generación.
+        """
+        entrada = RespuestaCacheada(body, mimetype, sha1(body).hexdigest(), time.monotonic() + self.ttl)
+        with self._lock:
+            if desde is not None and self._invalidada_despues(etiquetas, desde):
+                return entrada
+            self._quitar(clave)
+            self._entradas[clave] = entrada
+            self._etiquetas_por_clave[clave] = etiquetas
+            for etiqueta in etiquetas:
+                self._claves_por_etiqueta.setdefault(etiqueta, set()).add(clave)
+            while len(self._entradas) > self.max_entries:
+                self._quitar(next(iter(self._entradas)))
+        return entrada
+
+    def invalidate(self, *etiquetas):
+        """Elimina todas las entradas marcadas con alguna de las etiquetas."""
+        with self._lock:
+            self._generacion += 1
+            for etiqueta in etiquetas:
+                etiqueta = str(etiqueta).lower()
+                self._invalidada_en[etiqueta] = self._generacion
+                for clave in list(self._claves_por_etiqueta.get(etiqueta, ())):
+                    self._quitar(clave)
+
+    def clear(self):
+        with self._lock:
+            self._generacion += 1
+            self._limpiada_en = self._generacion
+            self._invalidada_en.clear()
+            self._entradas.clear()
+            self._claves_por_etiqueta.clear()
+            self._etiquetas_por_clave.clear()
+
+    def _invalidada_despues(self, etiquetas, desde):
+        if self._limpiada_en > desde:
+            return True
+        return any(self._invalidada_en.get(etiqueta, 0) > desde for etiqueta in etiquetas)
+
+    def _quitar(self, clave):
+        self._entradas.pop(clave, None)
+        for etiqueta in self._etiquetas_por_clave.pop(clave, ()):
+            claves = self._claves_por_etiqueta.get(etiqueta)
+            if claves is not None:
+                claves.discard(clave)
+                if not claves:
+                    del self._claves_por_etiqueta[etiqueta]
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+response_cache = ResponseCache()
+
+
+def _responder(entrada):
+    response = current_app.response_class(entrada.body, mimetype=entrada.mimetype)
+    response.set_etag(entrada.etag)
+    response.cache_control.no_cache = True  # El navegador siempre revalida con If-None-Match
+    return response.make_conditional(request)
+
+
+def cached_response(*etiquetas):
+    """
+    Cachea la respuesta 200 de un GET. Las etiquetas pueden usar los argumentos
+    de la ruta, p. ej. `cached_response("tablas:{torneo_id}")`.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            clave = (
+                request.endpoint,
+                tuple(sorted(kwargs.items())),
+                tuple(sorted(request.args.items(multi=True)))
+            )
+            entrada = response_cache.get(clave)
+            if entrada is None:
+                desde = response_cache.generacion()
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough:
+                    return response
+                entrada = response_cache.set(
+                    clave, response.get_data(), response.mimetype,
+                    {etiqueta.format(**kwargs).lower() for etiqueta in etiquetas},
+                    desde=desde
+                )
+            return _responder(entrada)
+        return wrapper
+    return decorator
@@ -1,23 +1,48 @@
 import click
-from api.models import db, Jugador
+from api.standings import reconstruir_tabla_posiciones
+from api.leaderboards import leaderboards
+from api.player_stats import reconstruir_jugador_stats
+from api.seed import seed_command, PASSWORD_POR_DEFECTO
 
 def setup_commands(app):
     
-    @app.cli.command("insert-test-users")
-    @click.argument("count")
-    def insert_test_users(count):
-        print("Creating test users")
-        for x in range(1, int(count) + 1):
-            jugador = Jugador()
-            jugador.email = "test_user" + str(x) + "@test.com"
-            jugador.password = "123456"
-            jugador.is_active = True
-            db.session.add(jugador)
-            db.session.commit()
-            print("Jugador: ", jugador.email, " creado.")
+    @app.cli.command("seed")
+    @click.option("--torneos", type=int, default=12, show_default=True, help="Torneos (recorren cada modalidad y formato)")
+    @click.option("--equipos-por-torneo", type=int, default=12, show_default=True)
+    @click.option("--jugadores-por-equipo", type=int, default=8, show_default=True)
+    @click.option("--partidos", type=int, default=2000, show_default=True, help="Partidos en total, repartidos entre los torneos")
+    @click.option("--agentes-libres", type=int, default=200, show_default=True, help="Jugadores sin equipo con convocatoria y ofertas")
+    @click.option("--asistencias", type=int, default=10000, show_default=True)
+    @click.option("--noticias", type=int, default=50, show_default=True)
+    @click.option("--semilla", type=int, default=1, show_default=True, help="La misma semilla genera los mismos datos")
+    @click.option("--lote", type=int, default=10000, show_default=True, help="Filas por INSERT/commit")
+    @click.option("--password", default=PASSWORD_POR_DEFECTO, show_default=True, help="Contraseña de todos los jugadores generados")
+    def seed(**opciones):
+        """Genera una liga sintética completa con inserciones por lotes."""
+        print("Generando datos de prueba...")
+        seed_command(**opciones)
 
-        print("Todos los jugadores de prueba han sido creados")
+    @app.cli.command("rebuild-standings")
+    @click.option("--torneo-id", type=int, default=None, help="Reconstruir solo este torneo")
+    def rebuild_standings(torneo_id):
+        """Recalcula la tabla de posiciones desde cero a partir de los partidos."""
+        filas = reconstruir_tabla_posiciones(torneo_id)
+        print(f"Tabla de posiciones reconstruida: {filas} filas")
 
-    @app.cli.command("insert-test-data")
-    def insert_test_data():
-        pass
+
+    @app.cli.command("rebuild-player-stats")
+    @click.option("--torneo-id", type=int, default=None, help="Reconstruir solo este torneo")
+    def rebuild_player_stats(torneo_id):
+        """Recalcula las estadísticas acumuladas de los jugadores (jugador_stats) a partir de los partidos."""
+        filas = reconstruir_jugador_stats(torneo_id)
+        print(f"Estadísticas de jugadores reconstruidas: {filas} filas")
+        torneos = leaderboards.reconstruir(torneo_id)
+        print(f"Rankings reconstruidos: {torneos} torneos y el ranking global")
+
+
+    @app.cli.command("rebuild-leaderboards")
+    @click.option("--torneo-id", type=int, default=None, help="Reconstruir solo este torneo (y el global)")
+    def rebuild_leaderboards(torneo_id):
+        """Recarga los rankings de goleadores, asistidores, MVPs y menciones desde la base de datos."""
+        torneos = leaderboards.reconstruir(torneo_id)
+        print(f"Rankings reconstruidos: {torneos} torneos y el ranking global")
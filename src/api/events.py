@@ -0,0 +1,345 @@
+"""
+Eventos en vivo de cada torneo (`/stream/torneos/<id>`, Server-Sent Events).
+
+Al confirmar un commit que escribe partidos (`registrar_partido`, el lote,
+Flask-Admin...), un listener de la sesión publica solo lo que cambió:
+
+- `partido`: el partido nuevo o modificado (`partido_eliminado`: su id);
+- `posicion`: la fila de la tabla de posiciones de cada equipo afectado;
+- `jugador`: los totales del jugador en el torneo, que mueven los rankings.
+
+Cada torneo tiene una secuencia de ids y un historial acotado
+(`EVENTS_HISTORY` eventos), de modo que un cliente que se reconecta con
+`Last-Event-ID` recibe lo que se perdió. Si ese id ya no está en el historial
+(o el cliente no lee a tiempo) recibe `reset` y debe volver a pedir el estado
+completo.
+
+Cada stream ocupa un hilo del worker durante toda su vida, así que hay un
+máximo de `EVENTS_MAX_STREAMS` abiertos por proceso (los siguientes reciben
+503) y cada uno se cierra a los `EVENTS_MAX_STREAM_SECONDS`: el navegador se
+reconecta solo con `Last-Event-ID` y no pierde eventos.
+
+Sin Redis la difusión es dentro del proceso. Con `EVENTS_REDIS_URL` los
+eventos se publican en un canal de Redis, los ids salen de un INCR compartido
+y un hilo de cada worker de gunicorn reparte los mensajes a sus clientes. Si
+publicar en Redis falla, los eventos no se entregan con ids inventados: los
+clientes de ese worker reciben `reset` y vuelven a pedir el estado.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from redis import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import event
+
+from api.models import db, Partido, TablaPosicion, JugadorStats
+from extensions import REDIS_URL
+
+PREFIJO = "habbofutbol:eventos"
+CANAL = f"{PREFIJO}:canal"
+
+# Reserva los ids de los eventos y publica "<último id>|<mensaje>"
+PUBLICAR = """
+local ultimo = redis.call('INCRBY', KEYS[1], ARGV[1])
+redis.call('PUBLISH', ARGV[2], ultimo .. '|' .. ARGV[3])
+return ultimo
+"""
+
+
+def _secuencia(torneo_id):
+    return f"{PREFIJO}:secuencia:{torneo_id}"
+
+
+def formatear(evento_id, tipo, datos):
+    """Un evento en formato SSE (`id`, `event`, `data` y línea en blanco)."""
+    return f"id: {evento_id}\nevent: {tipo}\ndata: {json.dumps(datos, separators=(',', ':'))}\n\n"
+
+
+class Suscripcion:
+    def __init__(self, maximo):
+        self.cola = queue.Queue(maxsize=maximo)
+        self.desbordada = False
+
+
+class CanalTorneo:
+    def __init__(self, historial):
+        self.ultimo_id = 0
+        self.historial = deque(maxlen=historial)  # (id, tipo, datos)
+        self.suscripciones = set()
+
+
+class EventBus:
+    def __init__(self, historial=500, keepalive=15.0, cola=1000, max_streams=4, duracion=300.0):
+        self.historial = historial
+        self.keepalive = keepalive
+        self.cola = cola
+        self.max_streams = max_streams
+        self.duracion = duracion
+        self.redis = None
+        self._canales = {}
+        self._lock = threading.Lock()
+        self._oyente_pid = None
+        self._abiertos = 0
+
+    def init_app(self, app):
+        self.historial = app.config.setdefault("EVENTS_HISTORY", self.historial)
+        self.keepalive = app.config.setdefault("EVENTS_KEEPALIVE", self.keepalive)
+        self.cola = app.config.setdefault("EVENTS_QUEUE_SIZE", self.cola)
+        self.max_streams = app.config.setdefault("EVENTS_MAX_STREAMS", self.max_streams)
+        self.duracion = app.config.setdefault("EVENTS_MAX_STREAM_SECONDS", self.duracion)
+        url = app.config.setdefault("EVENTS_REDIS_URL", REDIS_URL)
+        if not url:
+            return
+        try:
+            client = Redis.from_url(url, socket_connect_timeout=0.5, socket_timeout=1)
+            client.ping()
+            self.redis = client
+            # INCRBY y PUBLISH en un script (atómico): los mensajes salen en el orden de sus ids
+            self._publicar_en_redis = client.register_script(PUBLICAR)
+        except RedisError as e:
+            print(f"⚠️ Redis no disponible para los eventos ({e}); cada worker solo ve sus propios eventos")
+
+    def _canal(self, torneo_id):
+        canal = self._canales.get(torneo_id)
+        if canal is None:
+            canal = self._canales[torneo_id] = CanalTorneo(self.historial)
+        return canal
+
+    # 🔹 Publicación
+
+    def publicar(self, torneo_id, eventos):
+        """Publica [(tipo, datos)] en el canal del torneo y les asigna ids consecutivos."""
+        if not eventos:
+            return
+        if self.redis is not None:
+            self._asegurar_oyente()
+            try:
+                self._publicar_en_redis(
+                    keys=[_secuencia(torneo_id)],
+                    args=[len(eventos), CANAL, json.dumps({"torneo_id": torneo_id, "eventos": eventos})]
+                )
+                return
+            except RedisError as e:
+                # ⚠️ Sin el INCR compartido no hay ids válidos: inventarlos chocaría con los de Redis
+                print(f"⚠️ No se pudieron publicar los eventos en Redis ({e}); los streams de este worker reciben reset")
+                with self._lock:
+                    self._reiniciar(self._canal(torneo_id))
+                return
+
+        with self._lock:
+            canal = self._canal(torneo_id)
+            self._agregar(canal, [(canal.ultimo_id + i + 1, tipo, datos) for i, (tipo, datos) in enumerate(eventos)])
+
+    def _agregar(self, canal, numerados):
+        for evento in numerados:
+            if evento[0] <= canal.ultimo_id:
+                continue  # Ya entregado
+            canal.historial.append(evento)
+            canal.ultimo_id = evento[0]
+            for suscripcion in list(canal.suscripciones):
+                try:
+                    suscripcion.cola.put_nowait(evento)
+                except queue.Full:
+                    # El cliente no lee a tiempo: cuando vacíe su cola se le pide que se reconecte
+                    suscripcion.desbordada = True
+                    canal.suscripciones.discard(suscripcion)
+
+    def _reiniciar(self, canal):
+        """Pide a los clientes del canal que recarguen el estado completo (reciben `reset`)."""
+        for suscripcion in canal.suscripciones:
+            suscripcion.desbordada = True
+        canal.suscripciones.clear()
+
+    def _asegurar_oyente(self):
+        """Un hilo por proceso (se arranca tras el fork de gunicorn) reparte los mensajes del canal de Redis."""
+        with self._lock:
+            if self._oyente_pid == os.getpid():
+                return
+            self._oyente_pid = os.getpid()
+        threading.Thread(target=self._escuchar, name="eventos-redis", daemon=True).start()
+
+    def _escuchar(self):
+        opciones = dict(self.redis.connection_pool.connection_kwargs, socket_timeout=None)
+        while True:
+            pubsub = None
+            try:
+                pubsub = Redis(**opciones).pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CANAL)
+                for mensaje in pubsub.listen():
+                    ultimo, contenido = mensaje["data"].split(b"|", 1)
+                    contenido = json.loads(contenido)
+                    eventos = contenido["eventos"]
+                    primero = int(ultimo) - len(eventos) + 1
+                    with self._lock:
+                        self._agregar(self._canal(contenido["torneo_id"]), [
+                            (primero + i, tipo, datos) for i, (tipo, datos) in enumerate(eventos)
+                        ])
+            except Exception as e:
+                # Cualquier fallo (Redis, un mensaje mal formado...) no debe matar el hilo: se reconecta
+                print(f"⚠️ Se perdió la suscripción a los eventos de Redis ({e!r}); reintentando")
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+                time.sleep(1)
+
+    # 🔹 Suscripción
+
+    def reservar(self):
+        """Reserva un lugar para un stream; False si el proceso ya tiene `max_streams` abiertos."""
+        with self._lock:
+            if self._abiertos >= self.max_streams:
+                return False
+            self._abiertos += 1
+            return True
+
+    def liberar(self):
+        with self._lock:
+            self._abiertos = max(0, self._abiertos - 1)
+
+    def suscribir(self, torneo_id, ultimo_id=None):
+        """
+        Devuelve (suscripción, eventos pendientes, reiniciar). `reiniciar` es el
+        id desde el que seguir si el cliente debe recargar el estado completo
+        porque `ultimo_id` ya no está en el historial; None si no hace falta.
+        """
+        if self.redis is not None:
+            self._asegurar_oyente()
+        suscripcion = Suscripcion(self.cola)
+        with self._lock:
+            canal = self._canal(torneo_id)
+            canal.suscripciones.add(suscripcion)
+            if ultimo_id is None or ultimo_id == canal.ultimo_id:
+                return suscripcion, [], None
+            primero = canal.historial[0][0] if canal.historial else canal.ultimo_id + 1
+            if ultimo_id > canal.ultimo_id or ultimo_id < primero - 1:
+                return suscripcion, [], canal.ultimo_id
+            return suscripcion, [evento for evento in canal.historial if evento[0] > ultimo_id], None
+
+    def cancelar(self, torneo_id, suscripcion):
+        with self._lock:
+            canal = self._canales.get(torneo_id)
+            if canal is not None:
+                canal.suscripciones.discard(suscripcion)
+
+    def stream(self, torneo_id, ultimo_id=None):
+        """
+        Generador con el cuerpo de la respuesta SSE: pendientes, eventos nuevos y
+        keep-alives. Termina a los `duracion` segundos para que el cliente se reconecte.
+        """
+        suscripcion, pendientes, reiniciar = self.suscribir(torneo_id, ultimo_id)
+        fin = time.monotonic() + self.duracion
+        try:
+            yield "retry: 3000\n\n"
+            if reiniciar is not None:
+                yield formatear(reiniciar, "reset", {"torneo_id": torneo_id})
+            for evento in pendientes:
+                yield formatear(*evento)
+
+            while True:
+                restante = fin - time.monotonic()
+                if restante <= 0:
+                    return  # El cliente se reconecta con Last-Event-ID y recibe lo pendiente
+                if suscripcion.desbordada and suscripcion.cola.empty():
+                    with self._lock:
+                        ultimo = self._canal(torneo_id).ultimo_id
+                    yield formatear(ultimo, "reset", {"torneo_id": torneo_id})
+                    return
+                try:
+                    evento = suscripcion.cola.get(timeout=min(self.keepalive, restante))
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield formatear(*evento)
+        finally:
+            self.cancelar(torneo_id, suscripcion)
+
+
+event_bus = EventBus()
+
+
+# 🔹 Captura: se arma el delta en cada flush y se publica tras el commit
+
+def _partido(partido):
+    return {
+        "id": partido.id,
+        "equipo_a_id": partido.equipo_a_id,
+        "equipo_b_id": partido.equipo_b_id,
+        "goles_equipo_a": partido.goles_equipo_a,
+        "goles_equipo_b": partido.goles_equipo_b,
+        "estado": partido.estado,
+        "fecha": partido.fecha.strftime("%Y-%m-%d %H:%M:%S") if partido.fecha else None
+    }
+
+
+def _posicion(fila):
+    return {
+        "equipo_id": fila.equipo_id,
+        "puntos": fila.puntos,
+        "partidos_jugados": fila.partidos_jugados,
+        "ganados": fila.ganados,
+        "empatados": fila.empatados,
+        "perdidos": fila.perdidos,
+        "goles_favor": fila.goles_favor,
+        "goles_contra": fila.goles_contra,
+        "diferencia_goles": fila.diferencia_goles
+    }
+
+
+def _jugador(fila):
+    return {
+        "jugador_id": fila.jugador_id,
+        "partidos_jugados": fila.partidos_jugados,
+        "goles": fila.goles,
+        "asistencias": fila.asistencias,
+        "mvps": fila.mvps,
+        "menciones": fila.menciones
+    }
+
+
+@event.listens_for(db.session, "after_flush")
+def registrar_eventos(session, flush_context):
+    """Guarda el último estado de cada partido, fila de la tabla y jugador escritos en el flush."""
+    pendientes = session.info.setdefault("eventos_pendientes", {})
+
+    def agregar(torneo_id, clave, tipo, datos):
+        pendientes.setdefault(torneo_id, {})[clave] = (tipo, datos)
+
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Partido):
+            agregar(obj.torneo_id, ("partido", obj.id), "partido", _partido(obj))
+        elif isinstance(obj, TablaPosicion):
+            agregar(obj.torneo_id, ("posicion", obj.equipo_id), "posicion", _posicion(obj))
+        elif isinstance(obj, JugadorStats):
+            agregar(obj.torneo_id, ("jugador", obj.jugador_id), "jugador", _jugador(obj))
+
+    for obj in session.deleted:
+        if isinstance(obj, Partido):
+            agregar(obj.torneo_id, ("partido", obj.id), "partido_eliminado", {"id": obj.id})
+
+
+def registrar_partidos_eliminados(session, torneo_id, partido_ids):
+    """Agrega `partido_eliminado` por cada partido borrado con `Query.delete`, que no pasa por `after_flush`."""
+    eventos = session.info.setdefault("eventos_pendientes", {}).setdefault(torneo_id, {})
+    for partido_id in partido_ids:
+        eventos[("partido", partido_id)] = ("partido_eliminado", {"id": partido_id})
+
+
+@event.listens_for(db.session, "after_commit")
+def publicar_eventos(session):
+    pendientes = session.info.pop("eventos_pendientes", None)
+    for torneo_id, eventos in (pendientes or {}).items():
+        try:
+            event_bus.publicar(torneo_id, list(eventos.values()))
+        except Exception as e:  # Un fallo al notificar no debe romper la petición ya confirmada
+            print(f"⚠️ No se pudieron publicar los eventos del torneo {torneo_id}: {e}")
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def descartar_eventos(session, previous_transaction):
+    session.info.pop("eventos_pendientes", None)
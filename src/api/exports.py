@@ -0,0 +1,138 @@
+"""
+Exportación en streaming de asistencias, partidos y estadísticas.
+
+Las filas se leen con un cursor del lado del servidor (`yield_per`) y se
+envían en bloques a medida que llegan, como NDJSON (una fila JSON por línea)
+o CSV. La memoria usada no depende del tamaño de la tabla. Se puede acotar
+por fecha con `?from=` y `?to=` (fechas ISO, `to` inclusive si es solo día).
+"""
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from flask import Response, request, stream_with_context
+from sqlalchemy import select
+
+from api.models import db, Asistencia, Partido, EstadisticaJugador
+from api.utils import APIException
+
+FILAS_POR_LOTE = 1000
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+
+FORMATOS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _leer_fecha(nombre):
+    valor = request.args.get(nombre)
+    if not valor:
+        return None, False
+    try:
+        return datetime.fromisoformat(valor), len(valor) == 10
+    except ValueError:
+        raise APIException(f"El parámetro {nombre} debe ser una fecha ISO (AAAA-MM-DD o AAAA-MM-DDTHH:MM:SS)", 400)
+
+
+def filtrar_por_fecha(consulta, columna):
+    """Aplica `?from=` y `?to=` sobre `columna`. Un `to` sin hora incluye el día completo."""
+    desde, _ = _leer_fecha("from")
+    hasta, solo_dia = _leer_fecha("to")
+    if desde is not None:
+        consulta = consulta.where(columna >= desde)
+    if hasta is not None:
+        consulta = consulta.where(columna < hasta + timedelta(days=1) if solo_dia else columna <= hasta)
+    return consulta
+
+
+def _valor(valor):
+    return valor.strftime(FORMATO_FECHA) if isinstance(valor, datetime) else valor
+
+
+def _lineas_ndjson(columnas, filas):
+    for fila in filas:
+        yield json.dumps(dict(zip(columnas, map(_valor, fila))), ensure_ascii=False) + "\n"
+
+
+def _lineas_csv(columnas, filas):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columnas)
+    yield buffer.getvalue()
+    for fila in filas:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow([_valor(v) for v in fila])
+        yield buffer.getvalue()
+
+
+def _formato():
+    formato = request.args.get("format", "ndjson").lower()
+    if formato not in FORMATOS:
+        raise APIException("El parámetro format debe ser ndjson o csv", 400)
+    return formato
+
+
+def exportar(nombre, consulta):
+    """
+    Devuelve una respuesta en streaming con las filas de `consulta` (un `select`
+    de columnas, no de entidades, para no llenar el identity map de la sesión).
+    """
+    formato = _formato()
+    columnas = [c.name for c in consulta.selected_columns]
+    lineas = _lineas_csv if formato == "csv" else _lineas_ndjson
+
+    def generar():
+        resultado = db.session.execute(consulta.execution_options(yield_per=FILAS_POR_LOTE))
+        try:
+            # Se agrupan las líneas de cada lote para no enviar un bloque por fila
+            lote = []
+            for linea in lineas(columnas, resultado):
+                lote.append(linea)
+                if len(lote) >= FILAS_POR_LOTE:
+                    yield "".join(lote)
+                    lote = []
+            if lote:
+                yield "".join(lote)
+        finally:
+            resultado.close()
+
+    return Response(
+        stream_with_context(generar()),
+        mimetype=FORMATOS[formato],
+        headers={"Content-Disposition": f"attachment; filename={nombre}.{formato}"},
+    )
+
+
+def consulta_asistencias(admin=False):
+    columnas = [Asistencia.id, Asistencia.nombre, Asistencia.fecha_hora]
+    if admin:
+        columnas.append(Asistencia.ip)  # Igual que Asistencia.serialize: la IP solo para admins
+    consulta = select(*columnas).order_by(Asistencia.id)
+    return filtrar_por_fecha(consulta, Asistencia.fecha_hora)
+
+
+def consulta_partidos():
+    consulta = select(
+        Partido.id, Partido.torneo_id, Partido.equipo_a_id, Partido.equipo_b_id, Partido.fecha,
+        Partido.estado, Partido.juez, Partido.goles_equipo_a, Partido.goles_equipo_b, Partido.mvp_id,
+        Partido.mencion_equipo_a_id, Partido.mencion_equipo_b_id, Partido.link_video
+    ).order_by(Partido.id)
+    torneo_id = request.args.get("torneo_id", type=int)
+    if torneo_id:
+        consulta = consulta.where(Partido.torneo_id == torneo_id)
+    return filtrar_por_fecha(consulta, Partido.fecha)
+
+
+def consulta_estadisticas():
+    consulta = select(
+        EstadisticaJugador.id, EstadisticaJugador.partido_id, Partido.torneo_id, Partido.fecha,
+        EstadisticaJugador.jugador_id, EstadisticaJugador.goles, EstadisticaJugador.asistencias,
+        EstadisticaJugador.autogoles
+    ).join(Partido, EstadisticaJugador.partido_id == Partido.id).order_by(EstadisticaJugador.id)
+    torneo_id = request.args.get("torneo_id", type=int)
+    if torneo_id:
+        consulta = consulta.where(Partido.torneo_id == torneo_id)
+    return filtrar_por_fecha(consulta, Partido.fecha)
@@ -0,0 +1,236 @@
+"""
+Generación del fixture de un torneo según su formato.
+
+- `liga`: todos contra todos con el método del círculo (n-1 jornadas, o n si
+  la cantidad de equipos es impar y cada jornada descansa uno), opcionalmente
+  a ida y vuelta.
+- `eliminacion`: cuadro con siembra estándar (1 contra el último, etc.). Si la
+  cantidad de equipos no es potencia de 2, los mejores sembrados pasan directo
+  (bye) a la segunda ronda. Se guarda como cruces (`api.brackets`) y solo se
+  programa la primera ronda; las siguientes se programan al avanzar el cuadro.
+- `grupos_playoffs`: reparto en grupos por serpentina (se guarda en
+  `Equipo.grupo`) y todos contra todos dentro de cada grupo; las jornadas de
+  todos los grupos se juegan a la vez.
+
+Los cruces se calculan en memoria y, salvo en `eliminacion`, se insertan con
+un único INSERT por lotes (executemany) en una sola transacción, con
+`estado="programado"`: no cuentan en la tabla de posiciones ni en las
+estadísticas hasta que se cargue el resultado.
+
+Con `reemplazar`, los partidos programados y el cuadro anteriores se borran
+con `Query.delete`. Como ni eso ni el INSERT por lotes pasan por los listeners
+de la sesión, se registran a mano las cachés a invalidar (`bracket:<id>`,
+`equipo:<id>`) y los eventos `partido_eliminado`, que se aplican tras el
+commit. Un cuadro con partidos ya jugados no se reemplaza.
+"""
+import string
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam
+
+from api.models import db, Equipo, Partido, CruceEliminacion
+from api.standings import ESTADO_PROGRAMADO
+from api.brackets import FORMATO_ELIMINACION, crear_cuadro, registrar_cuadro_eliminado
+from api.matchups import registrar_partidos_sin_sesion
+from api.events import registrar_partidos_eliminados
+
+FORMATOS = ("liga", "eliminacion", "grupos_playoffs")
+EQUIPOS_POR_GRUPO = 4
+
+
+class FixtureExistente(Exception):
+    """El torneo ya tiene partidos programados y no se pidió reemplazarlos (o no se pueden reemplazar)."""
+
+
+def round_robin(equipos, ida_y_vuelta=False):
+    """
+    Método del círculo: el primer equipo queda fijo y el resto rota una
+    posición por jornada. Devuelve una lista de jornadas con pares (local, visitante).
+    """
+    equipos = list(equipos)
+    if len(equipos) % 2:
+        equipos.append(None)  # Con cantidad impar, quien cruza con None descansa
+    n = len(equipos)
+    fijo, rotan = equipos[0], equipos[1:]
+
+    jornadas = []
+    for numero in range(n - 1):
+        ronda = [fijo] + rotan
+        cruces = []
+        for i in range(n // 2):
+            local, visitante = ronda[i], ronda[n - 1 - i]
+            if local is None or visitante is None:
+                continue
+            # El equipo fijo alterna la localía; el resto la alterna al rotar
+            if i == 0 and numero % 2:
+                local, visitante = visitante, local
+            cruces.append((local, visitante))
+        jornadas.append(cruces)
+        rotan = rotan[-1:] + rotan[:-1]
+
+    if ida_y_vuelta:
+        jornadas += [[(visitante, local) for local, visitante in cruces] for cruces in jornadas]
+    return jornadas
+
+
+def orden_de_siembra(tamano):
+    """Posiciones del cuadro por semilla (1-based), p. ej. 8 → [1, 8, 4, 5, 2, 7, 3, 6]."""
+    orden = [1]
+    while len(orden) < tamano:
+        total = len(orden) * 2 + 1
+        orden = [semilla for s in orden for semilla in (s, total - s)]
+    return orden
+
+
+def sembrar_cuadro(equipos):
+    """
+    Equipos por posición del cuadro (ordenados por siembra), completado con
+    None hasta la potencia de 2 siguiente.
+    """
+    equipos = list(equipos)
+    tamano = 1
+    while tamano < len(equipos):
+        tamano *= 2
+    return [equipos[semilla - 1] if semilla <= len(equipos) else None for semilla in orden_de_siembra(tamano)]
+
+
+def cuadro_eliminacion(equipos):
+    """Devuelve (cruces de la primera ronda, equipos con bye). Los `equipos` van ordenados por siembra."""
+    sembrados = sembrar_cuadro(equipos)
+    cruces, byes = [], []
+    for local, visitante in zip(sembrados[::2], sembrados[1::2]):
+        if local is not None and visitante is not None:
+            cruces.append((local, visitante))
+        else:
+            byes.append(local if local is not None else visitante)
+    return cruces, byes
+
+
+def repartir_en_grupos(equipos, cantidad):
+    """Reparto por serpentina (A B C D D C B A ...) para equilibrar los grupos según la siembra."""
+    grupos = [[] for _ in range(cantidad)]
+    for indice, equipo in enumerate(equipos):
+        fila, columna = divmod(indice, cantidad)
+        grupos[columna if fila % 2 == 0 else cantidad - 1 - columna].append(equipo)
+    return grupos
+
+
+def nombre_de_grupo(indice):
+    letras = string.ascii_uppercase
+    return letras[indice] if indice < len(letras) else f"G{indice + 1}"
+
+
+def generar_fixture(formato, equipos, grupos=None, ida_y_vuelta=False):
+    """
+    Calcula el fixture de `equipos` (ids en orden de siembra). Devuelve un dict
+    con las jornadas (listas de pares), los grupos y los byes. Lanza ValueError
+    si los parámetros no sirven para el formato.
+    """
+    if formato not in FORMATOS:
+        raise ValueError("Formato inválido")
+    if len(equipos) < 2:
+        raise ValueError("El torneo necesita al menos 2 equipos")
+
+    if formato == "liga":
+        return {"jornadas": round_robin(equipos, ida_y_vuelta), "grupos": None, "byes": []}
+
+    if formato == "eliminacion":
+        cruces, byes = cuadro_eliminacion(equipos)
+        return {"jornadas": [cruces], "grupos": None, "byes": byes}
+
+    cantidad = grupos or max(1, round(len(equipos) / EQUIPOS_POR_GRUPO))
+    if cantidad < 1 or cantidad > len(equipos) // 2:
+        raise ValueError(f"La cantidad de grupos debe estar entre 1 y {len(equipos) // 2}")
+
+    repartidos = repartir_en_grupos(equipos, cantidad)
+    por_grupo = [round_robin(grupo, ida_y_vuelta) for grupo in repartidos]
+    jornadas = [
+        [cruce for jornadas_grupo in por_grupo if numero < len(jornadas_grupo) for cruce in jornadas_grupo[numero]]
+        for numero in range(max(len(jornadas_grupo) for jornadas_grupo in por_grupo))
+    ]
+    return {
+        "jornadas": jornadas,
+        "grupos": {nombre_de_grupo(i): grupo for i, grupo in enumerate(repartidos)},
+        "byes": []
+    }
+
+
+def programar_fixture(torneo, fecha_inicio=None, dias_entre_jornadas=7, grupos=None,
+                      ida_y_vuelta=False, orden=None, reemplazar=False):
+    """
+    Genera e inserta el fixture de `torneo` en una transacción. `orden` es la
+    siembra (ids de equipos del torneo); por defecto, el orden de creación.
+    Devuelve el resumen del fixture sin los pares. Lanza ValueError si los
+    parámetros no sirven y FixtureExistente si ya hay partidos programados (y
+    no se pidió reemplazarlos) o si el cuadro ya tiene partidos jugados.
+    """
+    equipos = [equipo_id for (equipo_id,) in db.session.query(Equipo.id).filter(
+        Equipo.torneo_id == torneo.id
+    ).order_by(Equipo.id)]
+    if orden:
+        if sorted(orden) != equipos:
+            raise ValueError("orden debe incluir exactamente una vez a cada equipo del torneo")
+        equipos = list(orden)
+
+    programados = Partido.query.filter(Partido.torneo_id == torneo.id, Partido.estado == ESTADO_PROGRAMADO)
+    cuadro = CruceEliminacion.query.filter(CruceEliminacion.torneo_id == torneo.id)
+    existente = programados.with_entities(Partido.id).first() is not None
+    if torneo.formato == FORMATO_ELIMINACION:
+        existente = existente or cuadro.with_entities(CruceEliminacion.id).first() is not None
+    if existente:
+        if not reemplazar:
+            raise FixtureExistente("El torneo ya tiene partidos programados (usa reemplazar para regenerarlos)")
+        jugado = cuadro.join(Partido, CruceEliminacion.partido_id == Partido.id).filter(
+            Partido.estado != ESTADO_PROGRAMADO
+        ).with_entities(CruceEliminacion.id).first()
+        if jugado is not None:
+            # Sus partidos quedarían fuera de cualquier cuadro
+            raise FixtureExistente("El cuadro ya tiene partidos jugados y no se puede reemplazar")
+
+        borrados = programados.with_entities(Partido.id, Partido.equipo_a_id, Partido.equipo_b_id).all()
+        cuadro.delete(synchronize_session=False)  # Antes que los partidos a los que apunta
+        programados.delete(synchronize_session=False)
+        registrar_cuadro_eliminado(db.session, torneo.id)
+        registrar_partidos_sin_sesion(db.session, [(a, b) for _, a, b in borrados])
+        registrar_partidos_eliminados(db.session, torneo.id, [partido_id for partido_id, _, _ in borrados])
+
+    fixture = generar_fixture(torneo.formato, equipos, grupos, ida_y_vuelta)
+
+    if fixture["grupos"]:
+        db.session.execute(
+            Equipo.__table__.update().where(Equipo.id == bindparam("b_equipo_id")).values(grupo=bindparam("b_grupo")),
+            [
+                {"b_equipo_id": equipo_id, "b_grupo": grupo}
+                for grupo, equipos_del_grupo in fixture["grupos"].items()
+                for equipo_id in equipos_del_grupo
+            ]
+        )
+
+    inicio = fecha_inicio or datetime.utcnow().replace(second=0, microsecond=0)
+    if torneo.formato == FORMATO_ELIMINACION:
+        # Los partidos se crean con el cuadro, que los enlaza a sus cruces
+        filas = crear_cuadro(torneo.id, sembrar_cuadro(equipos), inicio, dias_entre_jornadas)
+    else:
+        filas = [
+            {
+                "torneo_id": torneo.id, "equipo_a_id": local, "equipo_b_id": visitante,
+                "fecha": inicio + timedelta(days=dias_entre_jornadas * numero),
+                "estado": ESTADO_PROGRAMADO, "goles_equipo_a": 0, "goles_equipo_b": 0
+            }
+            for numero, cruces in enumerate(fixture["jornadas"])
+            for local, visitante in cruces
+        ]
+        if filas:
+            db.session.execute(Partido.__table__.insert(), filas)
+            registrar_partidos_sin_sesion(db.session, [(fila["equipo_a_id"], fila["equipo_b_id"]) for fila in filas])
+    db.session.commit()
+
+    return {
+        "torneo_id": torneo.id,
+        "formato": torneo.formato,
+        "jornadas": len(fixture["jornadas"]),
+        "partidos": len(filas),
+        "grupos": fixture["grupos"],
+        "byes": fixture["byes"],
+        "fecha_inicio": inicio.strftime("%Y-%m-%d %H:%M:%S")
+    }
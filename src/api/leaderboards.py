@@ -0,0 +1,353 @@
+"""
+Rankings de goleadores, asistidores, MVPs y menciones.
+
+Cada ranking es un sorted set (jugador_id → valor) por torneo y otro global.
+Por defecto se guardan en Redis (`ZINCRBY`, `ZREVRANGE`, `ZREVRANK`), de modo
+que el top-N y la posición de un jugador cuestan O(log n). Si Redis no está
+disponible se usa un respaldo en memoria del proceso: con varios workers cada
+uno solo aplica sus propios commits, así que cada alcance se vuelve a leer de
+`JugadorStats` a los `LEADERBOARD_MEMORY_TTL` segundos (30) y los workers no
+difieren por más tiempo. En Redis la recarga es cada `LEADERBOARD_REDIS_TTL`
+segundos (una hora), por si algún cambio se perdió.
+
+Los empates se ordenan como en Redis (`ZREVRANGE`): por miembro descendente
+comparado como texto, de modo que el orden no depende del backend.
+
+Los rankings se cargan desde `JugadorStats` la primera vez que se consultan
+y después se actualizan, tras cada commit, con los mismos cambios que
+`api.player_stats` aplica a `JugadorStats`. Cada alcance tiene una versión que
+sube con cada commit que lo toca: una carga solo se guarda si la versión no
+cambió mientras se leía la base, así no pisa los cambios confirmados durante
+la lectura (se reintenta con una lectura nueva).
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+
+from redis import Redis
+from redis.exceptions import RedisError, WatchError
+from sqlalchemy import event
+
+from api.models import db, Jugador, Partido, JugadorStats
+from api.cache import response_cache
+from extensions import REDIS_URL
+
+METRICAS = ("goles", "asistencias", "mvps", "menciones")
+GLOBAL = "global"
+TOP_MAXIMO = 500
+INTENTOS_DE_CARGA = 3
+
+PREFIJO = "habbofutbol:ranking"
+
+
+def _clave(metrica, alcance):
+    return f"{PREFIJO}:{metrica}:{alcance}"
+
+
+def _marca(alcance):
+    return f"{PREFIJO}:cargado:{alcance}"
+
+
+def _version(alcance):
+    return f"{PREFIJO}:version:{alcance}"
+
+
+def _desempate(miembro):
+    """
+    Clave de orden ascendente equivalente al orden descendente de Redis entre
+    miembros empatados (bytes del texto, con los prefijos después de los más largos).
+    """
+    return tuple(-byte for byte in str(miembro).encode()) + (1,)
+
+
+class MemorySortedSets:
+    """Respaldo en memoria con la misma interfaz (y el mismo orden) que `RedisSortedSets`."""
+
+    def __init__(self):
+        self._puntajes = {}
+        self._orden = {}
+        self._marcas = {}  # marca → vencimiento (monotonic) o None
+        self._versiones = {}
+        self._lock = threading.Lock()
+
+    def _mover(self, clave, miembro, nuevo):
+        puntajes = self._puntajes.setdefault(clave, {})
+        orden = self._orden.setdefault(clave, [])
+        anterior = puntajes.get(miembro)
+        if anterior is not None:
+            del orden[bisect_left(orden, (-anterior, _desempate(miembro), miembro))]
+        puntajes[miembro] = nuevo
+        insort(orden, (-nuevo, _desempate(miembro), miembro))
+
+    def _marcada(self, marca):
+        if marca not in self._marcas:
+            return False
+        vence = self._marcas[marca]
+        return vence is None or vence > time.monotonic()
+
+    def incr_if_flagged(self, version, marca, cambios):
+        with self._lock:
+            self._versiones[version] = self._versiones.get(version, 0) + 1
+            if not self._marcada(marca):
+                return
+            for clave, miembro, cantidad in cambios:
+                self._mover(clave, miembro, self._puntajes.get(clave, {}).get(miembro, 0) + cantidad)
+
+    def version(self, version):
+        with self._lock:
+            return self._versiones.get(version, 0)
+
+    def replace_if(self, version, esperada, puntajes, marca, ttl=None):
+        with self._lock:
+            if self._versiones.get(version, 0) != esperada:
+                return False
+            for clave, valores in puntajes.items():
+                self._puntajes[clave] = dict(valores)
+                self._orden[clave] = sorted((-valor, _desempate(miembro), miembro) for miembro, valor in valores.items())
+            self._marcas[marca] = time.monotonic() + ttl if ttl else None
+            return True
+
+    def top(self, clave, n=None):
+        with self._lock:
+            return [(miembro, -valor) for valor, _, miembro in self._orden.get(clave, [])[:n]]
+
+    def rank(self, clave, miembro):
+        with self._lock:
+            valor = self._puntajes.get(clave, {}).get(miembro)
+            if valor is None:
+                return None
+            return bisect_left(self._orden[clave], (-valor, _desempate(miembro), miembro)), valor
+
+    def is_flagged(self, marca):
+        with self._lock:
+            return self._marcada(marca)
+
+    def unflag(self, *marcas):
+        with self._lock:
+            for marca in marcas:
+                self._marcas.pop(marca, None)
+
+
+class RedisSortedSets:
+    def __init__(self, client):
+        self.client = client
+
+    def incr_if_flagged(self, version, marca, cambios):
+        # La versión sube antes de mirar la marca: una carga en curso o ve la marca sin este
+        # cambio y falla al guardar, o se guarda antes y este cambio se aplica encima
+        pipe = self.client.pipeline(transaction=False)
+        pipe.incr(version)
+        pipe.exists(marca)
+        _, marcada = pipe.execute()
+        if not marcada:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for clave, miembro, cantidad in cambios:
+            pipe.zincrby(clave, cantidad, miembro)
+        pipe.execute()
+
+    def version(self, version):
+        return int(self.client.get(version) or 0)
+
+    def replace_if(self, version, esperada, puntajes, marca, ttl=None):
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(version)
+                if int(pipe.get(version) or 0) != esperada:
+                    return False
+                pipe.multi()
+                for clave, valores in puntajes.items():
+                    pipe.delete(clave)
+                    if valores:
+                        pipe.zadd(clave, valores)
+                pipe.set(marca, 1, ex=ttl)
+                pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    def top(self, clave, n=None):
+        fin = -1 if n is None else n - 1
+        return [(int(miembro), int(valor)) for miembro, valor in self.client.zrevrange(clave, 0, fin, withscores=True)]
+
+    def rank(self, clave, miembro):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zrevrank(clave, miembro)
+        pipe.zscore(clave, miembro)
+        posicion, valor = pipe.execute()
+        if posicion is None:
+            return None
+        return posicion, int(valor)
+
+    def is_flagged(self, marca):
+        return bool(self.client.exists(marca))
+
+    def unflag(self, *marcas):
+        self.client.delete(*marcas)
+
+
+def _valores_por_jugador(torneo_id=None):
+    """Lee de `JugadorStats` los cuatro rankings de un torneo (o globales, sumando todos los torneos)."""
+    valores = {metrica: {} for metrica in METRICAS}
+
+    consulta = db.session.query(
+        JugadorStats.jugador_id, db.func.sum(JugadorStats.partidos_jugados),
+        *[db.func.sum(getattr(JugadorStats, metrica)) for metrica in METRICAS]
+    )
+    if torneo_id is not None:
+        consulta = consulta.filter(JugadorStats.torneo_id == torneo_id)
+    for jugador_id, jugados, *totales in consulta.group_by(JugadorStats.jugador_id):
+        for metrica, total in zip(METRICAS, totales):
+            # Goles y asistencias cuentan a quien jugó (aunque sea con 0); MVPs y menciones, a quien tiene alguno
+            if total or (jugados and metrica in ("goles", "asistencias")):
+                valores[metrica][jugador_id] = int(total or 0)
+
+    return valores
+
+
+class Leaderboards:
+    def __init__(self):
+        self.backend = MemorySortedSets()
+        self.ttl = 30
+
+    def init_app(self, app):
+        url = app.config.setdefault("LEADERBOARD_REDIS_URL", REDIS_URL)
+        memoria_ttl = app.config.setdefault("LEADERBOARD_MEMORY_TTL", 30)
+        redis_ttl = app.config.setdefault("LEADERBOARD_REDIS_TTL", 3600)
+        self.backend, self.ttl = MemorySortedSets(), memoria_ttl
+        if not url:
+            return
+        try:
+            client = Redis.from_url(url, socket_connect_timeout=0.5, socket_timeout=1)
+            client.ping()
+            self.backend, self.ttl = RedisSortedSets(client), redis_ttl
+        except RedisError as e:
+            if app.debug:
+                print(f"⚠️ Redis no disponible para los rankings ({e}); se usa memoria del proceso")
+            else:
+                # En producción cada worker tendría sus propios rankings: que no pase inadvertido
+                app.logger.error(
+                    "❌ Redis no disponible para los rankings (%s): se usa memoria del proceso. Cada worker "
+                    "solo aplica sus propios commits y los rankings pueden diferir entre workers hasta %s "
+                    "segundos. Configura REDIS_URL o LEADERBOARD_REDIS_URL.", e, memoria_ttl
+                )
+
+    def cargar(self, alcance):
+        """
+        Reconstruye los rankings de un alcance (id de torneo o GLOBAL) desde la
+        base de datos. Devuelve el backend del que leerlos: el propio o, si los
+        commits de otros no dejaron guardar la carga, una copia en memoria de la
+        última lectura (el próximo acceso lo vuelve a intentar).
+        """
+        for _ in range(INTENTOS_DE_CARGA):
+            version = self.backend.version(_version(alcance))
+            valores = _valores_por_jugador(None if alcance == GLOBAL else alcance)
+            puntajes = {_clave(metrica, alcance): valores[metrica] for metrica in METRICAS}
+            if self.backend.replace_if(_version(alcance), version, puntajes, _marca(alcance), self.ttl):
+                return self.backend
+
+        copia = MemorySortedSets()
+        copia.replace_if(_version(alcance), 0, puntajes, _marca(alcance))
+        return copia
+
+    def _asegurar_cargado(self, alcance):
+        if self.backend.is_flagged(_marca(alcance)):
+            return self.backend
+        return self.cargar(alcance)
+
+    def top(self, metrica, alcance=GLOBAL, n=None):
+        """Devuelve los `n` primeros (todos si es None) como [{"id", "nickhabbo", metrica}]."""
+        backend = self._asegurar_cargado(alcance)
+        filas = backend.top(_clave(metrica, alcance), n)
+        if not filas:
+            return []
+
+        nicks = dict(db.session.query(Jugador.id, Jugador.nickhabbo).filter(
+            Jugador.id.in_([jugador_id for jugador_id, _ in filas])
+        ))
+        return [
+            {"id": jugador_id, "nickhabbo": nicks[jugador_id], metrica: valor}
+            for jugador_id, valor in filas if jugador_id in nicks
+        ]
+
+    def posicion(self, metrica, jugador_id, alcance=GLOBAL):
+        """Devuelve (posición empezando en 1, valor) o None si el jugador no figura."""
+        backend = self._asegurar_cargado(alcance)
+        resultado = backend.rank(_clave(metrica, alcance), jugador_id)
+        if resultado is None:
+            return None
+        posicion, valor = resultado
+        return posicion + 1, valor
+
+    def aplicar(self, cambios):
+        """
+        Aplica cambios {(metrica, torneo_id, jugador_id): delta} al ranking del
+        torneo y al global. Los alcances que aún no se cargaron solo suben de
+        versión: se leerán completos de la base de datos cuando alguien los consulte.
+        """
+        por_alcance = {}
+        for (metrica, torneo_id, jugador_id), delta in cambios.items():
+            for alcance in (torneo_id, GLOBAL):
+                por_alcance.setdefault(alcance, []).append((_clave(metrica, alcance), jugador_id, delta))
+
+        alcances = list(por_alcance)
+        try:
+            for alcance in alcances:
+                self.backend.incr_if_flagged(_version(alcance), _marca(alcance), por_alcance[alcance])
+        except RedisError as e:
+            print(f"⚠️ No se pudieron actualizar los rankings: {e}")
+            try:
+                self.backend.unflag(*[_marca(alcance) for alcance in alcances])
+            except RedisError:
+                pass
+
+    def reconstruir(self, torneo_id=None):
+        """Recarga un torneo y el global, o todos los torneos con partidos si no se indica ninguno."""
+        if torneo_id is not None:
+            alcances = [torneo_id]
+        else:
+            alcances = [t for (t,) in db.session.query(Partido.torneo_id).distinct()]
+        for alcance in alcances + [GLOBAL]:
+            self.cargar(alcance)
+        return len(alcances)
+
+
+leaderboards = Leaderboards()
+
+
+# 🔹 Captura de cambios: se acumulan durante los flush y se aplican tras el commit
+
+def _sumar(cambios, metrica, torneo_id, jugador_id, delta):
+    if torneo_id is None or jugador_id is None:
+        return
+    clave = (metrica, torneo_id, jugador_id)
+    cambios[clave] = cambios.get(clave, 0) + delta
+
+
+def registrar_cambios(session, jugador_id, torneo_id, deltas):
+    """
+    Acumula los `deltas` ({campo de JugadorStats: cantidad}) de un jugador en un
+    torneo que tocan a los rankings. `api.player_stats.aplicar` la llama con
+    cada cambio de `JugadorStats`, así que los rankings siguen exactamente a
+    esa tabla (incluidos los lotes y los partidos que cambian de torneo).
+    """
+    cambios = session.info.setdefault("cambios_rankings", {})
+    for metrica in METRICAS:
+        if metrica in deltas:
+            # Un delta 0 también cuenta: quien jugó figura en goles y asistencias aunque no haya marcado
+            _sumar(cambios, metrica, torneo_id, jugador_id, deltas[metrica])
+
+
+@event.listens_for(db.session, "after_commit")
+def aplicar_cambios_rankings(session):
+    cambios = session.info.pop("cambios_rankings", None)
+    if cambios:
+        leaderboards.aplicar(cambios)
+        # 📌 Después de aplicarlos: una respuesta cacheada antes leería el ranking viejo
+        torneos = {torneo_id for (_, torneo_id, _) in cambios}
+        response_cache.invalidate("tablas", *[f"tablas:{torneo_id}" for torneo_id in torneos])
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def descartar_cambios_rankings(session, previous_transaction):
+    session.info.pop("cambios_rankings", None)
@@ -0,0 +1,171 @@
+"""
+Cara a cara entre dos equipos y forma reciente de un equipo.
+
+Ambos se calculan en SQL sobre los partidos finalizados, apoyándose en los
+índices (equipo_a_id, fecha) y (equipo_b_id, fecha): cada lado del partido se
+consulta por separado (el equipo puede figurar como A o como B) y se combinan
+con UNION ALL, de modo que solo se leen los partidos de los equipos pedidos.
+
+Las respuestas se cachean con una etiqueta por equipo (`equipo:<id>`); un
+listener de la sesión invalida las de ambos equipos de cada `Partido` que se
+inserta, modifica o elimina (incluido Flask-Admin).
+"""
+from sqlalchemy import case, event, func, inspect, or_, select, union_all
+
+from api.models import db, Equipo, Partido
+from api.cache import response_cache
+from api.standings import ESTADO_FINALIZADO
+
+ULTIMOS_POR_DEFECTO = 5
+ULTIMOS_MAXIMO = 50
+
+
+def _finalizado():
+    return or_(Partido.estado == ESTADO_FINALIZADO, Partido.estado.is_(None))
+
+
+def _desde(equipo_id, rival_id=None, limite=None):
+    """
+    Partidos del equipo vistos desde su lado (favor/contra), como un SELECT por
+    cada lado del partido unidos con UNION ALL.
+    """
+    ramas = []
+    for columna, rival, favor, contra in (
+        (Partido.equipo_a_id, Partido.equipo_b_id, Partido.goles_equipo_a, Partido.goles_equipo_b),
+        (Partido.equipo_b_id, Partido.equipo_a_id, Partido.goles_equipo_b, Partido.goles_equipo_a),
+    ):
+        rama = select(
+            Partido.id, Partido.fecha, Partido.torneo_id, rival.label("rival_id"),
+            func.coalesce(favor, 0).label("favor"), func.coalesce(contra, 0).label("contra")
+        ).where(columna == equipo_id, _finalizado())
+        if rival_id is not None:
+            rama = rama.where(rival == rival_id)
+        if limite is not None:
+            rama = rama.order_by(Partido.fecha.desc(), Partido.id.desc()).limit(limite)
+        ramas.append(select(rama.subquery()))
+    return union_all(*ramas).subquery()
+
+
+def _resultado(favor, contra):
+    if favor > contra:
+        return "G"
+    if favor == contra:
+        return "E"
+    return "P"
+
+
+def _partido(fila, nombres):
+    return {
+        "id": fila.id,
+        "fecha": fila.fecha.strftime("%Y-%m-%d %H:%M:%S"),
+        "torneo_id": fila.torneo_id,
+        "rival_id": fila.rival_id,
+        "rival": nombres.get(fila.rival_id),
+        "goles_favor": fila.favor,
+        "goles_contra": fila.contra,
+        "resultado": _resultado(fila.favor, fila.contra)
+    }
+
+
+def _nombres(*equipo_ids):
+    return dict(db.session.query(Equipo.id, Equipo.nombre).filter(Equipo.id.in_(set(equipo_ids))))
+
+
+def cara_a_cara(equipo_a_id, equipo_b_id, ultimos=ULTIMOS_POR_DEFECTO):
+    """
+    Historial de `equipo_a_id` contra `equipo_b_id` desde el punto de vista del
+    primero, con sus últimos enfrentamientos. None si alguno de los equipos no existe.
+    """
+    nombres = _nombres(equipo_a_id, equipo_b_id)
+    if equipo_a_id not in nombres or equipo_b_id not in nombres:
+        return None
+
+    partidos = _desde(equipo_a_id, rival_id=equipo_b_id)
+    totales = db.session.query(
+        func.count(),
+        func.coalesce(func.sum(case((partidos.c.favor > partidos.c.contra, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((partidos.c.favor == partidos.c.contra, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((partidos.c.favor < partidos.c.contra, 1), else_=0)), 0),
+        func.coalesce(func.sum(partidos.c.favor), 0),
+        func.coalesce(func.sum(partidos.c.contra), 0)
+    ).select_from(partidos).one()
+    jugados, ganados_a, empates, ganados_b, goles_a, goles_b = (int(valor) for valor in totales)
+
+    recientes = _desde(equipo_a_id, rival_id=equipo_b_id, limite=ultimos)
+    filas = db.session.execute(
+        select(recientes).order_by(recientes.c.fecha.desc(), recientes.c.id.desc()).limit(ultimos)
+    ).all()
+
+    return {
+        "equipo_a": {"id": equipo_a_id, "nombre": nombres[equipo_a_id]},
+        "equipo_b": {"id": equipo_b_id, "nombre": nombres[equipo_b_id]},
+        "partidos": jugados,
+        "ganados_a": ganados_a,
+        "ganados_b": ganados_b,
+        "empates": empates,
+        "goles_a": goles_a,
+        "goles_b": goles_b,
+        "ultimos": [_partido(fila, nombres) for fila in filas]
+    }
+
+
+def forma(equipo_id, n=ULTIMOS_POR_DEFECTO):
+    """Últimos `n` resultados del equipo (del más reciente al más antiguo). None si no existe."""
+    nombre = db.session.query(Equipo.nombre).filter(Equipo.id == equipo_id).scalar()
+    if nombre is None:
+        return None
+
+    recientes = _desde(equipo_id, limite=n)
+    filas = db.session.execute(
+        select(recientes, Equipo.nombre.label("rival"))
+        .outerjoin(Equipo, Equipo.id == recientes.c.rival_id)
+        .order_by(recientes.c.fecha.desc(), recientes.c.id.desc()).limit(n)
+    ).all()
+
+    partidos = [_partido(fila, {fila.rival_id: fila.rival}) for fila in filas]
+    return {
+        "equipo": {"id": equipo_id, "nombre": nombre},
+        "forma": "".join(partido["resultado"] for partido in partidos),
+        "puntos": sum({"G": 3, "E": 1, "P": 0}[partido["resultado"]] for partido in partidos),
+        "partidos": partidos
+    }
+
+
+# 🔹 Invalidación: ambos equipos de cada partido escrito, con sus valores anteriores y nuevos
+
+def _etiqueta(equipo_id):
+    return f"equipo:{equipo_id}"
+
+
+@event.listens_for(db.session, "before_flush")
+def registrar_equipos_con_partidos(session, flush_context, instances):
+    cambiados = session.info.setdefault("equipos_con_partidos", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Partido):
+            for campo in ("equipo_a_id", "equipo_b_id"):
+                cambiados.update(inspect(obj).attrs[campo].history.sum())
+    cambiados.discard(None)
+
+
+def registrar_partidos_sin_sesion(session, pares):
+    """
+    Marca para invalidar los equipos de partidos insertados o borrados sin
+    pasar por `before_flush` (INSERT por lotes, `Query.delete`). `pares` es un
+    iterable de (equipo_a_id, equipo_b_id).
+    """
+    cambiados = session.info.setdefault("equipos_con_partidos", set())
+    for par in pares:
+        cambiados.update(par)
+    cambiados.discard(None)
+
+
+@event.listens_for(db.session, "after_commit")
+def invalidar_equipos_con_partidos(session):
+    cambiados = session.info.pop("equipos_con_partidos", None)
+    if cambiados:
+        response_cache.invalidate(*[_etiqueta(equipo_id) for equipo_id in cambiados])
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def descartar_equipos_con_partidos(session, previous_transaction):
+    session.info.pop("equipos_con_partidos", None)
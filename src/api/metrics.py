@@ -0,0 +1,200 @@
+"""
+Métricas de consultas SQL por petición.
+
+Los eventos `before_cursor_execute`/`after_cursor_execute` de SQLAlchemy
+(y `handle_error` para las consultas que fallan) cuentan las consultas y el
+tiempo en base de datos de cada petición. Cada respuesta lleva una cabecera
+`Server-Timing` (`db` y `app`), y los valores se acumulan en histogramas por
+endpoint que `/api/_metrics` expone en formato de texto de Prometheus.
+
+Los histogramas viven en cada proceso: con varios workers de gunicorn cada
+uno reporta los suyos.
+
+`assert_query_budget(n)` sirve en pruebas para fallar si un bloque (por
+ejemplo, una petición del test client) ejecuta más de `n` consultas.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    """Histograma acumulativo con una serie por valor de la etiqueta `endpoint`."""
+
+    def __init__(self, nombre, ayuda, buckets):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, valor):
+        with self._lock:
+            serie = self._series.get(endpoint)
+            if serie is None:
+                serie = self._series[endpoint] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][bisect_left(self.buckets, valor)] += 1
+            serie[1] += valor
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            series = sorted((endpoint, list(conteos), suma) for endpoint, (conteos, suma) in self._series.items())
+        for endpoint, conteos, suma in series:
+            etiqueta = 'endpoint="%s"' % endpoint.replace("\\", "\\\\").replace('"', '\\"')
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, conteos):
+                acumulado += conteo
+                lineas.append(f'{self.nombre}_bucket{{{etiqueta},le="{float(limite)}"}} {acumulado}')
+            acumulado += conteos[-1]
+            lineas.append(f'{self.nombre}_bucket{{{etiqueta},le="+Inf"}} {acumulado}')
+            lineas.append(f"{self.nombre}_sum{{{etiqueta}}} {suma}")
+            lineas.append(f"{self.nombre}_count{{{etiqueta}}} {acumulado}")
+        return "\n".join(lineas)
+
+
+class QueryMetrics:
+    def __init__(self):
+        self.server_timing = True
+        self.duracion = Histogram(
+            "habbofutbol_http_request_duration_seconds", "Duración de las peticiones HTTP.", BUCKETS_SEGUNDOS
+        )
+        self.tiempo_db = Histogram(
+            "habbofutbol_db_time_seconds", "Tiempo en base de datos por petición.", BUCKETS_SEGUNDOS
+        )
+        self.consultas = Histogram(
+            "habbofutbol_db_queries_per_request", "Consultas SQL por petición.", BUCKETS_CONSULTAS
+        )
+        self._contadores = threading.local()
+        self._escuchando = False
+
+    def init_app(self, app):
+        self.server_timing = app.config.setdefault("METRICS_SERVER_TIMING", True)
+
+        # Se escucha en la clase Engine para cubrir cualquier engine (incluidas réplicas de lectura)
+        if not self._escuchando:
+            event.listen(Engine, "before_cursor_execute", self._antes_de_consulta)
+            event.listen(Engine, "after_cursor_execute", self._despues_de_consulta)
+            event.listen(Engine, "handle_error", self._error_de_consulta)
+            self._escuchando = True
+
+        app.before_request(self._iniciar_peticion)
+        app.after_request(self._terminar_peticion)
+
+    # 🔹 Eventos de SQLAlchemy
+
+    def _antes_de_consulta(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metricas_inicio", []).append(time.perf_counter())
+
+    def _despues_de_consulta(self, conn, cursor, statement, parameters, context, executemany):
+        self._registrar(conn, statement)
+
+    def _error_de_consulta(self, contexto):
+        # Sin esto el inicio quedaría en la pila de la conexión, que vuelve al pool y la arrastra
+        if contexto.connection is not None:
+            self._registrar(contexto.connection, contexto.statement)
+
+    def _registrar(self, conn, statement):
+        inicios = conn.info.get("metricas_inicio")
+        if not inicios:
+            return
+        duracion = time.perf_counter() - inicios.pop()
+
+        if has_request_context():
+            totales = g.get("_metricas_sql")
+            if totales is not None:
+                totales[0] += 1
+                totales[1] += duracion
+
+        for contador in getattr(self._contadores, "activos", ()):
+            contador.append(statement)
+
+    # 🔹 Eventos de Flask
+
+    def _iniciar_peticion(self):
+        g._metricas_inicio = time.perf_counter()
+        g._metricas_sql = [0, 0.0]
+
+    def _terminar_peticion(self, response):
+        inicio = g.get("_metricas_inicio")
+        totales = g.get("_metricas_sql")
+        if inicio is None or totales is None:
+            return response
+
+        duracion = time.perf_counter() - inicio
+        consultas, tiempo_db = totales
+        endpoint = request.endpoint or "sin_endpoint"
+        self.duracion.observe(endpoint, duracion)
+        self.tiempo_db.observe(endpoint, tiempo_db)
+        self.consultas.observe(endpoint, consultas)
+
+        if self.server_timing:
+            response.headers.add(
+                "Server-Timing", f'db;dur={tiempo_db * 1000:.2f};desc="{consultas} consultas"'
+            )
+            response.headers.add("Server-Timing", f"app;dur={duracion * 1000:.2f}")
+        return response
+
+    def render(self):
+        """Texto para Prometheus con todos los histogramas."""
+        return "\n".join(h.render() for h in (self.duracion, self.tiempo_db, self.consultas)) + "\n"
+
+    def clear(self):
+        for histograma in (self.duracion, self.tiempo_db, self.consultas):
+            histograma.clear()
+
+    @contextmanager
+    def contar(self):
+        """Registra las sentencias SQL ejecutadas por este hilo dentro del bloque."""
+        sentencias = []
+        activos = getattr(self._contadores, "activos", None)
+        if activos is None:
+            activos = self._contadores.activos = []
+        activos.append(sentencias)
+        try:
+            yield sentencias
+        finally:
+            activos.remove(sentencias)
+
+
+query_metrics = QueryMetrics()
+
+
+@contextmanager
+def assert_query_budget(maximo, descripcion=None):
+    """
+    Falla con AssertionError si el bloque ejecuta más de `maximo` consultas, p. ej.:
+
+        with assert_query_budget(3, "GET /api/partidos"):
+            client.get("/api/partidos")
+    """
+    with query_metrics.contar() as sentencias:
+        yield sentencias
+    if len(sentencias) > maximo:
+        detalle = "\n".join(f"  {i + 1}. {s}" for i, s in enumerate(sentencias))
+        raise AssertionError(
+            f"{descripcion or 'El bloque'} ejecutó {len(sentencias)} consultas (máximo {maximo}):\n{detalle}"
+        )
+
+
+def assert_query_budgets(client, presupuestos, **kwargs):
+    """
+    Hace un GET a cada URL de `presupuestos` ({url: máximo de consultas}) y falla
+    si alguna supera su presupuesto. `kwargs` se pasa al test client (p. ej. headers).
+    """
+    for url, maximo in presupuestos.items():
+        with assert_query_budget(maximo, f"GET {url}"):
+            respuesta = client.get(url, **kwargs)
+        assert respuesta.status_code < 500, f"GET {url} respondió {respuesta.status_code}"
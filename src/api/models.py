@@ -1,11 +1,12 @@
-from flask_sqlalchemy import SQLAlchemy
 from dotenv import load_dotenv
 from datetime import datetime
 from sqlalchemy.orm import validates
+from api.replicas import SQLAlchemyConReplica
 
 load_dotenv()
 
-db = SQLAlchemy()
+# Igual que SQLAlchemy(), pero las lecturas de la API pueden ir a DATABASE_REPLICA_URL (ver api/replicas.py)
+db = SQLAlchemyConReplica()
 
 
 
@@ -16,6 +17,11 @@ class JugadorEquipo(db.Model):
     equipo_id = db.Column(db.Integer, db.ForeignKey("equipos.id"), primary_key=True)
     modalidad = db.Column(db.String(50), nullable=False)
 
+    __table_args__ = (
+        db.Index("ix_jugadores_equipos_jugador_id_modalidad", "jugador_id", "modalidad"),
+        db.Index("ix_jugadores_equipos_equipo_id", "equipo_id"),
+    )
+
     jugador = db.relationship("Jugador", back_populates="jugadores_equipos")
     equipo = db.relationship("Equipo", back_populates="jugadores_equipos")
 
@@ -36,6 +42,9 @@ class Torneo(db.Model):
 
     equipos = db.relationship('Equipo', backref='torneo', cascade="all, delete", lazy=True)
     partidos = db.relationship('Partido', backref='torneo', cascade="all, delete", lazy=True)
+    posiciones = db.relationship('TablaPosicion', backref='torneo', cascade="all, delete", lazy=True)
+    estadisticas_jugadores = db.relationship('JugadorStats', cascade="all, delete", lazy=True)
+    cruces = db.relationship('CruceEliminacion', cascade="all, delete", lazy=True)
 
 # 🔹 Modelo de Equipos
 class Equipo(db.Model):
@@ -44,9 +53,15 @@ class Equipo(db.Model):
     nombre = db.Column(db.String(100), nullable=False, unique=True)
     torneo_id = db.Column(db.Integer, db.ForeignKey('torneos.id'), nullable=False)
     logo_url = db.Column(db.String(255), nullable=True)
+    logo_estado = db.Column(db.String(20), nullable=True)  # pendiente / listo / error (None si no tiene logo)
+    grupo = db.Column(db.String(10), nullable=True)  # Grupo en torneos `grupos_playoffs` (lo asigna el fixture)
 
+    __table_args__ = (
+        db.Index("ix_equipos_torneo_id", "torneo_id"),
+    )
 
     jugadores_equipos = db.relationship("JugadorEquipo", back_populates="equipo", lazy="joined")
+    posiciones = db.relationship('TablaPosicion', backref='equipo', cascade="all, delete", lazy=True)
 
 # 🔹 Modelo de Jugadores
 class Jugador(db.Model):
@@ -63,6 +78,7 @@ class Jugador(db.Model):
     created_at = db.Column(db.DateTime(timezone=True), default=db.func.now())
 
     jugadores_equipos = db.relationship("JugadorEquipo", back_populates="jugador", lazy="joined")
+    estadisticas_por_torneo = db.relationship("JugadorStats", cascade="all, delete", lazy=True)
 
     @validates("role")
     def validate_role(self, key, role):
@@ -101,34 +117,111 @@ class Jugador(db.Model):
 class Partido(db.Model):
     __tablename__ = "partidos"
     id = db.Column(db.Integer, primary_key=True)
-    torneo_id = db.Column(db.Integer, db.ForeignKey('torneos.id'), nullable=False)
-    equipo_a_id = db.Column(db.Integer, db.ForeignKey('equipos.id'), nullable=False)
-    equipo_b_id = db.Column(db.Integer, db.ForeignKey('equipos.id'), nullable=False)
+    # 📌 active_history: los listeners de tablas y estadísticas restan el valor anterior aunque
+    # el objeto esté expirado (p. ej. al editarlo después de un commit en la misma sesión)
+    torneo_id = db.column_property(db.Column(db.Integer, db.ForeignKey('torneos.id'), nullable=False), active_history=True)
+    equipo_a_id = db.column_property(db.Column(db.Integer, db.ForeignKey('equipos.id'), nullable=False), active_history=True)
+    equipo_b_id = db.column_property(db.Column(db.Integer, db.ForeignKey('equipos.id'), nullable=False), active_history=True)
     fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    estado = db.Column(db.String(20), default="finalizado")  
+    estado = db.column_property(db.Column(db.String(20), default="finalizado"), active_history=True)
     juez = db.Column(db.String(100), nullable=True)
-    goles_equipo_a = db.Column(db.Integer, default=0)
-    goles_equipo_b = db.Column(db.Integer, default=0)
-    mvp_id = db.Column(db.Integer, db.ForeignKey('jugadores.id'), nullable=True)
-    mencion_equipo_a_id = db.Column(db.Integer, db.ForeignKey('jugadores.id'), nullable=True)
-    mencion_equipo_b_id = db.Column(db.Integer, db.ForeignKey('jugadores.id'), nullable=True)
+    goles_equipo_a = db.column_property(db.Column(db.Integer, default=0), active_history=True)
+    goles_equipo_b = db.column_property(db.Column(db.Integer, default=0), active_history=True)
+    mvp_id = db.column_property(db.Column(db.Integer, db.ForeignKey('jugadores.id'), nullable=True), active_history=True)
+    mencion_equipo_a_id = db.column_property(db.Column(db.Integer, db.ForeignKey('jugadores.id'), nullable=True), active_history=True)
+    mencion_equipo_b_id = db.column_property(db.Column(db.Integer, db.ForeignKey('jugadores.id'), nullable=True), active_history=True)
+    # Tarjetas de cada equipo (desempate por fair play)
+    amarillas_equipo_a = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    amarillas_equipo_b = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    rojas_equipo_a = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    rojas_equipo_b = db.Column(db.Integer, nullable=False, default=0, server_default="0")
     link_video = db.Column(db.String(255), nullable=True)
     observaciones = db.Column(db.Text, nullable=True)
 
+    # 🔹 Filtros por torneo/equipo/jugador y orden por fecha (paginación y exportación)
+    __table_args__ = (
+        db.Index("ix_partidos_torneo_id", "torneo_id"),
+        # Por equipo y fecha: cubren la FK y leen los últimos partidos de un equipo (forma, cara a cara)
+        db.Index("ix_partidos_equipo_a_id_fecha", "equipo_a_id", "fecha"),
+        db.Index("ix_partidos_equipo_b_id_fecha", "equipo_b_id", "fecha"),
+        db.Index("ix_partidos_mvp_id", "mvp_id"),
+        db.Index("ix_partidos_mencion_equipo_a_id", "mencion_equipo_a_id"),
+        db.Index("ix_partidos_mencion_equipo_b_id", "mencion_equipo_b_id"),
+        db.Index("ix_partidos_fecha_id", "fecha", "id"),
+    )
+
     estadisticas = db.relationship('EstadisticaJugador', backref='partido', cascade="all, delete", lazy=True)
 
 # 🔹 Modelo de Estadísticas de Jugadores
 class EstadisticaJugador(db.Model):
     __tablename__ = "estadisticas_jugador"
     id = db.Column(db.Integer, primary_key=True)
-    partido_id = db.Column(db.Integer, db.ForeignKey('partidos.id'), nullable=False)
-    jugador_id = db.Column(db.Integer, db.ForeignKey('jugadores.id'), nullable=False)
-    goles = db.Column(db.Integer, default=0)
-    asistencias = db.Column(db.Integer, default=0)
-    autogoles = db.Column(db.Integer, default=0)
+    # active_history, como en Partido: `jugador_stats` y los rankings restan el valor anterior
+    partido_id = db.column_property(db.Column(db.Integer, db.ForeignKey('partidos.id'), nullable=False), active_history=True)
+    jugador_id = db.column_property(db.Column(db.Integer, db.ForeignKey('jugadores.id'), nullable=False), active_history=True)
+    goles = db.column_property(db.Column(db.Integer, default=0), active_history=True)
+    asistencias = db.column_property(db.Column(db.Integer, default=0), active_history=True)
+    autogoles = db.column_property(db.Column(db.Integer, default=0), active_history=True)
+
+    __table_args__ = (
+        db.Index("ix_estadisticas_jugador_partido_id", "partido_id"),
+        db.Index("ix_estadisticas_jugador_jugador_id", "jugador_id"),
+    )
 
     jugador = db.relationship("Jugador", backref="estadisticas")
 
+# 🔹 Tabla de posiciones persistida (una fila por torneo y equipo)
+class TablaPosicion(db.Model):
+    __tablename__ = "tabla_posiciones"
+    torneo_id = db.Column(db.Integer, db.ForeignKey('torneos.id'), primary_key=True)
+    equipo_id = db.Column(db.Integer, db.ForeignKey('equipos.id'), primary_key=True)
+    puntos = db.Column(db.Integer, nullable=False, default=0)
+    partidos_jugados = db.Column(db.Integer, nullable=False, default=0)
+    ganados = db.Column(db.Integer, nullable=False, default=0)
+    empatados = db.Column(db.Integer, nullable=False, default=0)
+    perdidos = db.Column(db.Integer, nullable=False, default=0)
+    goles_favor = db.Column(db.Integer, nullable=False, default=0)
+    goles_contra = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def diferencia_goles(self):
+        return self.goles_favor - self.goles_contra
+
+# 🔹 Totales de cada jugador por torneo (una fila por jugador y torneo), mantenidos al escribir partidos
+class JugadorStats(db.Model):
+    __tablename__ = "jugador_stats"
+    jugador_id = db.Column(db.Integer, db.ForeignKey('jugadores.id'), primary_key=True)
+    torneo_id = db.Column(db.Integer, db.ForeignKey('torneos.id'), primary_key=True)
+    partidos_jugados = db.Column(db.Integer, nullable=False, default=0)
+    goles = db.Column(db.Integer, nullable=False, default=0)
+    asistencias = db.Column(db.Integer, nullable=False, default=0)
+    autogoles = db.Column(db.Integer, nullable=False, default=0)
+    mvps = db.Column(db.Integer, nullable=False, default=0)
+    menciones = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index("ix_jugador_stats_torneo_id", "torneo_id"),
+    )
+
+# 🔹 Cuadro de eliminación: un cruce por ronda y posición; el ganador pasa al cruce (ronda + 1, posicion // 2)
+class CruceEliminacion(db.Model):
+    __tablename__ = "cruces_eliminacion"
+    id = db.Column(db.Integer, primary_key=True)
+    torneo_id = db.Column(db.Integer, db.ForeignKey('torneos.id'), nullable=False)
+    ronda = db.Column(db.Integer, nullable=False)  # 1 = primera ronda; la última es la final
+    posicion = db.Column(db.Integer, nullable=False)
+    equipo_a_id = db.Column(db.Integer, db.ForeignKey('equipos.id'), nullable=True)  # None hasta que se decide
+    equipo_b_id = db.Column(db.Integer, db.ForeignKey('equipos.id'), nullable=True)
+    partido_id = db.Column(db.Integer, db.ForeignKey('partidos.id'), nullable=True)
+    ganador_id = db.Column(db.Integer, db.ForeignKey('equipos.id'), nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint("torneo_id", "ronda", "posicion", name="uq_cruces_eliminacion_torneo_ronda_posicion"),
+        db.Index("ix_cruces_eliminacion_partido_id", "partido_id"),
+    )
+
+    partido = db.relationship("Partido")
+
 # 🔹 Modelo de Asistencia
 class Asistencia(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -136,6 +229,11 @@ class Asistencia(db.Model):
     fecha_hora = db.Column(db.DateTime, default=datetime.utcnow)
     ip = db.Column(db.String(45), nullable=True)  
 
+    # 🔹 Respalda la búsqueda de asistencias repetidas por nombre en el último minuto
+    __table_args__ = (
+        db.Index("ix_asistencia_nombre_fecha_hora", "nombre", "fecha_hora"),
+    )
+
     def serialize(self, admin=False):
         data = {
             "id": self.id,
@@ -156,6 +254,10 @@ class Convocatoria(db.Model):
     created_at = db.Column(db.DateTime, default=db.func.now())
     modalidad = db.Column(db.String(50), nullable=False)  # 🔹 Agregar este campo
 
+    __table_args__ = (
+        db.Index("ix_convocatorias_jugador_id_modalidad", "jugador_id", "modalidad"),
+    )
+
     jugador = db.relationship("Jugador", backref="convocatoria")
 
 class Oferta(db.Model):
@@ -166,6 +268,10 @@ class Oferta(db.Model):
     equipo_id = db.Column(db.Integer, db.ForeignKey("equipos.id"), nullable=False)
     created_at = db.Column(db.DateTime, default=db.func.now())
 
+    __table_args__ = (
+        db.Index("ix_ofertas_jugador_id", "jugador_id"),
+    )
+
     dt = db.relationship("Jugador", foreign_keys=[dt_id])
     jugador = db.relationship("Jugador", foreign_keys=[jugador_id])
     equipo = db.relationship("Equipo", backref="ofertas")    
@@ -175,13 +281,19 @@ class Noticia(db.Model):
     titulo = db.Column(db.String(255), nullable=False)
     contenido = db.Column(db.Text, nullable=False)
     imagen_url = db.Column(db.String(500), nullable=True)  # Guardar la URL de la imagen
+    imagen_estado = db.Column(db.String(20), nullable=True)  # pendiente / listo / error (None si no tiene imagen)
     fecha_publicacion = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_noticia_fecha_publicacion_id", "fecha_publicacion", "id"),
+    )
+
     def serialize(self):
         return {
             "id": self.id,
             "titulo": self.titulo,
             "contenido": self.contenido,
             "imagen_url": self.imagen_url,
+            "imagen_estado": self.imagen_estado,
             "fecha_publicacion": self.fecha_publicacion.strftime('%Y-%m-%d %H:%M:%S')
         }    
@@ -0,0 +1,133 @@
+"""
+Hash y verificación de contraseñas en un pool de procesos.
+
+Un hash (scrypt o PBKDF2) consume decenas de milisegundos de CPU por llamada.
+En vez de hacerlo dentro del worker que atiende la petición, `/login` y
+`/register` lo envían a un pool de procesos con una cola acotada: si la cola
+está llena se responde 503 en lugar de acumular peticiones. El método y su
+costo se configuran con `PASSWORD_HASH_METHOD` (por defecto el de werkzeug,
+scrypt), y los hashes con otro método o parámetros se actualizan al iniciar
+sesión.
+
+Los procesos del pool se crean con "forkserver": salen de un proceso servidor
+de un solo hilo y no del worker de gunicorn, que ya corre hilos (peticiones,
+subidas, asistencias, eventos). Hacer fork de un proceso con hilos puede dejar
+al hijo bloqueado en un lock que otro hilo tenía tomado en ese momento. Si un
+proceso del pool muere, el pool se descarta y se vuelve a crear en la
+siguiente llamada.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+# El método por defecto de werkzeug: los hashes existentes no cambian de algoritmo al iniciar sesión
+METODO_POR_DEFECTO = "scrypt"
+
+
+def metodo_completo(metodo):
+    """El método con los parámetros por defecto de werkzeug, tal como queda al inicio del hash."""
+    nombre, *parametros = metodo.split(":")
+    if nombre == "scrypt" and not parametros:
+        return "scrypt:32768:8:1"
+    if nombre == "pbkdf2":
+        algoritmo = parametros[0] if parametros else "sha256"
+        iteraciones = parametros[1] if len(parametros) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{algoritmo}:{iteraciones}"
+    return metodo
+
+
+def _contexto():
+    contexto = multiprocessing.get_context(
+        "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    )
+    if contexto.get_start_method() == "forkserver":
+        # Los hijos solo necesitan werkzeug, no volver a importar el módulo principal
+        contexto.set_forkserver_preload(["werkzeug.security"])
+    return contexto
+
+
+class PoolSaturado(Exception):
+    """La cola de hashing está llena."""
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.method = METODO_POR_DEFECTO
+        self.workers = 0
+        self.queue_size = 0
+        self.timeout = 10
+        self._executor = None
+        self._cupos = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.method = app.config.setdefault("PASSWORD_HASH_METHOD", METODO_POR_DEFECTO)
+        self.workers = app.config.setdefault("PASSWORD_POOL_WORKERS", 2)
+        self.queue_size = app.config.setdefault("PASSWORD_POOL_QUEUE_SIZE", 32)
+        self.timeout = app.config.setdefault("PASSWORD_POOL_TIMEOUT", 10)
+        self.shutdown()
+        self._cupos = threading.BoundedSemaphore(self.workers + self.queue_size) if self.workers else None
+
+    def _pool(self):
+        # Se crea al primer uso para que cada worker de gunicorn tenga su propio pool
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_contexto())
+        return self._executor
+
+    def _descartar(self, executor):
+        """Olvida un pool roto (murió uno de sus procesos); el próximo uso crea otro."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _ejecutar(self, funcion, *args):
+        if not self.workers:
+            return funcion(*args)
+
+        # Un segundo intento solo si el pool estaba roto: el hash es idempotente
+        for _ in range(2):
+            executor = self._pool()
+            if not self._cupos.acquire(blocking=False):
+                raise PoolSaturado()
+            try:
+                futuro = executor.submit(funcion, *args)
+            except BrokenProcessPool:
+                self._cupos.release()
+                self._descartar(executor)
+                continue
+            # El cupo se libera cuando el trabajo termina, no cuando se deja de esperarlo
+            futuro.add_done_callback(lambda _: self._cupos.release())
+            try:
+                return futuro.result(timeout=self.timeout)
+            except TimeoutError:
+                raise PoolSaturado()
+            except BrokenProcessPool:
+                self._descartar(executor)
+        raise PoolSaturado()
+
+    def hash(self, password):
+        return self._ejecutar(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        if not pwhash:
+            return False
+        return self._ejecutar(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True si el hash se generó con un método o costo distinto al configurado."""
+        return pwhash.split("$", 1)[0] != metodo_completo(self.method)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,223 @@
+"""
+Estadísticas acumuladas de cada jugador por torneo.
+
+Cada fila de `JugadorStats` suma, para un jugador dentro de un torneo, los
+partidos jugados (filas de `EstadisticaJugador`), goles, asistencias,
+autogoles, MVPs y menciones. Como la tabla de posiciones, las filas se
+actualizan en la misma transacción en la que se escribe un `Partido` o una
+`EstadisticaJugador` (incluido Flask-Admin), así que la carrera de un jugador
+se lee sin volver a agregar las estadísticas. `flask rebuild-player-stats`
+las recalcula desde cero.
+
+Cada cambio aplicado a `JugadorStats` se registra también para los rankings
+(`api.leaderboards.registrar_cambios`), que se actualizan tras el commit.
+"""
+from sqlalchemy import event, inspect
+
+from api.models import db, Jugador, Torneo, Partido, EstadisticaJugador, JugadorStats
+from api.leaderboards import registrar_cambios
+
+CAMPOS = ("partidos_jugados", "goles", "asistencias", "autogoles", "mvps", "menciones")
+CAMPOS_PREMIOS = ("mvp_id", "mencion_equipo_a_id", "mencion_equipo_b_id")
+
+
+def _nueva_fila(jugador_id, torneo_id):
+    return JugadorStats(jugador_id=jugador_id, torneo_id=torneo_id, **dict.fromkeys(CAMPOS, 0))
+
+
+def aplicar(session, filas, jugador_id, torneo_id, deltas):
+    """
+    Suma `deltas` ({campo: cantidad}) a la fila del jugador en el torneo y los
+    registra para los rankings. `filas` guarda las filas ya resueltas dentro de
+    un mismo flush, porque las pendientes de insertar todavía no están en el
+    identity map.
+    """
+    if jugador_id is None or torneo_id is None:
+        return
+    clave = (jugador_id, torneo_id)
+    fila = filas.get(clave)
+    if fila is None:
+        with session.no_autoflush:
+            fila = session.get(JugadorStats, clave)
+        if fila is None:
+            if all(delta <= 0 for delta in deltas.values()):
+                return  # Nada que descontar
+            fila = _nueva_fila(*clave)
+            session.add(fila)
+        filas[clave] = fila
+    for campo, delta in deltas.items():
+        setattr(fila, campo, (getattr(fila, campo) or 0) + delta)
+    registrar_cambios(session, jugador_id, torneo_id, deltas)
+
+
+def _anterior(obj, campo):
+    historial = inspect(obj).attrs[campo].history
+    return historial.deleted[0] if historial.deleted else getattr(obj, campo)
+
+
+def _deltas_estadistica(valores, signo):
+    return {
+        "partidos_jugados": signo,
+        "goles": signo * (valores("goles") or 0),
+        "asistencias": signo * (valores("asistencias") or 0),
+        "autogoles": signo * (valores("autogoles") or 0),
+    }
+
+
+def _torneo_de(session, estadistica, anterior):
+    partido = estadistica.partido
+    if partido is None:
+        partido_id = _anterior(estadistica, "partido_id") if anterior else estadistica.partido_id
+        with session.no_autoflush:
+            partido = session.get(Partido, partido_id) if partido_id is not None else None
+    if partido is None:
+        return None
+    return _anterior(partido, "torneo_id") if anterior else partido.torneo_id
+
+
+def _aplicar_estadistica(session, filas, estadistica, signo, anterior):
+    valores = (lambda campo: _anterior(estadistica, campo)) if anterior else (lambda campo: getattr(estadistica, campo))
+    aplicar(session, filas, valores("jugador_id"), _torneo_de(session, estadistica, anterior),
+            _deltas_estadistica(valores, signo))
+
+
+def _aplicar_premios(session, filas, partido, signo, anterior):
+    valores = (lambda campo: _anterior(partido, campo)) if anterior else (lambda campo: getattr(partido, campo))
+    torneo_id = valores("torneo_id")
+    for campo in CAMPOS_PREMIOS:
+        metrica = "mvps" if campo == "mvp_id" else "menciones"
+        aplicar(session, filas, valores(campo), torneo_id, {metrica: signo})
+
+
+def _mover_estadisticas(session, filas, partido):
+    """Un partido que cambia de torneo se lleva las estadísticas ya guardadas de sus jugadores."""
+    anterior, actual = _anterior(partido, "torneo_id"), partido.torneo_id
+    with session.no_autoflush:
+        guardadas = session.query(
+            EstadisticaJugador.jugador_id, EstadisticaJugador.goles,
+            EstadisticaJugador.asistencias, EstadisticaJugador.autogoles
+        ).filter(EstadisticaJugador.partido_id == partido.id).all()
+    for fila in guardadas:
+        valores = fila._asdict().get
+        aplicar(session, filas, fila.jugador_id, anterior, _deltas_estadistica(valores, -1))
+        aplicar(session, filas, fila.jugador_id, actual, _deltas_estadistica(valores, 1))
+
+
+def sumar_estadisticas_insertadas(session, filas_insertadas):
+    """
+    Suma las estadísticas insertadas con `bulk_insert_mappings`, que no pasan
+    por `before_flush`. `filas_insertadas` es un iterable de (torneo_id, dict con
+    jugador_id, goles, asistencias y autogoles).
+    """
+    filas = {}
+    for torneo_id, estadistica in filas_insertadas:
+        aplicar(session, filas, estadistica["jugador_id"], torneo_id, _deltas_estadistica(estadistica.get, 1))
+
+
+@event.listens_for(db.session, "before_flush")
+def actualizar_jugador_stats(session, flush_context, instances):
+    """Mantiene `JugadorStats` al día con los partidos y estadísticas que se van a escribir."""
+    filas = {}
+
+    for obj in list(session.new):
+        if isinstance(obj, EstadisticaJugador):
+            _aplicar_estadistica(session, filas, obj, 1, False)
+        elif isinstance(obj, Partido):
+            _aplicar_premios(session, filas, obj, 1, False)
+
+    for obj in list(session.dirty):
+        if isinstance(obj, EstadisticaJugador) and session.is_modified(obj):
+            _aplicar_estadistica(session, filas, obj, -1, True)
+            _aplicar_estadistica(session, filas, obj, 1, False)
+        elif isinstance(obj, Partido) and session.is_modified(obj):
+            _aplicar_premios(session, filas, obj, -1, True)
+            _aplicar_premios(session, filas, obj, 1, False)
+            if inspect(obj).attrs.torneo_id.history.has_changes():
+                _mover_estadisticas(session, filas, obj)
+
+    for obj in list(session.deleted):
+        if isinstance(obj, EstadisticaJugador):
+            _aplicar_estadistica(session, filas, obj, -1, True)
+        elif isinstance(obj, Partido):
+            _aplicar_premios(session, filas, obj, -1, True)
+
+
+def _agregar(torneo_id=None):
+    """Calcula desde las tablas de partidos los totales {(jugador_id, torneo_id): {campo: valor}}."""
+    totales = {}
+
+    def sumar(jugador_id, torneo, campo, valor):
+        fila = totales.setdefault((jugador_id, torneo), dict.fromkeys(CAMPOS, 0))
+        fila[campo] += int(valor or 0)
+
+    estadisticas = db.session.query(
+        EstadisticaJugador.jugador_id, Partido.torneo_id, db.func.count(),
+        db.func.sum(EstadisticaJugador.goles), db.func.sum(EstadisticaJugador.asistencias),
+        db.func.sum(EstadisticaJugador.autogoles)
+    ).join(Partido, Partido.id == EstadisticaJugador.partido_id)
+    if torneo_id is not None:
+        estadisticas = estadisticas.filter(Partido.torneo_id == torneo_id)
+    for jugador_id, torneo, jugados, goles, asistencias, autogoles in estadisticas.group_by(
+        EstadisticaJugador.jugador_id, Partido.torneo_id
+    ):
+        sumar(jugador_id, torneo, "partidos_jugados", jugados)
+        sumar(jugador_id, torneo, "goles", goles)
+        sumar(jugador_id, torneo, "asistencias", asistencias)
+        sumar(jugador_id, torneo, "autogoles", autogoles)
+
+    for campo in CAMPOS_PREMIOS:
+        columna = getattr(Partido, campo)
+        metrica = "mvps" if campo == "mvp_id" else "menciones"
+        consulta = db.session.query(columna, Partido.torneo_id, db.func.count()).filter(columna.isnot(None))
+        if torneo_id is not None:
+            consulta = consulta.filter(Partido.torneo_id == torneo_id)
+        for jugador_id, torneo, total in consulta.group_by(columna, Partido.torneo_id):
+            sumar(jugador_id, torneo, metrica, total)
+
+    return totales
+
+
+def reconstruir_jugador_stats(torneo_id=None):
+    """
+    Borra y recalcula las estadísticas acumuladas a partir de los partidos
+    guardados, de un torneo o de todos. Devuelve el número de filas.
+    """
+    borrar = JugadorStats.query
+    if torneo_id is not None:
+        borrar = borrar.filter(JugadorStats.torneo_id == torneo_id)
+    borrar.delete(synchronize_session=False)
+
+    totales = _agregar(torneo_id)
+    db.session.bulk_insert_mappings(JugadorStats, [
+        {"jugador_id": jugador_id, "torneo_id": torneo, **valores}
+        for (jugador_id, torneo), valores in totales.items()
+    ])
+    db.session.commit()
+    return len(totales)
+
+
+def filas_por_torneo(jugador_id):
+    """Filas (JugadorStats, nombre del torneo, modalidad) del jugador, del torneo más reciente al más antiguo."""
+    return db.session.query(JugadorStats, Torneo.nombre, Torneo.modalidad).join(
+        Torneo, Torneo.id == JugadorStats.torneo_id
+    ).filter(JugadorStats.jugador_id == jugador_id).order_by(JugadorStats.torneo_id.desc()).all()
+
+
+def obtener_estadisticas_jugador(jugador_id):
+    """
+    Devuelve la carrera de un jugador: totales y el detalle por torneo (del más
+    reciente al más antiguo). None si el jugador no existe.
+    """
+    jugador = db.session.query(Jugador.id, Jugador.nickhabbo).filter(Jugador.id == jugador_id).first()
+    if jugador is None:
+        return None
+
+    totales = dict.fromkeys(CAMPOS, 0)
+    torneos = []
+    for fila, nombre, modalidad in filas_por_torneo(jugador_id):
+        valores = {campo: getattr(fila, campo) for campo in CAMPOS}
+        for campo, valor in valores.items():
+            totales[campo] += valor
+        torneos.append({"torneo_id": fila.torneo_id, "torneo": nombre, "modalidad": modalidad, **valores})
+
+    return {"jugador_id": jugador.id, "nickhabbo": jugador.nickhabbo, "totales": totales, "torneos": torneos}
@@ -0,0 +1,139 @@
+"""
+Perfil público de un jugador (`/jugadores/<id>/perfil`).
+
+Se arma con tres consultas, sin importar cuántos equipos, torneos o partidos
+tenga el jugador:
+
+1. El jugador con sus equipos y el torneo de cada uno (JOINs explícitos).
+2. Sus filas de `JugadorStats` con el nombre del torneo (totales y premios).
+3. Sus últimos partidos con estadísticas, con los nombres de ambos equipos.
+
+La respuesta se cachea por jugador (etiqueta `jugador:<id>`). Además de las
+etiquetas que ya invalidan las rutas (`tablas`, `equipos`), un listener de la
+sesión invalida el perfil de cada jugador afectado por un commit que toca
+sus datos, sus equipos, sus estadísticas o sus premios (incluido Flask-Admin).
+"""
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import aliased, joinedload
+
+from api.models import db, Jugador, JugadorEquipo, Equipo, Torneo, Partido, EstadisticaJugador
+from api.cache import response_cache
+from api.player_stats import CAMPOS, filas_por_torneo
+
+PARTIDOS_POR_DEFECTO = 10
+PARTIDOS_MAXIMO = 50
+
+
+def _etiqueta(jugador_id):
+    return f"jugador:{jugador_id}"
+
+
+def _partidos_recientes(jugador_id, cantidad):
+    equipo_a = aliased(Equipo)
+    equipo_b = aliased(Equipo)
+    filas = db.session.query(
+        Partido, EstadisticaJugador, equipo_a.nombre, equipo_b.nombre, Torneo.nombre
+    ).join(
+        EstadisticaJugador, EstadisticaJugador.partido_id == Partido.id
+    ).join(
+        equipo_a, equipo_a.id == Partido.equipo_a_id
+    ).join(
+        equipo_b, equipo_b.id == Partido.equipo_b_id
+    ).join(
+        Torneo, Torneo.id == Partido.torneo_id
+    ).filter(
+        EstadisticaJugador.jugador_id == jugador_id
+    ).order_by(Partido.fecha.desc(), Partido.id.desc()).limit(cantidad).all()
+
+    return [
+        {
+            "id": partido.id,
+            "fecha": partido.fecha.strftime("%Y-%m-%d %H:%M:%S"),
+            "torneo_id": partido.torneo_id,
+            "torneo": torneo,
+            "equipo_a": equipo_a_nombre,
+            "equipo_b": equipo_b_nombre,
+            "goles_equipo_a": partido.goles_equipo_a,
+            "goles_equipo_b": partido.goles_equipo_b,
+            "goles": estadistica.goles,
+            "asistencias": estadistica.asistencias,
+            "autogoles": estadistica.autogoles,
+            "mvp": partido.mvp_id == jugador_id,
+            "mencion": jugador_id in (partido.mencion_equipo_a_id, partido.mencion_equipo_b_id)
+        }
+        for partido, estadistica, equipo_a_nombre, equipo_b_nombre, torneo in filas
+    ]
+
+
+def obtener_perfil(jugador_id, partidos=PARTIDOS_POR_DEFECTO):
+    """Devuelve el perfil del jugador con sus últimos `partidos`, o None si no existe."""
+    equipos = joinedload(Jugador.jugadores_equipos).joinedload(JugadorEquipo.equipo)
+    jugador = Jugador.query.options(
+        equipos.lazyload(Equipo.jugadores_equipos),
+        equipos.joinedload(Equipo.torneo)
+    ).filter(Jugador.id == jugador_id).first()
+    if jugador is None:
+        return None
+
+    equipos_por_modalidad = {}
+    for je in jugador.jugadores_equipos:
+        equipos_por_modalidad.setdefault(je.modalidad, []).append({
+            "id": je.equipo.id,
+            "nombre": je.equipo.nombre,
+            "logo_url": je.equipo.logo_url,
+            "torneo_id": je.equipo.torneo_id,
+            "torneo": je.equipo.torneo.nombre
+        })
+
+    totales = dict.fromkeys(CAMPOS, 0)
+    premios_por_torneo = []
+    for fila, torneo, _ in filas_por_torneo(jugador_id):
+        for campo in CAMPOS:
+            totales[campo] += getattr(fila, campo)
+        if fila.mvps or fila.menciones:
+            premios_por_torneo.append({
+                "torneo_id": fila.torneo_id, "torneo": torneo, "mvps": fila.mvps, "menciones": fila.menciones
+            })
+
+    return {
+        "id": jugador.id,
+        "nickhabbo": jugador.nickhabbo,
+        "role": jugador.role,
+        "equipos": equipos_por_modalidad,
+        "totales": totales,
+        "premios": {"mvps": totales["mvps"], "menciones": totales["menciones"], "por_torneo": premios_por_torneo},
+        "partidos_recientes": _partidos_recientes(jugador_id, partidos)
+    }
+
+
+# 🔹 Invalidación: jugadores cuyos datos, equipos, estadísticas o premios cambian en un commit
+
+def _valores(obj, campo):
+    # sum() tolera los lados vacíos (None) de un atributo que nunca se asignó
+    return set(inspect(obj).attrs[campo].history.sum())
+
+
+@event.listens_for(db.session, "before_flush")
+def registrar_perfiles_cambiados(session, flush_context, instances):
+    cambiados = session.info.setdefault("perfiles_cambiados", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Jugador):
+            cambiados.add(obj.id)
+        elif isinstance(obj, (JugadorEquipo, EstadisticaJugador)):
+            cambiados.update(_valores(obj, "jugador_id"))
+        elif isinstance(obj, Partido):
+            for campo in ("mvp_id", "mencion_equipo_a_id", "mencion_equipo_b_id"):
+                cambiados.update(_valores(obj, campo))
+    cambiados.discard(None)
+
+
+@event.listens_for(db.session, "after_commit")
+def invalidar_perfiles(session):
+    cambiados = session.info.pop("perfiles_cambiados", None)
+    if cambiados:
+        response_cache.invalidate(*[_etiqueta(jugador_id) for jugador_id in cambiados])
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def descartar_perfiles_cambiados(session, previous_transaction):
+    session.info.pop("perfiles_cambiados", None)
@@ -0,0 +1,199 @@
+"""
+Enrutado de lecturas a una réplica de la base de datos.
+
+Si se configura `DATABASE_REPLICA_URL`, las peticiones GET/HEAD del blueprint
+`api` leen de la réplica y todo lo demás (escrituras, Flask-Admin, comandos,
+hilos en segundo plano) usa la base principal. Dentro de una petición que
+lee de la réplica, cualquier flush o sentencia INSERT/UPDATE/DELETE la pasa a
+la principal hasta el final.
+
+Para que un usuario vea lo que acaba de escribir pese al retraso de la
+réplica, después de cada petición de escritura exitosa sus lecturas van a la
+principal durante `DATABASE_REPLICA_STICKY_SECONDS`. El usuario se identifica
+por el JWT (o por la IP si no hay token) y la marca se guarda en Redis para
+que valga en todos los workers; sin Redis se usa memoria del proceso.
+
+Las opciones de pool se configuran por destino con variables de entorno
+`DATABASE_POOL_*` (principal) y `DATABASE_REPLICA_POOL_*` (réplica).
+"""
+import os
+import threading
+import time
+
+from flask import g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_sqlalchemy import SQLAlchemy
+from redis import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import create_engine, orm
+
+from extensions import REDIS_URL
+
+try:
+    from flask_sqlalchemy.session import Session as SesionBase  # Flask-SQLAlchemy 3.x (Pipfile.lock)
+except ImportError:
+    from flask_sqlalchemy import SignallingSession as SesionBase  # Flask-SQLAlchemy 2.x
+
+METODOS_DE_LECTURA = ("GET", "HEAD", "OPTIONS")
+PREFIJO = "habbofutbol:replica:sticky"
+
+# Variable de entorno (sin prefijo) → (opción de create_engine, conversión)
+OPCIONES_DE_POOL = {
+    "POOL_SIZE": ("pool_size", int),
+    "MAX_OVERFLOW": ("max_overflow", int),
+    "POOL_TIMEOUT": ("pool_timeout", float),
+    "POOL_RECYCLE": ("pool_recycle", int),
+    "POOL_PRE_PING": ("pool_pre_ping", lambda valor: valor.lower() == "true"),
+}
+
+
+def opciones_de_pool(prefijo):
+    """
+    Lee `{prefijo}_POOL_SIZE`, `{prefijo}_MAX_OVERFLOW`, etc. y devuelve las
+    opciones de `create_engine` que estén definidas (SQLite no acepta todas).
+    """
+    opciones = {}
+    for variable, (opcion, convertir) in OPCIONES_DE_POOL.items():
+        valor = os.getenv(f"{prefijo}_{variable}")
+        if valor:
+            opciones[opcion] = convertir(valor)
+    return opciones
+
+
+class MemoryStickiness:
+    """Marcas de lectura en la principal con vencimiento, en memoria del proceso."""
+
+    def __init__(self):
+        self._vencimientos = {}
+        self._lock = threading.Lock()
+
+    def marcar(self, clave, segundos):
+        ahora = time.monotonic()
+        with self._lock:
+            self._vencimientos[clave] = ahora + segundos
+            if len(self._vencimientos) > 10000:
+                self._vencimientos = {c: v for c, v in self._vencimientos.items() if v > ahora}
+
+    def activa(self, clave):
+        with self._lock:
+            vence = self._vencimientos.get(clave)
+        return vence is not None and vence > time.monotonic()
+
+
+class RedisStickiness:
+    """Marcas compartidas por todos los workers (`SET ... PX`)."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def marcar(self, clave, segundos):
+        self.client.set(f"{PREFIJO}:{clave}", 1, px=max(1, int(segundos * 1000)))
+
+    def activa(self, clave):
+        return self.client.exists(f"{PREFIJO}:{clave}") > 0
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.engine = None
+        self.sticky_seconds = 5.0
+        self.stickiness = MemoryStickiness()
+
+    def init_app(self, app):
+        url = app.config.setdefault("DATABASE_REPLICA_URL", None)
+        opciones = app.config.setdefault("DATABASE_REPLICA_ENGINE_OPTIONS", {})
+        self.sticky_seconds = app.config.setdefault("DATABASE_REPLICA_STICKY_SECONDS", self.sticky_seconds)
+
+        if self.engine is not None:
+            self.engine.dispose()
+            self.engine = None
+        if not url:
+            return
+        self.engine = create_engine(url.replace("postgres://", "postgresql://", 1), **opciones)
+
+        redis_url = app.config.setdefault("DATABASE_REPLICA_STICKY_REDIS_URL", REDIS_URL)
+        if redis_url:
+            try:
+                client = Redis.from_url(redis_url, socket_connect_timeout=0.5, socket_timeout=1)
+                client.ping()
+                self.stickiness = RedisStickiness(client)
+            except RedisError as e:
+                print(f"⚠️ Redis no disponible para la réplica ({e}); las lecturas tras una escritura "
+                      "solo se fijan a la principal dentro de cada proceso")
+
+        app.before_request(self._iniciar_peticion)
+        app.after_request(self._terminar_peticion)
+
+    # 🔹 Eventos de Flask
+
+    def _clave_usuario(self):
+        try:
+            if verify_jwt_in_request(optional=True):
+                identidad = get_jwt_identity()
+                if identidad is not None:
+                    return f"jugador:{identidad}"
+        except Exception:
+            pass  # Token inválido: la ruta responderá el error si lo exige
+        return f"ip:{request.remote_addr}"
+
+    def _fijada_a_principal(self, clave):
+        try:
+            return self.stickiness.activa(clave)
+        except RedisError:
+            return True  # Ante la duda, leer de la principal
+
+    def _iniciar_peticion(self):
+        if request.blueprint != "api" or request.method not in METODOS_DE_LECTURA:
+            return
+        g._usar_replica = not self._fijada_a_principal(self._clave_usuario())
+
+    def _terminar_peticion(self, response):
+        if request.blueprint != "api" or response.status_code >= 400:
+            return response
+        if request.method not in METODOS_DE_LECTURA or g.get("_escritura_en_lectura"):
+            try:
+                self.stickiness.marcar(self._clave_usuario(), self.sticky_seconds)
+            except RedisError as e:
+                print(f"⚠️ No se pudo fijar la lectura a la principal: {e}")
+        return response
+
+    # 🔹 Elección del engine
+
+    def engine_para(self, session, clause=None):
+        """Devuelve el engine de la réplica si corresponde usarlo, o None para la principal."""
+        if self.engine is None or not has_request_context() or not g.get("_usar_replica"):
+            return None
+        if session._flushing or getattr(clause, "is_dml", False):
+            # A partir de una escritura, el resto de la petición lee de la principal
+            g._usar_replica = False
+            g._escritura_en_lectura = True
+            return None
+        return self.engine
+
+
+replica_router = ReplicaRouter()
+
+
+class RoutingSession(SesionBase):
+    """Sesión de Flask-SQLAlchemy que consulta a `replica_router` antes de elegir el engine."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind  # Conexión explícita (por ejemplo, una transacción externa)
+        replica = replica_router.engine_para(self, clause)
+        if replica is not None:
+            return replica
+        return super().get_bind(mapper, clause)
+
+
+class SQLAlchemyConReplica(SQLAlchemy):
+    """`SQLAlchemy` cuyas sesiones son `RoutingSession`."""
+
+    def _make_session_factory(self, options):
+        # Flask-SQLAlchemy 3.x: `options` son los `session_options` del constructor
+        options.setdefault("class_", RoutingSession)
+        return super()._make_session_factory(options)
+
+    def create_session(self, options):
+        # Flask-SQLAlchemy 2.x
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
@@ -1,18 +1,32 @@
 """
 This module takes care of starting the API Server, Loading the DB and Adding the endpoints
 """
-from flask import Flask, request, jsonify, url_for, Blueprint
+from flask import Flask, request, jsonify, url_for, Blueprint, Response
 from api.models import db, Jugador, Equipo, Torneo, Partido, EstadisticaJugador, Asistencia, JugadorEquipo, Oferta, Convocatoria, Noticia
-from api.utils import generate_sitemap, APIException, get_client_ip, is_valid_password 
+from api.utils import generate_sitemap, APIException, get_client_ip, is_valid_password, get_pagination_args, paginate_keyset
 from flask_cors import CORS
 import os
 from base64 import b64encode
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, verify_jwt_in_request, get_jwt
-import cloudinary.uploader
-from cloudinary.uploader import upload
-from datetime import datetime, timedelta
+from sqlalchemy.orm import joinedload, lazyload
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from datetime import datetime
 from extensions import limiter
+from api.standings import obtener_posiciones, obtener_posiciones_por_grupo
+from api.player_stats import obtener_estadisticas_jugador, sumar_estadisticas_insertadas
+from api.profiles import obtener_perfil, PARTIDOS_POR_DEFECTO, PARTIDOS_MAXIMO
+from api.matchups import cara_a_cara, forma, ULTIMOS_POR_DEFECTO, ULTIMOS_MAXIMO
+from api.fixtures import programar_fixture, FixtureExistente
+from api.brackets import obtener_cuadro
+from api.search import buscar, leer_busqueda
+from api.events import event_bus
+from api.cache import cached_response, response_cache
+from api.auth import roles_required, get_principal, get_optional_principal, principal_cache, Principal
+from api.passwords import password_hasher, PoolSaturado
+from api.attendance import attendance_buffer, BufferLleno
+from api.exports import exportar, consulta_asistencias, consulta_partidos, consulta_estadisticas
+from api.uploads import upload_pool, PoolLleno, ESTADO_PENDIENTE
+from api.metrics import query_metrics
+from api.leaderboards import leaderboards, METRICAS, GLOBAL, TOP_MAXIMO
 
 api = Blueprint('api', __name__)
 
@@ -49,7 +63,10 @@ def add_new_player():
         return jsonify({"error": "El jugador ya está registrado"}), 400
 
     salt = b64encode(os.urandom(32)).decode("utf-8")
-    hashed_password = generate_password_hash(f"{password}{salt}")
+    try:
+        hashed_password = password_hasher.hash(f"{password}{salt}")
+    except PoolSaturado:
+        return jsonify({"error": "Demasiadas solicitudes simultáneas, intenta de nuevo en unos segundos"}), 503
 
     new_player = Jugador(
         name=name, email=email, password=hashed_password, salt=salt,
@@ -66,15 +83,9 @@ def add_new_player():
 
 
 @api.route('/jugadores/noregistrados', methods=['POST'])
-@jwt_required()
+@roles_required("admin")
 def crear_jugador_admin():
     """Permite al administrador registrar un jugador con un NickHabbo"""
-    usuario_actual_id = get_jwt_identity()
-    admin = Jugador.query.get(usuario_actual_id)
-
-    if not admin or admin.role != "admin":
-        return jsonify({"error": "Acceso denegado"}), 403
-
     body = request.json
     nickhabbo = body.get("nickhabbo", "").strip()
 
@@ -99,7 +110,21 @@ def get_all_players():
     """Lista todos los jugadores con sus equipos y modalidades (Público)"""
 
     try:
-        players = Jugador.query.all()
+        # Cargar equipo y torneo de cada relación en la misma consulta (sin una consulta por equipo)
+        equipos = joinedload(Jugador.jugadores_equipos).joinedload(JugadorEquipo.equipo)
+        consulta = Jugador.query.options(
+            equipos.lazyload(Equipo.jugadores_equipos),
+            equipos.joinedload(Equipo.torneo)
+        )
+
+        paginacion = get_pagination_args()
+        if paginacion:
+            limit, cursor = paginacion
+            players, next_cursor = paginate_keyset(
+                consulta, [Jugador.id], lambda p: (p.id,), limit, cursor
+            )
+        else:
+            players = consulta.all()
         
         players_list = []
         for p in players:
@@ -116,8 +141,12 @@ def get_all_players():
                 ]
             })
 
+        if paginacion:
+            return jsonify({"items": players_list, "next_cursor": next_cursor}), 200
         return jsonify(players_list), 200
 
+    except APIException:
+        raise
     except Exception as e:
         return jsonify({"error": f"Error en el servidor: {str(e)}"}), 500
 
@@ -176,18 +205,10 @@ def add_player_to_team():
 
 
 @api.route("/remove_team", methods=["DELETE"])
-@jwt_required()
+@roles_required("admin")
 def remove_team():
     """Solo los Admins pueden eliminar jugadores de un equipo"""
     try:
-        # 🔍 Obtener el rol del usuario autenticado
-        jwt_data = get_jwt()
-        user_role = jwt_data.get("role")
-
-        # 🚫 Solo los admins pueden hacer esto
-        if user_role != "admin":
-            return jsonify({"error": "Acceso denegado"}), 403
-
         # 📌 Obtener datos de la petición
         data = request.json
         player_id = data.get("player_id")
@@ -214,14 +235,8 @@ def remove_team():
 
 
 @api.route('/jugadores/<int:id>', methods=['PUT'])
-@jwt_required()
+@roles_required("admin", mensaje="Acceso no autorizado")
 def modificar_jugador(id):
-    usuario_actual_id = get_jwt_identity()  # Obtiene el ID del usuario autenticado
-    admin = Jugador.query.get(usuario_actual_id)  # Busca al usuario por ID
-
-    if not admin or admin.role != "admin":
-        return jsonify({"error": "Acceso no autorizado"}), 403
-
     body = request.json
     nuevo_nick = body.get("nickhabbo")
 
@@ -240,20 +255,15 @@ def modificar_jugador(id):
 
     try:
         db.session.commit()
+        response_cache.invalidate("jugadores")
         return jsonify({"message": "NickHabbo actualizado correctamente"}), 200
     except Exception as err:
         db.session.rollback()
         return jsonify({"error": f"Error en el servidor: {err.args}"}), 500
     
 @api.route('/jugadores/<int:id>', methods=['DELETE'])
-@jwt_required()
+@roles_required("admin", mensaje="Acceso no autorizado")
 def eliminar_jugador(id):
-    usuario_actual_id = get_jwt_identity()  # Obtiene el ID del usuario autenticado
-    admin = Jugador.query.get(usuario_actual_id)  # Verifica si es administrador
-
-    if not admin or admin.role != "admin":
-        return jsonify({"error": "Acceso no autorizado"}), 403
-
     jugador = Jugador.query.get(id)
 
     if not jugador:
@@ -262,6 +272,7 @@ def eliminar_jugador(id):
     try:
         db.session.delete(jugador)
         db.session.commit()
+        response_cache.invalidate("jugadores")
         return jsonify({"message": "Jugador eliminado correctamente"}), 200
     except Exception as err:
         db.session.rollback()
@@ -286,7 +297,22 @@ def login():
         if not user.is_active:
             return jsonify({"message": "Tu cuenta ha sido deshabilitada. Contacta al administrador."}), 403
 
-        if check_password_hash(user.password, f"{password}{user.salt}"):
+        try:
+            valida = password_hasher.verify(user.password, f"{password}{user.salt}")
+        except PoolSaturado:
+            return jsonify({"message": "Demasiados inicios de sesión simultáneos, intenta de nuevo en unos segundos."}), 503
+
+        if valida:
+            # 🔐 Actualizar el hash si se generó con parámetros anteriores
+            if password_hasher.needs_rehash(user.password):
+                try:
+                    user.password = password_hasher.hash(f"{password}{user.salt}")
+                    db.session.commit()
+                except Exception as err:
+                    db.session.rollback()
+                    print(f"⚠️ No se pudo actualizar el hash del jugador {user.id}: {err}")
+
+            principal_cache.set(Principal(user.id, user.role, True))
             token = create_access_token(identity=str(user.id), additional_claims={"role": user.role})
             return jsonify({"token": token, "role": user.role, "id": user.id}), 200 
         else:
@@ -307,18 +333,19 @@ def registrar_asistencia():
     if not nombre:
         return jsonify({"message": "El nombre es obligatorio"}), 400
 
+    if len(nombre) > 100:
+        return jsonify({"message": "El nombre no puede superar los 100 caracteres"}), 400
+
     ip = request.headers.get("X-Forwarded-For", request.remote_addr)
 
-    # Bloquear si ya registró con el mismo nombre en el último minuto
-    hace_un_minuto = datetime.utcnow() - timedelta(minutes=1)
-    repetido = Asistencia.query.filter_by(nombre=nombre).filter(Asistencia.fecha_hora >= hace_un_minuto).first()
-    if repetido:
+    # Bloquear si ya registró con el mismo nombre en el último minuto; la fila se escribe en lote
+    try:
+        aceptada = attendance_buffer.registrar(nombre, ip)
+    except BufferLleno:
+        return jsonify({"message": "Demasiadas solicitudes simultáneas, intenta de nuevo en unos segundos"}), 503
+    if not aceptada:
         return jsonify({"message": "Ya registraste asistencia recientemente"}), 429
 
-    nueva_asistencia = Asistencia(nombre=nombre, ip=ip)
-    db.session.add(nueva_asistencia)
-    db.session.commit()
-
     return jsonify({"message": "Asistencia registrada correctamente"}), 201
 
 
@@ -327,32 +354,42 @@ def registrar_asistencia():
 @api.route('/asistencia', methods=['GET'])
 def obtener_asistencias():
     """Devuelve todas las asistencias registradas. Solo los admins ven la IP."""
-    es_admin = False
-
-    try:
-        if verify_jwt_in_request(optional=True):  
-            claims = get_jwt_identity()
-            usuario = Jugador.query.get(claims)
-            es_admin = usuario and usuario.role == "admin"
-    except:
-        pass  # Si no hay token, simplemente seguimos sin admin
+    # Si no hay token, simplemente seguimos sin admin
+    principal = get_optional_principal()
+    es_admin = bool(principal and principal.is_active and principal.role == "admin")
+
+    # Incluir las asistencias de este proceso que todavía esperan en el buffer
+    attendance_buffer.flush()
+
+    paginacion = get_pagination_args()
+    if paginacion:
+        limit, cursor = paginacion
+        asistencias, next_cursor = paginate_keyset(
+            Asistencia.query, [Asistencia.id], lambda a: (a.id,), limit, cursor, descending=True
+        )
+        return jsonify({
+            "items": [asistencia.serialize(admin=es_admin) for asistencia in asistencias],
+            "next_cursor": next_cursor
+        })
 
     asistencias = Asistencia.query.all()
     return jsonify([asistencia.serialize(admin=es_admin) for asistencia in asistencias])
 
+
+@api.route('/asistencia/export', methods=['GET'])
+def exportar_asistencias():
+    """Exporta las asistencias en NDJSON o CSV (`?format=`), con filtros `?from=` y `?to=`. Solo los admins ven la IP."""
+    principal = get_optional_principal()
+    es_admin = bool(principal and principal.is_active and principal.role == "admin")
+
+    attendance_buffer.flush()
+    return exportar("asistencias", consulta_asistencias(admin=es_admin))
+
 @api.route('/torneos', methods=['POST'])
-@jwt_required()
+@roles_required("admin")
 def crear_torneo():
     """Solo los Admins pueden crear torneos"""
     try:
-        # 🔍 Obtener el rol del usuario autenticado
-        jwt_data = get_jwt()
-        user_role = jwt_data.get("role")
-
-        # 🚫 Solo los admins pueden crear torneos
-        if user_role != "admin":
-            return jsonify({"error": "Acceso denegado"}), 403
-
         # 📌 Obtener datos de la petición
         data = request.json
 
@@ -372,6 +409,7 @@ def crear_torneo():
         nuevo_torneo = Torneo(nombre=data["nombre"], modalidad=data["modalidad"], formato=data["formato"])
         db.session.add(nuevo_torneo)
         db.session.commit()
+        response_cache.invalidate("torneos")
 
         return jsonify({
             "message": "Torneo creado exitosamente",
@@ -386,7 +424,59 @@ def crear_torneo():
     except Exception as e:
         return jsonify({"error": f"Error en el servidor: {str(e)}"}), 500
 
+@api.route('/torneos/<int:torneo_id>/fixture', methods=['POST'])
+@roles_required("admin")
+def generar_fixture_torneo(torneo_id):
+    """Solo los Admins pueden generar el fixture (todos los partidos programados) de un torneo"""
+    torneo = Torneo.query.get(torneo_id)
+    if not torneo:
+        return jsonify({"error": "Torneo no encontrado"}), 404
+
+    data = request.get_json(silent=True) or {}
+    try:
+        fecha_inicio = datetime.fromisoformat(data["fecha_inicio"]) if data.get("fecha_inicio") else None
+        dias_entre_jornadas = int(data.get("dias_entre_jornadas", 7))
+        grupos = int(data["grupos"]) if data.get("grupos") is not None else None
+        orden = [int(equipo_id) for equipo_id in data["orden"]] if data.get("orden") else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "fecha_inicio debe ser ISO 8601 y dias_entre_jornadas, grupos y orden, enteros"}), 400
+
+    try:
+        resumen = programar_fixture(
+            torneo, fecha_inicio, dias_entre_jornadas, grupos,
+            ida_y_vuelta=bool(data.get("ida_y_vuelta")), orden=orden, reemplazar=bool(data.get("reemplazar"))
+        )
+    except FixtureExistente as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "Error interno en el servidor", "detalle": str(e)}), 500
+
+    if resumen["grupos"]:
+        response_cache.invalidate("equipos", f"tablas:{torneo_id}")
+    return jsonify({"message": f"{resumen['partidos']} partidos programados", **resumen}), 201
+
+
+@api.route('/torneos/<int:torneo_id>/bracket', methods=['GET'])
+@cached_response("bracket:{torneo_id}", "equipos")
+def obtener_bracket(torneo_id):
+    """Cuadro de un torneo de eliminación: rondas, cruces, resultados y campeón"""
+    try:
+        cuadro = obtener_cuadro(torneo_id)
+        if cuadro is None:
+            return jsonify({"error": "Torneo no encontrado"}), 404
+
+        return jsonify(cuadro), 200
+    except Exception as e:
+        return jsonify({"error": "Error al obtener el cuadro", "detalle": str(e)}), 500
+
+
 @api.route('/torneos', methods=['GET'])
+@cached_response("torneos")
 def obtener_torneos():
     try:
         torneos = Torneo.query.all()
@@ -405,18 +495,10 @@ def obtener_torneos():
 
 
 @api.route('/equipos', methods=['POST'])
-@jwt_required()
+@roles_required("admin")
 def crear_equipo():
     """Solo los Admins pueden crear equipos"""
     try:
-        # 🔍 Obtener el rol del usuario autenticado
-        jwt_data = get_jwt()
-        user_role = jwt_data.get("role")
-
-        # 🚫 Solo los admins pueden crear equipos
-        if user_role != "admin":
-            return jsonify({"error": "Acceso denegado"}), 403
-
         # 📌 Obtener datos de la petición
         nombre = request.form.get("nombre")
         torneo_id = request.form.get("torneo_id")
@@ -429,22 +511,25 @@ def crear_equipo():
         except ValueError:
             return jsonify({"error": "El torneo_id debe ser un número entero"}), 400
 
-        # 📌 Procesar logo si existe
+        # 🏆 Guardar equipo en la base de datos; el logo se sube en segundo plano
         logo = request.files.get("logo")
-        logo_url = None
-        if logo:
-            try:
-                result = upload(logo)
-                logo_url = result["secure_url"]
-            except Exception as e:
-                return jsonify({"error": f"Error al subir la imagen: {str(e)}"}), 500
-
-        # 🏆 Guardar equipo en la base de datos
-        nuevo_equipo = Equipo(nombre=nombre, torneo_id=torneo_id, logo_url=logo_url)
+        nuevo_equipo = Equipo(nombre=nombre, torneo_id=torneo_id, logo_estado=ESTADO_PENDIENTE if logo else None)
         db.session.add(nuevo_equipo)
         db.session.commit()
+        response_cache.invalidate("equipos", f"tablas:{torneo_id}")
 
-        return jsonify({"message": "Equipo creado exitosamente"}), 201
+        equipo_id = nuevo_equipo.id
+        logo_estado = nuevo_equipo.logo_estado
+        if logo:
+            try:
+                upload_pool.submit("equipo", equipo_id, logo)
+            except PoolLleno:
+                return jsonify({
+                    "error": "El servidor está procesando demasiadas imágenes, intenta subir el logo más tarde",
+                    "id": equipo_id
+                }), 503
+
+        return jsonify({"message": "Equipo creado exitosamente", "id": equipo_id, "logo_estado": logo_estado}), 201
 
     except Exception as e:
         return jsonify({"error": f"Error en el servidor: {str(e)}"}), 500
@@ -453,21 +538,39 @@ def crear_equipo():
 
 
 
+def _equipos_paginables():
+    """Devuelve (equipos, next_cursor, paginado) según los parámetros `limit`/`cursor` de la petición."""
+    # El torneo se carga en la misma consulta; las relaciones con jugadores no se usan aquí
+    consulta = Equipo.query.options(joinedload(Equipo.torneo), lazyload(Equipo.jugadores_equipos))
+
+    paginacion = get_pagination_args()
+    if not paginacion:
+        return consulta.all(), None, False
+
+    limit, cursor = paginacion
+    equipos, next_cursor = paginate_keyset(consulta, [Equipo.id], lambda e: (e.id,), limit, cursor)
+    return equipos, next_cursor, True
+
+
 @api.route('/equipos', methods=['GET'])
+@cached_response("equipos")
 def obtener_equipos():
-    equipos = Equipo.query.all()
+    equipos, next_cursor, paginado = _equipos_paginables()
     
     equipos_serializados = [
         {"id": equipo.id, "nombre": equipo.nombre, "torneo_id": equipo.torneo_id, "modalidad": equipo.torneo.modalidad if equipo.torneo else "Desconocida"}
         for equipo in equipos
     ]
     
+    if paginado:
+        return jsonify({"items": equipos_serializados, "next_cursor": next_cursor}), 200
     return jsonify(equipos_serializados), 200
 
 
 @api.route('/equipos-con-logo', methods=['GET'])
+@cached_response("equipos")
 def obtener_equipos_con_logo():
-    equipos = Equipo.query.all()
+    equipos, next_cursor, paginado = _equipos_paginables()
     
     equipos_serializados = [
         {
@@ -475,34 +578,72 @@ def obtener_equipos_con_logo():
             "nombre": equipo.nombre,
             "torneo_id": equipo.torneo_id,
             "modalidad": equipo.torneo.modalidad if equipo.torneo else "Desconocida",
-            "logo_url": equipo.logo_url  # ✅ Aquí incluimos la imagen
+            "logo_url": equipo.logo_url,  # ✅ Aquí incluimos la imagen
+            "logo_estado": equipo.logo_estado
         }
         for equipo in equipos
     ]
     
+    if paginado:
+        return jsonify({"items": equipos_serializados, "next_cursor": next_cursor}), 200
     return jsonify(equipos_serializados), 200
     
 
+@api.route('/equipos/<int:equipo_id>/logo', methods=['GET'])
+def obtener_estado_logo(equipo_id):
+    """Estado de la subida del logo de un equipo"""
+    equipo = db.session.query(Equipo.logo_url, Equipo.logo_estado).filter(Equipo.id == equipo_id).first()
+    if not equipo:
+        return jsonify({"error": "Equipo no encontrado"}), 404
+
+    return jsonify({"id": equipo_id, "logo_url": equipo.logo_url, "logo_estado": equipo.logo_estado}), 200
+
+
+def _ultimos_solicitados():
+    """Cantidad de partidos a devolver (`?n=`), acotada a ULTIMOS_MAXIMO."""
+    n = request.args.get("n", ULTIMOS_POR_DEFECTO, type=int)
+    return max(1, min(n, ULTIMOS_MAXIMO))
+
+
+@api.route('/equipos/<int:equipo_a_id>/vs/<int:equipo_b_id>', methods=['GET'])
+@cached_response("equipo:{equipo_a_id}", "equipo:{equipo_b_id}", "equipos")
+def obtener_cara_a_cara(equipo_a_id, equipo_b_id):
+    """Historial entre dos equipos (ganados, empates, goles) y sus últimos enfrentamientos (`?n=`)"""
+    if equipo_a_id == equipo_b_id:
+        return jsonify({"error": "Los equipos deben ser distintos"}), 400
+
+    resultado = cara_a_cara(equipo_a_id, equipo_b_id, _ultimos_solicitados())
+    if resultado is None:
+        return jsonify({"error": "Equipo no encontrado"}), 404
+
+    return jsonify(resultado), 200
+
+
+@api.route('/equipos/<int:equipo_id>/forma', methods=['GET'])
+@cached_response("equipo:{equipo_id}", "equipos")
+def obtener_forma_de_equipo(equipo_id):
+    """Últimos `?n=` resultados de un equipo (G/E/P) con sus rivales"""
+    resultado = forma(equipo_id, _ultimos_solicitados())
+    if resultado is None:
+        return jsonify({"error": "Equipo no encontrado"}), 404
+
+    return jsonify(resultado), 200
+
+
 @api.route('/equipos/<int:equipo_id>', methods=['DELETE'])
-@jwt_required()
+@roles_required("admin")
 def eliminar_equipo(equipo_id):
     """Solo los Admins pueden eliminar equipos"""
     try:
-        # 🔍 Obtener el rol del usuario autenticado
-        jwt_data = get_jwt()
-        user_role = jwt_data.get("role")
-
-        # 🚫 Solo los admins pueden eliminar equipos
-        if user_role != "admin":
-            return jsonify({"error": "Acceso denegado"}), 403
-
         # 📌 Buscar el equipo en la base de datos
         equipo = Equipo.query.get(equipo_id)
         if not equipo:
             return jsonify({"message": "Equipo no encontrado"}), 404
 
+        torneo_id = equipo.torneo_id
         db.session.delete(equipo)
         db.session.commit()
+        response_cache.invalidate("equipos", f"tablas:{torneo_id}", "tablas")
 
         return jsonify({"message": "Equipo eliminado correctamente"}), 200
 
@@ -511,18 +652,10 @@ def eliminar_equipo(equipo_id):
 
 
 @api.route('/torneos/<int:torneo_id>', methods=['DELETE'])
-@jwt_required()
+@roles_required("admin")
 def eliminar_torneo(torneo_id):
     """Solo los Admins pueden eliminar torneos"""
     try:
-        # 🔍 Obtener el rol del usuario autenticado
-        jwt_data = get_jwt()
-        user_role = jwt_data.get("role")
-
-        # 🚫 Solo los admins pueden eliminar torneos
-        if user_role != "admin":
-            return jsonify({"error": "Acceso denegado"}), 403
-
         # 📌 Buscar el torneo en la base de datos
         torneo = Torneo.query.get(torneo_id)
         if not torneo:
@@ -530,6 +663,7 @@ def eliminar_torneo(torneo_id):
 
         db.session.delete(torneo)
         db.session.commit()
+        response_cache.invalidate("torneos", "equipos", f"tablas:{torneo_id}", "tablas")
 
         return jsonify({"message": "Torneo eliminado exitosamente"}), 200
 
@@ -541,17 +675,10 @@ def eliminar_torneo(torneo_id):
 
 
 @api.route('/partidos', methods=['POST'])
-@jwt_required()
+@roles_required("admin", "arbitro", mensaje="Acceso denegado. Solo administradores y árbitros pueden registrar partidos.")
 def registrar_partido():
     """Registrar un partido (Solo Admins o Árbitros)"""
     try:
-        current_user_id = get_jwt_identity()
-        usuario = Jugador.query.get(current_user_id)
-
-        # 🔥 Validar que el usuario sea admin o árbitro
-        if not usuario or usuario.role not in ["admin", "arbitro"]:
-            return jsonify({"error": "Acceso denegado. Solo administradores y árbitros pueden registrar partidos."}), 403
-
         # 📌 Obtener los datos del partido
         data = request.get_json()
         if not data:
@@ -583,6 +710,7 @@ def registrar_partido():
             mvp_id=int(data["mvp_id"]),
             mencion_equipo_a_id=int(data["mencion_equipo_a_id"]),
             mencion_equipo_b_id=int(data["mencion_equipo_b_id"]),
+            **{campo: int(data.get(campo) or 0) for campo in CAMPOS_TARJETAS},
             link_video=data.get("link_video"),
             observaciones=data.get("observaciones")
         )
@@ -628,6 +756,172 @@ def registrar_partido():
         return jsonify({"error": "Error interno en el servidor", "detalle": str(e)}), 500
 
 
+MAX_PARTIDOS_BULK = 500
+CAMPOS_PARTIDO = [
+    "torneo_id", "equipo_a_id", "equipo_b_id", "juez",
+    "goles_equipo_a", "goles_equipo_b",
+    "mvp_id", "mencion_equipo_a_id", "mencion_equipo_b_id"
+]
+CAMPOS_ENTEROS_PARTIDO = [campo for campo in CAMPOS_PARTIDO if campo != "juez"]
+CAMPOS_TARJETAS = ["amarillas_equipo_a", "amarillas_equipo_b", "rojas_equipo_a", "rojas_equipo_b"]  # Opcionales
+
+
+def _normalizar_partido(data):
+    """Valida la forma de un partido del lote y convierte los IDs y goles a enteros."""
+    if not isinstance(data, dict):
+        raise ValueError("Cada partido debe ser un objeto")
+
+    for field in CAMPOS_PARTIDO:
+        if field not in data or not str(data[field]).strip():
+            raise ValueError(f"Falta el campo requerido: {field}")
+
+    partido = dict(data)
+    for field in CAMPOS_ENTEROS_PARTIDO:
+        try:
+            partido[field] = int(data[field])
+        except (TypeError, ValueError):
+            raise ValueError(f"El campo {field} debe ser un número entero")
+    for field in CAMPOS_TARJETAS:
+        try:
+            partido[field] = int(data.get(field) or 0)
+        except (TypeError, ValueError):
+            raise ValueError(f"El campo {field} debe ser un número entero")
+
+    if partido["equipo_a_id"] == partido["equipo_b_id"]:
+        raise ValueError("Un equipo no puede jugar contra sí mismo")
+
+    estadisticas = data.get("estadisticas") or []
+    if not isinstance(estadisticas, list):
+        raise ValueError("estadisticas debe ser una lista")
+    partido["estadisticas"] = []
+    for estadistica in estadisticas:
+        try:
+            partido["estadisticas"].append({
+                "jugador_id": int(estadistica["jugador_id"]),
+                "goles": int(estadistica.get("goles", 0)),
+                "asistencias": int(estadistica.get("asistencias", 0)),
+                "autogoles": int(estadistica.get("autogoles", 0))
+            })
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise ValueError("Cada estadística necesita un jugador_id y valores enteros")
+
+    return partido
+
+
+def _jugadores_del_partido(partido):
+    ids = {partido["mvp_id"], partido["mencion_equipo_a_id"], partido["mencion_equipo_b_id"]}
+    ids.update(estadistica["jugador_id"] for estadistica in partido["estadisticas"])
+    return ids
+
+
+@api.route('/partidos/bulk', methods=['POST'])
+@roles_required("admin", "arbitro", mensaje="Acceso denegado. Solo administradores y árbitros pueden registrar partidos.")
+def registrar_partidos_bulk():
+    """Registrar una jornada completa en una sola transacción (Solo Admins o Árbitros)"""
+    try:
+        data = request.get_json()
+        if not isinstance(data, list) or not data:
+            return jsonify({"error": "Se espera una lista de partidos"}), 400
+        if len(data) > MAX_PARTIDOS_BULK:
+            return jsonify({"error": f"Máximo {MAX_PARTIDOS_BULK} partidos por solicitud"}), 400
+
+        # 📌 1. Validar la forma de cada partido
+        resultados = []
+        partidos = []
+        for index, item in enumerate(data):
+            try:
+                partidos.append(_normalizar_partido(item))
+                resultados.append({"index": index, "status": "ok"})
+            except ValueError as e:
+                partidos.append(None)
+                resultados.append({"index": index, "status": "error", "error": str(e)})
+
+        # 📌 2. Buscar torneos, equipos y jugadores del lote con una consulta por tabla
+        validos = [p for p in partidos if p]
+        torneo_ids = {p["torneo_id"] for p in validos}
+        equipo_ids = {p[campo] for p in validos for campo in ("equipo_a_id", "equipo_b_id")}
+        jugador_ids = set().union(*[_jugadores_del_partido(p) for p in validos]) if validos else set()
+
+        torneos = {t.id for t in db.session.query(Torneo.id).filter(Torneo.id.in_(torneo_ids))} if torneo_ids else set()
+        equipos = dict(db.session.query(Equipo.id, Equipo.torneo_id).filter(Equipo.id.in_(equipo_ids))) if equipo_ids else {}
+        jugadores = {j.id for j in db.session.query(Jugador.id).filter(Jugador.id.in_(jugador_ids))} if jugador_ids else set()
+
+        for partido, resultado in zip(partidos, resultados):
+            if partido is None:
+                continue
+            error = None
+            if partido["torneo_id"] not in torneos:
+                error = "El torneo seleccionado no existe"
+            else:
+                for campo in ("equipo_a_id", "equipo_b_id"):
+                    if partido[campo] not in equipos:
+                        error = f"El equipo {partido[campo]} no existe"
+                        break
+                    if equipos[partido[campo]] != partido["torneo_id"]:
+                        error = f"El equipo {partido[campo]} no pertenece al torneo"
+                        break
+            if error is None:
+                faltantes = sorted(_jugadores_del_partido(partido) - jugadores)
+                if faltantes:
+                    error = f"Jugadores inexistentes: {faltantes}"
+            if error:
+                resultado.update({"status": "error", "error": error})
+
+        if any(r["status"] == "error" for r in resultados):
+            return jsonify({"error": "Hay partidos inválidos; no se registró ninguno", "resultados": resultados}), 400
+
+        # 📌 3. Insertar todo en una transacción: los partidos en un flush y las
+        #       estadísticas en un único INSERT por lotes (executemany)
+        nuevos = []
+        for partido in partidos:
+            nuevo_partido = Partido(
+                torneo_id=partido["torneo_id"],
+                equipo_a_id=partido["equipo_a_id"],
+                equipo_b_id=partido["equipo_b_id"],
+                juez=partido["juez"],
+                goles_equipo_a=partido["goles_equipo_a"],
+                goles_equipo_b=partido["goles_equipo_b"],
+                mvp_id=partido["mvp_id"],
+                mencion_equipo_a_id=partido["mencion_equipo_a_id"],
+                mencion_equipo_b_id=partido["mencion_equipo_b_id"],
+                **{campo: partido[campo] for campo in CAMPOS_TARJETAS},
+                link_video=partido.get("link_video"),
+                observaciones=partido.get("observaciones")
+            )
+            nuevos.append(nuevo_partido)
+
+        db.session.add_all(nuevos)
+        db.session.flush()
+        ids = [nuevo_partido.id for nuevo_partido in nuevos]
+
+        estadisticas = [
+            dict(estadistica, partido_id=partido_id)
+            for partido_id, partido in zip(ids, partidos)
+            for estadistica in partido["estadisticas"]
+        ]
+        db.session.bulk_insert_mappings(EstadisticaJugador, estadisticas)
+        insertadas = [
+            (partido["torneo_id"], estadistica)
+            for partido in partidos
+            for estadistica in partido["estadisticas"]
+        ]
+        sumar_estadisticas_insertadas(db.session, insertadas)
+
+        db.session.commit()
+
+        for partido_id, resultado in zip(ids, resultados):
+            resultado["id"] = partido_id
+
+        return jsonify({
+            "message": f"{len(nuevos)} partidos registrados correctamente",
+            "resultados": resultados
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "Error interno en el servidor", "detalle": str(e)}), 500
+
+
 
 
 @api.route('/equipos/torneo/<int:torneo_id>', methods=['GET'])
@@ -648,28 +942,57 @@ def obtener_equipos_por_torneo(torneo_id):
 @api.route('/partidos', methods=['GET'])
 def obtener_partidos():
     try:
-        partidos = Partido.query.order_by(Partido.fecha.desc()).all()
+        # 📌 Consulta 1: partidos con la modalidad de su torneo
+        consulta = db.session.query(Partido, Torneo.modalidad).outerjoin(
+            Torneo, Torneo.id == Partido.torneo_id
+        ).order_by(Partido.fecha.desc())
+
+        paginacion = get_pagination_args()
+        if paginacion:
+            limit, cursor = paginacion
+            partidos, next_cursor = paginate_keyset(
+                consulta, [Partido.fecha, Partido.id],
+                lambda fila: (fila[0].fecha, fila[0].id), limit, cursor, descending=True
+            )
+        else:
+            partidos = consulta.all()
+
+        # 📌 Consulta 2: las estadísticas de esos partidos agrupadas por partido
+        estadisticas_por_partido = {}
+        estadisticas = db.session.query(
+            EstadisticaJugador.partido_id,
+            EstadisticaJugador.jugador_id,
+            EstadisticaJugador.goles,
+            EstadisticaJugador.asistencias,
+            EstadisticaJugador.autogoles
+        ).order_by(EstadisticaJugador.id)
+        if paginacion:
+            estadisticas = estadisticas.filter(
+                EstadisticaJugador.partido_id.in_([partido.id for partido, _ in partidos])
+            )
+        for estadistica in estadisticas:
+            estadisticas_por_partido.setdefault(estadistica.partido_id, []).append(estadistica)
+
+        # 📌 Consulta 3: mapa jugador → equipos para resolver el equipo de cada estadística
+        equipos_por_jugador = {}
+        for jugador_id, equipo_id in db.session.query(JugadorEquipo.jugador_id, JugadorEquipo.equipo_id):
+            equipos_por_jugador.setdefault(jugador_id, set()).add(equipo_id)
+
         partidos_json = []
 
-        for partido in partidos:
+        for partido, modalidad in partidos:
             estadisticas_json = []
-            
-            for estadistica in partido.estadisticas:
-                # ⚠️ Obtener el jugador directamente de la estadística
-                jugador_id = estadistica.jugador_id
-                
-                # ⚠️ Buscar el equipo en jugadores_equipos
-                equipo_id = db.session.query(JugadorEquipo.equipo_id).filter(
-                    JugadorEquipo.jugador_id == jugador_id,
-                    JugadorEquipo.equipo_id.in_([partido.equipo_a_id, partido.equipo_b_id])
-                ).scalar()
-
-                # ⚠️ Imprimir para depuración
-                print(f"🔍 Jugador ID: {jugador_id}, Equipo ID: {equipo_id}")
+
+            for estadistica in estadisticas_por_partido.get(partido.id, []):
+                equipos_jugador = equipos_por_jugador.get(estadistica.jugador_id, ())
+                equipo_id = next(
+                    (e for e in (partido.equipo_a_id, partido.equipo_b_id) if e in equipos_jugador),
+                    None
+                )
 
                 estadisticas_json.append({
-                    "jugador_id": jugador_id,
-                    "equipo_id": equipo_id,  # ✅ Ahora obtenemos correctamente el equipo del jugador
+                    "jugador_id": estadistica.jugador_id,
+                    "equipo_id": equipo_id,
                     "goles": estadistica.goles,
                     "asistencias": estadistica.asistencias,
                     "autogoles": estadistica.autogoles
@@ -689,17 +1012,33 @@ def obtener_partidos():
                 "mencion_equipo_a_id": partido.mencion_equipo_a_id,
                 "mencion_equipo_b_id": partido.mencion_equipo_b_id,
                 "observaciones": partido.observaciones,
-                "modalidad": partido.torneo.modalidad if partido.torneo else None,
+                "modalidad": modalidad,
                 "link_video": partido.link_video,
                 "estadisticas": estadisticas_json  
             })
 
+        if paginacion:
+            return jsonify({"items": partidos_json, "next_cursor": next_cursor}), 200
         return jsonify(partidos_json), 200
+    except APIException:
+        raise
     except Exception as e:
         print(f"⚠️ Error en obtener_partidos: {str(e)}") 
         return jsonify({"error": "Error al obtener los partidos", "detalle": str(e)}), 500
 
 
+@api.route('/partidos/export', methods=['GET'])
+def exportar_partidos():
+    """Exporta los partidos en NDJSON o CSV (`?format=`), con filtros `?from=`, `?to=` y `?torneo_id=`"""
+    return exportar("partidos", consulta_partidos())
+
+
+@api.route('/estadisticas/export', methods=['GET'])
+def exportar_estadisticas():
+    """Exporta las estadísticas por jugador y partido, filtradas por la fecha del partido"""
+    return exportar("estadisticas", consulta_estadisticas())
+
+
 
 
 
@@ -708,15 +1047,9 @@ def obtener_partidos():
     
 
 @api.route('/players/<int:jugador_id>/remove-team/<int:equipo_id>', methods=['PUT'])
-@jwt_required()
+@roles_required("admin")
 def remove_team_from_player(jugador_id, equipo_id):
     """Permite al administrador quitar a un jugador de un equipo específico"""
-    current_user_id = get_jwt_identity()
-    admin = Jugador.query.get(current_user_id)
-
-    if not admin or admin.role != "admin":
-        return jsonify({"error": "Acceso denegado"}), 403
-
     jugador = Jugador.query.get(jugador_id)
     equipo = Equipo.query.get(equipo_id)
 
@@ -739,138 +1072,167 @@ def remove_team_from_player(jugador_id, equipo_id):
 
 
 @api.route('/tablas/posiciones/<int:torneo_id>', methods=['GET'])
+@cached_response("tablas:{torneo_id}")
 def obtener_tabla_posiciones(torneo_id):
     try:
         torneo = Torneo.query.get(torneo_id)
         if not torneo:
             return jsonify({"error": "Torneo no encontrado"}), 404
 
-        equipos = Equipo.query.filter_by(torneo_id=torneo_id).all()
-        tabla = []
-
-        for equipo in equipos:
-            partidos_jugados = Partido.query.filter(
-                (Partido.equipo_a_id == equipo.id) | (Partido.equipo_b_id == equipo.id)
-            ).all()
-
-            puntos = 0
-            partidos_ganados = 0
-            partidos_empatados = 0
-            partidos_perdidos = 0
-            goles_favor = 0
-            goles_contra = 0
-            partidos_totales = 0  # 🔥 Contador de partidos jugados
-
-            for partido in partidos_jugados:
-                if partido.estado != "finalizado":
-                    continue  # Solo contar partidos terminados
-
-                partidos_totales += 1  # 🔥 Incrementamos los partidos jugados
-
-                if partido.equipo_a_id == equipo.id:
-                    goles_favor += partido.goles_equipo_a
-                    goles_contra += partido.goles_equipo_b
-                    if partido.goles_equipo_a > partido.goles_equipo_b:
-                        partidos_ganados += 1
-                        puntos += 3
-                    elif partido.goles_equipo_a == partido.goles_equipo_b:
-                        partidos_empatados += 1
-                        puntos += 1
-                    else:
-                        partidos_perdidos += 1
-
-                elif partido.equipo_b_id == equipo.id:
-                    goles_favor += partido.goles_equipo_b
-                    goles_contra += partido.goles_equipo_a
-                    if partido.goles_equipo_b > partido.goles_equipo_a:
-                        partidos_ganados += 1
-                        puntos += 3
-                    elif partido.goles_equipo_b == partido.goles_equipo_a:
-                        partidos_empatados += 1
-                        puntos += 1
-                    else:
-                        partidos_perdidos += 1
-
-            tabla.append({
-                "equipo": equipo.nombre,
-                "puntos": puntos,
-                "partidos_jugados": partidos_totales,  # ✅ Ahora sí enviamos los partidos jugados
-                "ganados": partidos_ganados,
-                "empatados": partidos_empatados,
-                "perdidos": partidos_perdidos,
-                "goles_favor": goles_favor,
-                "goles_contra": goles_contra,
-                "diferencia_goles": goles_favor - goles_contra
-            })
+        # 📊 La tabla se mantiene al registrar cada partido: aquí solo se lee
+        tabla = obtener_posiciones(torneo_id)
 
-        tabla_ordenada = sorted(tabla, key=lambda x: (-x["puntos"], -x["diferencia_goles"]))
-
-        return jsonify(tabla_ordenada), 200
+        return jsonify(tabla), 200
 
     except Exception as e:
         print(f"❌ Error en obtener_tabla_posiciones: {str(e)}")
         return jsonify({"error": "Error en el servidor", "detalle": str(e)}), 500
 
 
+@api.route('/stream/torneos/<int:torneo_id>', methods=['GET'])
+def stream_torneo(torneo_id):
+    """Eventos en vivo del torneo (SSE): partidos, filas de la tabla y totales de jugadores"""
+    torneo = db.session.query(Torneo.id).filter(Torneo.id == torneo_id).first()
+    if not torneo:
+        return jsonify({"error": "Torneo no encontrado"}), 404
+
+    # 📌 Al reconectarse, el navegador envía el último id recibido en Last-Event-ID
+    ultimo = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        ultimo_id = int(ultimo) if ultimo else None
+    except ValueError:
+        ultimo_id = None
+
+    if not event_bus.reservar():
+        # ⚠️ Cada stream ocupa un hilo: por encima del máximo se dejarían sin hilos al resto de rutas
+        return jsonify({"error": "Demasiadas conexiones en vivo, intenta de nuevo en unos segundos"}), 503, {
+            "Retry-After": "10"
+        }
+
+    db.session.close()  # El stream dura minutos: no retener una conexión del pool
+    respuesta = Response(
+        event_bus.stream(torneo_id, ultimo_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    respuesta.call_on_close(event_bus.liberar)  # También si el cliente se va antes del primer evento
+    return respuesta
+
 
+@api.route('/tablas/grupos/<int:torneo_id>', methods=['GET'])
+@cached_response("tablas:{torneo_id}", "equipos")
+def obtener_tablas_por_grupo(torneo_id):
+    """Tabla de cada grupo con desempates: goles a favor, enfrentamientos directos y fair play"""
+    try:
+        torneo = db.session.query(Torneo.id).filter(Torneo.id == torneo_id).first()
+        if not torneo:
+            return jsonify({"error": "Torneo no encontrado"}), 404
 
+        return jsonify(obtener_posiciones_por_grupo(torneo_id)), 200
+
+    except Exception as e:
+        return jsonify({"error": "Error en el servidor", "detalle": str(e)}), 500
+
+
+
+
+
+
+def _top_solicitado():
+    """Cantidad de jugadores a devolver en un ranking (`?top=`, acotada a TOP_MAXIMO); sin `top`, todos."""
+    top = request.args.get("top", type=int)
+    if top is None:
+        return None
+    return max(1, min(top, TOP_MAXIMO))
 
 
 @api.route('/tablas/goleadores/<int:torneo_id>', methods=['GET'])
+@cached_response("tablas:{torneo_id}", "jugadores")
 def obtener_goleadores_por_torneo(torneo_id):
     """Obtener tabla de goleadores de un torneo específico"""
-    jugadores = db.session.query(
-        Jugador.id, Jugador.nickhabbo, db.func.sum(EstadisticaJugador.goles).label("total_goles")
-    ).join(EstadisticaJugador).join(Partido).filter(
-        Partido.torneo_id == torneo_id  # 🔹 Filtrar por torneo
-    ).group_by(Jugador.id).order_by(db.desc("total_goles")).all()
-
-    goleadores = [{"id": j[0], "nickhabbo": j[1], "goles": j[2] or 0} for j in jugadores]  # Evitar valores None
+    goleadores = leaderboards.top("goles", torneo_id, _top_solicitado())
 
     return jsonify(goleadores), 200
 
 
 
 @api.route('/tablas/asistidores/<int:torneo_id>', methods=['GET'])
+@cached_response("tablas:{torneo_id}", "jugadores")
 def obtener_asistidores_por_torneo(torneo_id):
     """Obtener tabla de asistidores de un torneo específico"""
-    jugadores = db.session.query(
-        Jugador.id, Jugador.nickhabbo, db.func.sum(EstadisticaJugador.asistencias).label("total_asistencias")
-    ).join(EstadisticaJugador).join(Partido).filter(
-        Partido.torneo_id == torneo_id  # 🔹 Filtrar por torneo
-    ).group_by(Jugador.id).order_by(db.desc("total_asistencias")).all()
-
-    asistidores = [{"id": j[0], "nickhabbo": j[1], "asistencias": j[2] or 0} for j in jugadores]  # Evitar valores None
+    asistidores = leaderboards.top("asistencias", torneo_id, _top_solicitado())
 
     return jsonify(asistidores), 200
 
 
+def _alcance_solicitado():
+    """Torneo del ranking (`?torneo_id=`) o el ranking global si no se indica."""
+    torneo_id = request.args.get("torneo_id", type=int)
+    return torneo_id if torneo_id is not None else GLOBAL
+
+
 @api.route('/tablas/mvps', methods=['GET'])
+@cached_response("tablas", "jugadores")
 def obtener_mvps():
-    """Obtener jugadores con más MVPs"""
-    jugadores_mvp = db.session.query(
-        Jugador.id, Jugador.nickhabbo, db.func.count(Partido.mvp_id).label("total_mvps")
-    ).join(Partido, Jugador.id == Partido.mvp_id).group_by(Jugador.id).order_by(db.desc("total_mvps")).all()
-
-    mvps = [{"id": j[0], "nickhabbo": j[1], "mvps": j[2]} for j in jugadores_mvp]
+    """Obtener jugadores con más MVPs, globales o de un torneo (`?torneo_id=`)"""
+    mvps = leaderboards.top("mvps", _alcance_solicitado(), _top_solicitado())
 
     return jsonify(mvps), 200
 
 
 @api.route('/tablas/menciones', methods=['GET'])
+@cached_response("tablas", "jugadores")
 def obtener_menciones():
-    """Obtener jugadores con más menciones especiales"""
-    jugadores_mencion = db.session.query(
-        Jugador.id, Jugador.nickhabbo, db.func.count().label("total_menciones")
-    ).filter(
-        (Jugador.id == Partido.mencion_equipo_a_id) | (Jugador.id == Partido.mencion_equipo_b_id)
-    ).group_by(Jugador.id).order_by(db.desc("total_menciones")).all()
-
-    menciones = [{"id": j[0], "nickhabbo": j[1], "menciones": j[2]} for j in jugadores_mencion]
+    """Obtener jugadores con más menciones especiales, globales o de un torneo (`?torneo_id=`)"""
+    menciones = leaderboards.top("menciones", _alcance_solicitado(), _top_solicitado())
 
     return jsonify(menciones), 200
 
 
+@api.route('/tablas/ranking/<string:metrica>/<int:jugador_id>', methods=['GET'])
+def obtener_posicion_ranking(metrica, jugador_id):
+    """Posición de un jugador en un ranking (goles, asistencias, mvps o menciones), global o por `?torneo_id=`"""
+    if metrica not in METRICAS:
+        return jsonify({"error": f"Métrica inválida. Debe ser una de {list(METRICAS)}"}), 400
+
+    torneo_id = request.args.get("torneo_id", type=int)
+    resultado = leaderboards.posicion(metrica, jugador_id, _alcance_solicitado())
+    if resultado is None:
+        return jsonify({"error": "El jugador no figura en este ranking"}), 404
+
+    posicion, valor = resultado
+    return jsonify({
+        "jugador_id": jugador_id,
+        "metrica": metrica,
+        "torneo_id": torneo_id,
+        "posicion": posicion,
+        "valor": valor
+    }), 200
+
+
+@api.route('/jugadores/<int:jugador_id>/estadisticas', methods=['GET'])
+@cached_response("tablas", "jugadores")
+def obtener_estadisticas_de_jugador(jugador_id):
+    """Totales de carrera de un jugador y su detalle por torneo (goles, asistencias, MVPs, menciones...)"""
+    estadisticas = obtener_estadisticas_jugador(jugador_id)
+    if estadisticas is None:
+        return jsonify({"error": "Jugador no encontrado"}), 404
+
+    return jsonify(estadisticas), 200
+
+
+@api.route('/jugadores/<int:jugador_id>/perfil', methods=['GET'])
+@cached_response("jugador:{jugador_id}", "tablas", "equipos")
+def obtener_perfil_de_jugador(jugador_id):
+    """Perfil de un jugador: equipos por modalidad, totales, premios y últimos partidos (`?partidos=`)"""
+    partidos = request.args.get("partidos", PARTIDOS_POR_DEFECTO, type=int)
+    perfil = obtener_perfil(jugador_id, max(0, min(partidos, PARTIDOS_MAXIMO)))
+    if perfil is None:
+        return jsonify({"error": "Jugador no encontrado"}), 404
+
+    return jsonify(perfil), 200
+
+
 @api.route("/jugador/crear_convocatoria", methods=["POST"])
 def crear_convocatoria():
     data = request.get_json()
@@ -895,11 +1257,13 @@ def crear_convocatoria():
 
     db.session.add(nueva_convocatoria)
     db.session.commit()
+    response_cache.invalidate(f"convocatorias:{modalidad}")
 
     return jsonify({"mensaje": "Convocatoria creada con éxito"}), 201
 
 
 @api.route("/convocatorias/<string:modalidad>", methods=["GET"])
+@cached_response("convocatorias:{modalidad}", "jugadores")
 def obtener_convocatorias(modalidad):
     convocatorias = db.session.query(
         Convocatoria.id,
@@ -1033,6 +1397,7 @@ def aceptar_oferta():
         ).delete(synchronize_session=False)
 
         db.session.commit()
+        response_cache.invalidate(f"convocatorias:{modalidad}")
         return jsonify({"message": "Oferta aceptada. El jugador ha sido agregado al equipo y sus convocatorias eliminadas."}), 200
 
     except Exception as e:
@@ -1066,18 +1431,12 @@ def get_equipos_por_dt(dt_id):
 
 
 @api.route("/jugadores/rol", methods=["PUT"])
-@jwt_required()
+@roles_required("superadmin", "admin", mensaje="No tienes permisos para cambiar roles")
 def gestionar_rol():
     """Permite a Superadmin cambiar roles de Admins y a Admins asignar roles a Jugadores, Árbitros y DTs"""
 
     try:
-        jwt_data = get_jwt()  # 🔹 Obtener datos del token
-        user_role = jwt_data.get("role")  
-        usuario_actual_id = get_jwt_identity()
-
-        usuario_actual = Jugador.query.get(usuario_actual_id)
-        if not usuario_actual:
-            return jsonify({"error": "Usuario no encontrado"}), 404
+        user_role = get_principal().role
 
         # 📌 Obtener datos de la petición
         data = request.get_json()
@@ -1100,11 +1459,8 @@ def gestionar_rol():
         if user_role == "superadmin":
             if new_role not in ["admin", "jugador", "dt", "arbitro"]:
                 return jsonify({"error": "Rol inválido"}), 400
-        elif user_role == "admin":
-            if new_role not in ["jugador", "dt", "arbitro"]:
-                return jsonify({"error": "No puedes asignar este rol"}), 403
-        else:
-            return jsonify({"error": "No tienes permisos para cambiar roles"}), 403
+        elif new_role not in ["jugador", "dt", "arbitro"]:
+            return jsonify({"error": "No puedes asignar este rol"}), 403
 
         # 📌 Asignar nuevo rol
         player.role = new_role
@@ -1116,19 +1472,19 @@ def gestionar_rol():
         return jsonify({"error": f"Error en el servidor: {str(e)}"}), 500
 
 
+@api.route('/_metrics', methods=['GET'])
+@roles_required("admin", "superadmin")
+def metricas():
+    """Histogramas de duración y consultas SQL por endpoint, en formato de texto de Prometheus"""
+    return query_metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+
 @api.route('/jugadores/roles', methods=['GET'])
-@jwt_required()
+@roles_required("admin", "superadmin")
 def get_players_roles():
     """Lista todos los jugadores con sus IDs, nicks y roles (Solo Admins y Superadmin)"""
 
     try:
-        user_id = get_jwt_identity()
-        user = Jugador.query.get(user_id)
-
-        # 🔴 Solo Admin o Superadmin pueden acceder
-        if not user or user.role not in ["admin", "superadmin"]:
-            return jsonify({"error": "Acceso denegado"}), 403  
-
         players = Jugador.query.with_entities(Jugador.id, Jugador.nickhabbo, Jugador.role).all()
         players_list = [{"id": p.id, "nickhabbo": p.nickhabbo, "role": p.role} for p in players]
 
@@ -1150,32 +1506,62 @@ def crear_noticia():
         if not titulo or not contenido:
             return jsonify({"error": "Faltan datos"}), 400
 
-        # 📌 Procesar imagen si existe
+        # 📰 Guardar noticia en la base de datos; la imagen se sube en segundo plano
         imagen = request.files.get("imagen")
-        imagen_url = None
-        if imagen:
-            try:
-                result = upload(imagen)  # Sube la imagen a Cloudinary
-                imagen_url = result["secure_url"]
-            except Exception as e:
-                return jsonify({"error": f"Error al subir la imagen: {str(e)}"}), 500
-
-        # 📰 Guardar noticia en la base de datos
-        nueva_noticia = Noticia(titulo=titulo, contenido=contenido, imagen_url=imagen_url)
+        nueva_noticia = Noticia(titulo=titulo, contenido=contenido, imagen_estado=ESTADO_PENDIENTE if imagen else None)
         db.session.add(nueva_noticia)
         db.session.commit()
+        response_cache.invalidate("noticias")
+
+        noticia_id = nueva_noticia.id
+        imagen_estado = nueva_noticia.imagen_estado
+        if imagen:
+            try:
+                upload_pool.submit("noticia", noticia_id, imagen)
+            except PoolLleno:
+                return jsonify({
+                    "error": "El servidor está procesando demasiadas imágenes, intenta subir la imagen más tarde",
+                    "id": noticia_id
+                }), 503
 
-        return jsonify({"message": "Noticia creada exitosamente", "imagen_url": imagen_url}), 201
+        return jsonify({
+            "message": "Noticia creada exitosamente",
+            "id": noticia_id,
+            "imagen_url": None,
+            "imagen_estado": imagen_estado
+        }), 201
 
     except Exception as e:
         return jsonify({"error": f"Error en el servidor: {str(e)}"}), 500
 
 
     
+@api.route('/buscar', methods=['GET'])
+def busqueda():
+    """Busca noticias (texto completo) y jugadores (por nick), ordenados por relevancia y paginados (`limit`, `cursor`, `tipo`)"""
+    q, tipos, limit, desplazamiento = leer_busqueda(request)
+    try:
+        return jsonify(buscar(q, tipos, limit, desplazamiento)), 200
+
+    except Exception as e:
+        return jsonify({"error": "Error en el servidor", "detalle": str(e)}), 500
+
+
 @api.route('/noticias', methods=['GET'])
+@cached_response("noticias")
 def obtener_noticias():
     """Obtener todas las noticias ordenadas por fecha (más recientes primero)"""
-    noticias = Noticia.query.order_by(Noticia.fecha_publicacion.desc()).all()
+    consulta = Noticia.query.order_by(Noticia.fecha_publicacion.desc())
+
+    paginacion = get_pagination_args()
+    if paginacion:
+        limit, cursor = paginacion
+        noticias, next_cursor = paginate_keyset(
+            consulta, [Noticia.fecha_publicacion, Noticia.id],
+            lambda n: (n.fecha_publicacion, n.id), limit, cursor, descending=True
+        )
+    else:
+        noticias = consulta.all()
 
 
     lista_noticias = [
@@ -1184,13 +1570,26 @@ def obtener_noticias():
             "titulo": n.titulo,
             "contenido": n.contenido,
             "imagen_url": n.imagen_url,
+            "imagen_estado": n.imagen_estado,
             "fecha_publicacion": n.fecha_publicacion.strftime("%Y-%m-%d %H:%M:%S")
         }
         for n in noticias
     ]
 
+    if paginacion:
+        return jsonify({"items": lista_noticias, "next_cursor": next_cursor}), 200
     return jsonify(lista_noticias), 200    
 
+@api.route('/noticias/<int:noticia_id>/imagen', methods=['GET'])
+def obtener_estado_imagen_noticia(noticia_id):
+    """Estado de la subida de la imagen de una noticia"""
+    noticia = db.session.query(Noticia.imagen_url, Noticia.imagen_estado).filter(Noticia.id == noticia_id).first()
+    if not noticia:
+        return jsonify({"error": "Noticia no encontrada"}), 404
+
+    return jsonify({"id": noticia_id, "imagen_url": noticia.imagen_url, "imagen_estado": noticia.imagen_estado}), 200
+
+
 @api.route('/noticias/<int:noticia_id>', methods=['PUT'])
 @jwt_required()  
 def editar_noticia(noticia_id):
@@ -1207,6 +1606,7 @@ def editar_noticia(noticia_id):
     noticia.imagen_url = data.get("imagen_url", noticia.imagen_url)
 
     db.session.commit()
+    response_cache.invalidate("noticias")
 
     return jsonify({"message": "Noticia actualizada exitosamente"}), 200
 
@@ -1224,5 +1624,6 @@ def eliminar_noticia(noticia_id):
 
     db.session.delete(noticia)
     db.session.commit()
+    response_cache.invalidate("noticias")
 
     return jsonify({"message": "Noticia eliminada exitosamente"}), 200
@@ -0,0 +1,173 @@
+"""
+Búsqueda de noticias y jugadores (`/buscar?q=`).
+
+- Noticias: búsqueda de texto completo sobre título y contenido, ordenada por
+  relevancia. En PostgreSQL con `to_tsvector('spanish', ...)` y un índice GIN
+  sobre esa misma expresión; en SQLite (desarrollo) con una tabla FTS5 de
+  contenido externo que mantienen unos triggers, ordenada por bm25.
+- Jugadores: coincidencia parcial en `nickhabbo`. En PostgreSQL con un índice
+  de trigramas (`pg_trgm`), que sirve para el ILIKE y tolera errores de tipeo
+  con `%`, ordenado por similitud; en SQLite con LIKE (exacto, prefijo, resto).
+
+Los índices se crean junto con las tablas (`db.create_all()`, solo en el motor
+que los usa) y con la migración para las bases existentes. Las noticias
+devuelven un fragmento del contenido, nunca el texto completo.
+
+Los resultados se paginan por desplazamiento con un cursor opaco (el orden por
+relevancia no tiene una clave estable para keyset). No se cachean: cada
+búsqueda distinta desplazaría entradas útiles de la caché de respuestas.
+"""
+import re
+
+from sqlalchemy import DDL, event, case, column, func, literal_column, or_, table
+
+from api.models import db, Jugador, Noticia
+from api.utils import APIException, get_pagination_args, encode_cursor, decode_cursor
+
+CONFIGURACION = "spanish"
+NOTICIA_FTS = table("noticia_fts", column("rowid"))
+LARGO_FRAGMENTO = 200
+RESULTADOS_POR_DEFECTO = 20
+LARGO_MINIMO = 2
+LARGO_MAXIMO = 100
+TIPOS = ("noticias", "jugadores")
+
+# 🔹 Índices por motor (la expresión de `_documento` debe coincidir con la del índice GIN)
+
+INDICES_POSTGRES = [
+    (Noticia, f"CREATE INDEX IF NOT EXISTS ix_noticia_busqueda ON noticia "
+              f"USING gin (to_tsvector('{CONFIGURACION}', titulo || ' ' || contenido))"),
+    (Jugador, "CREATE EXTENSION IF NOT EXISTS pg_trgm"),
+    (Jugador, "CREATE INDEX IF NOT EXISTS ix_jugadores_nickhabbo_trgm ON jugadores USING gin (nickhabbo gin_trgm_ops)"),
+]
+
+FTS_SQLITE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS noticia_fts USING fts5("
+    "titulo, contenido, content='noticia', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS noticia_fts_insert AFTER INSERT ON noticia BEGIN "
+    "INSERT INTO noticia_fts(rowid, titulo, contenido) VALUES (new.id, new.titulo, new.contenido); END",
+    "CREATE TRIGGER IF NOT EXISTS noticia_fts_delete AFTER DELETE ON noticia BEGIN "
+    "INSERT INTO noticia_fts(noticia_fts, rowid, titulo, contenido) VALUES ('delete', old.id, old.titulo, old.contenido); END",
+    "CREATE TRIGGER IF NOT EXISTS noticia_fts_update AFTER UPDATE OF titulo, contenido ON noticia BEGIN "
+    "INSERT INTO noticia_fts(noticia_fts, rowid, titulo, contenido) VALUES ('delete', old.id, old.titulo, old.contenido); "
+    "INSERT INTO noticia_fts(rowid, titulo, contenido) VALUES (new.id, new.titulo, new.contenido); END",
+]
+
+for modelo, sentencia in INDICES_POSTGRES:
+    event.listen(modelo.__table__, "after_create", DDL(sentencia).execute_if(dialect="postgresql"))
+for sentencia in FTS_SQLITE:
+    event.listen(Noticia.__table__, "after_create", DDL(sentencia).execute_if(dialect="sqlite"))
+
+
+def leer_busqueda(req):
+    """Valida `q`, `tipo`, `limit` y `cursor`; devuelve (q, tipos, limit, desplazamiento)."""
+    q = " ".join((req.args.get("q") or "").split())
+    if len(q) < LARGO_MINIMO:
+        raise APIException(f"El parámetro q debe tener al menos {LARGO_MINIMO} caracteres", 400)
+    q = q[:LARGO_MAXIMO]
+
+    tipo = req.args.get("tipo")
+    if tipo is not None and tipo not in TIPOS:
+        raise APIException(f"tipo debe ser uno de: {', '.join(TIPOS)}", 400)
+
+    limit, cursor = get_pagination_args(req) or (RESULTADOS_POR_DEFECTO, None)
+    desplazamiento = decode_cursor(cursor, [Noticia.id])[0] if cursor else 0
+    if not isinstance(desplazamiento, int) or desplazamiento < 0:
+        raise APIException("Cursor inválido", 400)
+
+    return q, (tipo,) if tipo else TIPOS, limit, desplazamiento
+
+
+def _como_like(q):
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _documento():
+    return func.to_tsvector(
+        literal_column(f"'{CONFIGURACION}'"), Noticia.titulo + literal_column("' '") + Noticia.contenido
+    )
+
+
+def _consulta_fts5(q):
+    """Cada palabra como prefijo entre comillas: la entrada del usuario nunca es sintaxis de FTS5."""
+    palabras = re.findall(r"\w+", q)
+    return " ".join(f'"{palabra}"*' for palabra in palabras)
+
+
+def _noticias(q, limit, desplazamiento):
+    columnas = [
+        Noticia.id, Noticia.titulo, func.substr(Noticia.contenido, 1, LARGO_FRAGMENTO).label("fragmento"),
+        Noticia.imagen_url, Noticia.fecha_publicacion
+    ]
+    if db.engine.dialect.name == "postgresql":
+        consulta_ts = func.websearch_to_tsquery(literal_column(f"'{CONFIGURACION}'"), q)
+        relevancia = func.ts_rank(_documento(), consulta_ts)
+        consulta = db.session.query(*columnas, relevancia.label("relevancia")).filter(
+            _documento().op("@@")(consulta_ts)
+        ).order_by(relevancia.desc(), Noticia.fecha_publicacion.desc(), Noticia.id.desc())
+    else:
+        expresion = _consulta_fts5(q)
+        if not expresion:
+            return [], False
+        fts = literal_column("noticia_fts")
+        # bm25 es menor cuanto más relevante: se invierte el signo para que mayor sea mejor
+        relevancia = -func.bm25(fts)
+        consulta = db.session.query(*columnas, relevancia.label("relevancia")).select_from(NOTICIA_FTS).join(
+            Noticia, Noticia.id == NOTICIA_FTS.c.rowid
+        ).filter(fts.op("MATCH")(expresion)).order_by(
+            relevancia.desc(), Noticia.fecha_publicacion.desc(), Noticia.id.desc()
+        )
+
+    filas = consulta.offset(desplazamiento).limit(limit + 1).all()
+    return [
+        {
+            "id": fila.id,
+            "titulo": fila.titulo,
+            "fragmento": fila.fragmento,
+            "imagen_url": fila.imagen_url,
+            "fecha_publicacion": fila.fecha_publicacion.strftime("%Y-%m-%d %H:%M:%S") if fila.fecha_publicacion else None,
+            "relevancia": float(fila.relevancia)
+        }
+        for fila in filas[:limit]
+    ], len(filas) > limit
+
+
+def _jugadores(q, limit, desplazamiento):
+    contiene = Jugador.nickhabbo.ilike(f"%{_como_like(q)}%", escape="\\")
+    if db.engine.dialect.name == "postgresql":
+        relevancia = func.similarity(Jugador.nickhabbo, q)
+        filtro = or_(contiene, Jugador.nickhabbo.op("%")(q))  # `%`: parecido por trigramas (pg_trgm)
+    else:
+        relevancia = case(
+            (func.lower(Jugador.nickhabbo) == q.lower(), 1.0),
+            (Jugador.nickhabbo.ilike(f"{_como_like(q)}%", escape="\\"), 0.5),
+            else_=0.1
+        )
+        filtro = contiene
+
+    filas = db.session.query(
+        Jugador.id, Jugador.nickhabbo, Jugador.role, relevancia.label("relevancia")
+    ).filter(filtro).order_by(
+        relevancia.desc(), func.length(Jugador.nickhabbo), Jugador.id
+    ).offset(desplazamiento).limit(limit + 1).all()
+
+    return [
+        {"id": fila.id, "nickhabbo": fila.nickhabbo, "role": fila.role, "relevancia": round(float(fila.relevancia), 4)}
+        for fila in filas[:limit]
+    ], len(filas) > limit
+
+
+def buscar(q, tipos=TIPOS, limit=RESULTADOS_POR_DEFECTO, desplazamiento=0):
+    """
+    Resultados de `q` por tipo, del más relevante al menos relevante, con
+    `limit` por tipo a partir de `desplazamiento`. `next_cursor` es None si
+    ningún tipo tiene más resultados.
+    """
+    resultado = {"q": q}
+    hay_mas = False
+    for tipo, funcion in (("noticias", _noticias), ("jugadores", _jugadores)):
+        if tipo in tipos:
+            resultado[tipo], mas = funcion(q, limit, desplazamiento)
+            hay_mas = hay_mas or mas
+    resultado["next_cursor"] = encode_cursor([desplazamiento + limit]) if hay_mas else None
+    return resultado
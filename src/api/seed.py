@@ -0,0 +1,222 @@
+"""
+Generador de datos sintéticos para desarrollo y pruebas de carga (`flask seed`).
+
+Produce una liga coherente: torneos de cada modalidad y formato, equipos con
+su plantel (el primero de cada plantel es el DT), partidos entre equipos del
+mismo torneo con estadísticas que suman los goles del marcador, agentes
+libres con convocatorias y ofertas de los DTs, noticias y asistencias.
+
+Todo sale de un `random.Random(semilla)` y de una fecha base fija, así que la
+misma semilla genera siempre los mismos datos. Las filas se insertan con
+`INSERT` por lotes (un commit por lote) y con ids explícitos a partir del
+máximo actual de cada tabla, por lo que se puede sembrar sobre una base con
+datos. Como las inserciones no pasan por el ORM, al final se reconstruyen la
+tabla de posiciones, las estadísticas acumuladas y los rankings.
+"""
+import itertools
+import random
+import time
+from base64 import b64encode
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from api.models import (db, Torneo, Equipo, Jugador, JugadorEquipo, Partido, EstadisticaJugador,
+                        Asistencia, Convocatoria, Oferta, Noticia)
+from api.passwords import password_hasher
+from api.standings import reconstruir_tabla_posiciones
+from api.player_stats import reconstruir_jugador_stats
+from api.leaderboards import leaderboards
+
+MODALIDADES = ("AIC", "HFA", "HES", "OHB")
+FORMATOS = ("liga", "eliminacion", "grupos_playoffs")
+FECHA_BASE = datetime(2025, 1, 1)
+PASSWORD_POR_DEFECTO = "Habbofutbol-1!"
+
+
+class Insertador:
+    """
+    Acumula filas por tabla y las inserta en lotes, con un commit por lote.
+    Las tablas se vacían en el orden en que recibieron su primera fila (padres
+    antes que hijos), así que ninguna fila queda apuntando a un padre sin insertar.
+    """
+
+    def __init__(self, tamano):
+        self.tamano = tamano
+        self.pendientes = {}
+        self.totales = {}
+
+    def agregar(self, modelo, fila):
+        filas = self.pendientes.setdefault(modelo, [])
+        filas.append(fila)
+        if len(filas) >= self.tamano:
+            self.vaciar()
+
+    def vaciar(self):
+        for modelo, filas in self.pendientes.items():
+            if filas:
+                db.session.execute(modelo.__table__.insert(), filas)
+                self.totales[modelo.__tablename__] = self.totales.get(modelo.__tablename__, 0) + len(filas)
+                self.pendientes[modelo] = []
+        db.session.commit()
+
+
+def _siguiente_id(modelo):
+    return (db.session.query(func.max(modelo.id)).scalar() or 0) + 1
+
+
+def _repartir(total, jugadores, rnd):
+    """Reparte `total` unidades entre los jugadores; devuelve {jugador_id: cantidad}."""
+    reparto = dict.fromkeys(jugadores, 0)
+    for _ in range(total):
+        reparto[rnd.choice(jugadores)] += 1
+    return reparto
+
+
+def _sincronizar_secuencias(modelos):
+    # Con ids explícitos, en PostgreSQL hay que mover las secuencias para los próximos INSERT
+    if db.engine.dialect.name != "postgresql":
+        return
+    for modelo in modelos:
+        tabla = modelo.__tablename__
+        db.session.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), COALESCE(MAX(id), 1)) FROM {tabla}"
+        ))
+    db.session.commit()
+
+
+def generar_liga(torneos=12, equipos_por_torneo=12, jugadores_por_equipo=8, partidos=2000,
+                 agentes_libres=200, asistencias=10000, noticias=50, semilla=1, lote=10000,
+                 password=PASSWORD_POR_DEFECTO, reconstruir=True):
+    """
+    Inserta la liga y devuelve {tabla: filas insertadas}. Los `torneos` recorren
+    todas las combinaciones de modalidad y formato; los `partidos` se reparten
+    entre los torneos.
+    """
+    rnd = random.Random(semilla)
+    insertador = Insertador(lote)
+    sufijo = f"s{semilla}"
+
+    # Un solo hash para todos los usuarios sembrados: hashear cada uno llevaría horas
+    salt = b64encode(rnd.randbytes(32)).decode("utf-8")
+    password_hash = password_hasher.hash(f"{password}{salt}")
+
+    ids = {modelo: _siguiente_id(modelo) for modelo in (Torneo, Equipo, Jugador, Partido, EstadisticaJugador,
+                                                        Asistencia, Convocatoria, Oferta, Noticia)}
+
+    primer_jugador = ids[Jugador]
+
+    def nuevo_id(modelo):
+        ids[modelo] += 1
+        return ids[modelo] - 1
+
+    def nuevo_jugador(role="jugador"):
+        jugador_id = nuevo_id(Jugador)
+        insertador.agregar(Jugador, {
+            "id": jugador_id, "nickhabbo": f"{sufijo}_jugador_{jugador_id}", "name": f"Jugador {jugador_id}",
+            "email": f"{sufijo}_jugador_{jugador_id}@seed.habbofutbol.local", "password": password_hash,
+            "salt": salt, "is_active": True, "is_registered": True, "role": role,
+            "created_at": FECHA_BASE
+        })
+        return jugador_id
+
+    # 🔹 Torneos, equipos y planteles
+    combinaciones = itertools.cycle(itertools.product(MODALIDADES, FORMATOS))
+    torneos_creados = []
+    planteles = {}
+    for _ in range(torneos):
+        modalidad, formato = next(combinaciones)
+        torneo_id = nuevo_id(Torneo)
+        insertador.agregar(Torneo, {
+            "id": torneo_id, "nombre": f"Torneo {modalidad} {formato} {sufijo}-{torneo_id}",
+            "modalidad": modalidad, "formato": formato, "created_at": FECHA_BASE
+        })
+        equipos = []
+        for _ in range(equipos_por_torneo):
+            equipo_id = nuevo_id(Equipo)
+            insertador.agregar(Equipo, {"id": equipo_id, "nombre": f"Equipo {sufijo}-{equipo_id}", "torneo_id": torneo_id})
+            plantel = [nuevo_jugador("dt")] + [nuevo_jugador() for _ in range(jugadores_por_equipo - 1)]
+            for jugador_id in plantel:
+                insertador.agregar(JugadorEquipo, {"jugador_id": jugador_id, "equipo_id": equipo_id, "modalidad": modalidad})
+            planteles[equipo_id] = plantel
+            equipos.append(equipo_id)
+        torneos_creados.append((torneo_id, modalidad, equipos))
+
+    # 🔹 Partidos y estadísticas
+    if torneos_creados and equipos_por_torneo >= 2:
+        for n in range(partidos):
+            torneo_id, _, equipos = torneos_creados[n % len(torneos_creados)]
+            a, b = rnd.sample(equipos, 2)
+            goles_a, goles_b = rnd.randint(0, 5), rnd.randint(0, 5)
+            ganador = planteles[a] if goles_a >= goles_b else planteles[b]
+            partido_id = nuevo_id(Partido)
+            insertador.agregar(Partido, {
+                "id": partido_id, "torneo_id": torneo_id, "equipo_a_id": a, "equipo_b_id": b,
+                "fecha": FECHA_BASE + timedelta(hours=n), "estado": "finalizado", "juez": f"Árbitro {n % 20}",
+                "goles_equipo_a": goles_a, "goles_equipo_b": goles_b, "mvp_id": rnd.choice(ganador),
+                "mencion_equipo_a_id": rnd.choice(planteles[a]), "mencion_equipo_b_id": rnd.choice(planteles[b]),
+                "link_video": None, "observaciones": None
+            })
+            for equipo_id, goles in ((a, goles_a), (b, goles_b)):
+                plantel = planteles[equipo_id]
+                goles_por_jugador = _repartir(goles, plantel, rnd)
+                asistencias_por_jugador = _repartir(rnd.randint(0, goles), plantel, rnd)
+                for jugador_id in plantel:
+                    insertador.agregar(EstadisticaJugador, {
+                        "id": nuevo_id(EstadisticaJugador), "partido_id": partido_id, "jugador_id": jugador_id,
+                        "goles": goles_por_jugador[jugador_id], "asistencias": asistencias_por_jugador[jugador_id],
+                        "autogoles": 0
+                    })
+
+    # 🔹 Mercado: agentes libres con convocatoria y ofertas de los DTs de su modalidad
+    equipos_por_modalidad = {}
+    for _, modalidad, equipos in torneos_creados:
+        equipos_por_modalidad.setdefault(modalidad, []).extend(equipos)
+    modalidades_con_equipos = sorted(equipos_por_modalidad)
+    libres = []
+    for _ in range(agentes_libres if modalidades_con_equipos else 0):
+        modalidad = rnd.choice(modalidades_con_equipos)
+        libres.append((nuevo_jugador(), modalidad))
+    for jugador_id, modalidad in libres:
+        insertador.agregar(Convocatoria, {
+            "id": nuevo_id(Convocatoria), "jugador_id": jugador_id, "modalidad": modalidad,
+            "mensaje": "Busco equipo, disponible todos los días", "created_at": FECHA_BASE
+        })
+        for equipo_id in rnd.sample(equipos_por_modalidad[modalidad], min(2, len(equipos_por_modalidad[modalidad]))):
+            insertador.agregar(Oferta, {
+                "id": nuevo_id(Oferta), "dt_id": planteles[equipo_id][0], "jugador_id": jugador_id,
+                "equipo_id": equipo_id, "created_at": FECHA_BASE
+            })
+
+    # 🔹 Noticias y asistencias
+    for n in range(noticias):
+        insertador.agregar(Noticia, {
+            "id": nuevo_id(Noticia), "titulo": f"Noticia {n + 1}", "contenido": "Contenido de prueba generado por flask seed.",
+            "imagen_url": None, "imagen_estado": None, "fecha_publicacion": FECHA_BASE + timedelta(days=n)
+        })
+    for n in range(asistencias if ids[Jugador] > primer_jugador else 0):
+        jugador_id = rnd.randrange(primer_jugador, ids[Jugador])
+        insertador.agregar(Asistencia, {
+            "id": nuevo_id(Asistencia), "nombre": f"{sufijo}_jugador_{jugador_id}", "ip": f"10.0.{n % 250}.{n % 200 + 1}",
+            "fecha_hora": FECHA_BASE + timedelta(minutes=n)
+        })
+    insertador.vaciar()
+
+    _sincronizar_secuencias([Torneo, Equipo, Jugador, Partido, EstadisticaJugador,
+                             Asistencia, Convocatoria, Oferta, Noticia])
+
+    if reconstruir:
+        reconstruir_tabla_posiciones()
+        reconstruir_jugador_stats()
+        leaderboards.reconstruir()
+
+    return insertador.totales
+
+
+def seed_command(**opciones):
+    """Ejecuta `generar_liga` e imprime un resumen (usado por `flask seed`)."""
+    inicio = time.perf_counter()
+    totales = generar_liga(**opciones)
+    for tabla, filas in sorted(totales.items()):
+        print(f"  {tabla}: {filas}")
+    print(f"✅ Datos generados en {time.perf_counter() - inicio:.1f} s")
@@ -0,0 +1,321 @@
+"""
+Tabla de posiciones persistida.
+
+Cada fila de `TablaPosicion` acumula los resultados de un equipo dentro de un
+torneo. Las filas se actualizan en la misma transacción en la que se inserta,
+modifica o elimina un `Partido` (incluido el panel de Flask-Admin), por lo que
+`/tablas/posiciones/<torneo_id>` solo necesita leerlas. Tras el commit se
+invalidan en la caché de respuestas las tablas de los torneos tocados.
+
+Las tablas por grupo (`/tablas/grupos/<torneo_id>`) se calculan en una sola
+sentencia SQL con funciones de ventana, porque sus desempates (enfrentamientos
+directos, fair play) dependen de qué equipos quedan empatados.
+"""
+from sqlalchemy import case, event, func, inspect, or_, select, union_all
+from sqlalchemy.orm import aliased
+from api.models import db, Partido, Equipo, TablaPosicion
+from api.cache import response_cache
+
+ESTADO_FINALIZADO = "finalizado"
+ESTADO_PROGRAMADO = "programado"  # Fixture generado: no suma hasta que se carga el resultado
+CAMPOS_RESULTADO = ("torneo_id", "equipo_a_id", "equipo_b_id", "goles_equipo_a", "goles_equipo_b", "estado")
+
+
+def _cuenta(estado):
+    """Solo los partidos finalizados suman en la tabla (el estado vacío equivale al valor por defecto)."""
+    return (estado or ESTADO_FINALIZADO) == ESTADO_FINALIZADO
+
+
+def _resultado(goles_favor, goles_contra):
+    """Devuelve (puntos, ganados, empatados, perdidos) desde el punto de vista de un equipo."""
+    if goles_favor > goles_contra:
+        return 3, 1, 0, 0
+    if goles_favor == goles_contra:
+        return 1, 0, 1, 0
+    return 0, 0, 0, 1
+
+
+def _sumar(fila, goles_favor, goles_contra, signo):
+    puntos, ganados, empatados, perdidos = _resultado(goles_favor, goles_contra)
+    fila.puntos = (fila.puntos or 0) + signo * puntos
+    fila.partidos_jugados = (fila.partidos_jugados or 0) + signo
+    fila.ganados = (fila.ganados or 0) + signo * ganados
+    fila.empatados = (fila.empatados or 0) + signo * empatados
+    fila.perdidos = (fila.perdidos or 0) + signo * perdidos
+    fila.goles_favor = (fila.goles_favor or 0) + signo * goles_favor
+    fila.goles_contra = (fila.goles_contra or 0) + signo * goles_contra
+
+
+def _nueva_fila(torneo_id, equipo_id):
+    return TablaPosicion(
+        torneo_id=torneo_id, equipo_id=equipo_id, puntos=0, partidos_jugados=0,
+        ganados=0, empatados=0, perdidos=0, goles_favor=0, goles_contra=0
+    )
+
+
+def aplicar_resultado(session, valores, signo=1, filas=None):
+    """
+    Suma (signo=1) o resta (signo=-1) un resultado en las filas de ambos equipos.
+
+    `valores` es un dict con los campos de `CAMPOS_RESULTADO`. `filas` guarda las
+    filas ya resueltas dentro de un mismo flush, porque las filas pendientes de
+    insertar todavía no están en el identity map de la sesión.
+    """
+    if not _cuenta(valores["estado"]):
+        return
+
+    session.info.setdefault("tablas_cambiadas", set()).add(valores["torneo_id"])
+    filas = {} if filas is None else filas
+    goles_a = valores["goles_equipo_a"] or 0
+    goles_b = valores["goles_equipo_b"] or 0
+    lados = (
+        (valores["equipo_a_id"], goles_a, goles_b),
+        (valores["equipo_b_id"], goles_b, goles_a),
+    )
+
+    for equipo_id, goles_favor, goles_contra in lados:
+        clave = (valores["torneo_id"], equipo_id)
+        fila = filas.get(clave)
+        if fila is None:
+            with session.no_autoflush:
+                fila = session.get(TablaPosicion, clave)
+            if fila is None:
+                if signo < 0:
+                    continue  # Nada que descontar
+                fila = _nueva_fila(*clave)
+                session.add(fila)
+            filas[clave] = fila
+        _sumar(fila, goles_favor, goles_contra, signo)
+
+
+def _valores_actuales(partido):
+    return {campo: getattr(partido, campo) for campo in CAMPOS_RESULTADO}
+
+
+def _valores_anteriores(partido):
+    estado = inspect(partido)
+    valores = {}
+    for campo in CAMPOS_RESULTADO:
+        historial = estado.attrs[campo].history
+        valores[campo] = historial.deleted[0] if historial.deleted else getattr(partido, campo)
+    return valores
+
+
+def _resultado_modificado(partido):
+    estado = inspect(partido)
+    return any(estado.attrs[campo].history.has_changes() for campo in CAMPOS_RESULTADO)
+
+
+@event.listens_for(db.session, "before_flush")
+def actualizar_tabla_posiciones(session, flush_context, instances):
+    """Mantiene `TablaPosicion` al día con los partidos que se van a escribir."""
+    filas = {}
+
+    for obj in list(session.new):
+        if isinstance(obj, Partido):
+            aplicar_resultado(session, _valores_actuales(obj), 1, filas)
+
+    for obj in list(session.dirty):
+        if isinstance(obj, Partido) and _resultado_modificado(obj):
+            aplicar_resultado(session, _valores_anteriores(obj), -1, filas)
+            aplicar_resultado(session, _valores_actuales(obj), 1, filas)
+
+    for obj in list(session.deleted):
+        if isinstance(obj, Partido):
+            aplicar_resultado(session, _valores_anteriores(obj), -1, filas)
+
+
+@event.listens_for(db.session, "after_commit")
+def invalidar_tablas(session):
+    cambiadas = session.info.pop("tablas_cambiadas", None)
+    if cambiadas:
+        response_cache.invalidate("tablas", *[f"tablas:{torneo_id}" for torneo_id in cambiadas])
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def descartar_tablas_cambiadas(session, previous_transaction):
+    session.info.pop("tablas_cambiadas", None)
+
+
+def reconstruir_tabla_posiciones(torneo_id=None):
+    """
+    Borra y recalcula la tabla de posiciones a partir de los partidos guardados.
+    Si se indica `torneo_id` solo se reconstruye ese torneo. Devuelve el número de filas.
+    """
+    borrar = TablaPosicion.query
+    partidos = db.session.query(*[getattr(Partido, campo) for campo in CAMPOS_RESULTADO])
+    if torneo_id is not None:
+        borrar = borrar.filter(TablaPosicion.torneo_id == torneo_id)
+        partidos = partidos.filter(Partido.torneo_id == torneo_id)
+    borrar.delete(synchronize_session=False)
+
+    filas = {}
+    for partido in partidos.yield_per(1000):
+        valores = dict(zip(CAMPOS_RESULTADO, partido))
+        if not _cuenta(valores["estado"]):
+            continue
+        goles_a = valores["goles_equipo_a"] or 0
+        goles_b = valores["goles_equipo_b"] or 0
+        for equipo_id, goles_favor, goles_contra in (
+            (valores["equipo_a_id"], goles_a, goles_b),
+            (valores["equipo_b_id"], goles_b, goles_a),
+        ):
+            clave = (valores["torneo_id"], equipo_id)
+            if clave not in filas:
+                filas[clave] = _nueva_fila(*clave)
+            _sumar(filas[clave], goles_favor, goles_contra, 1)
+
+    db.session.bulk_save_objects(list(filas.values()))
+    db.session.commit()
+    return len(filas)
+
+
+def obtener_posiciones(torneo_id):
+    """
+    Lee la tabla de un torneo en una sola consulta. Los equipos sin partidos
+    aparecen con todos los valores en cero.
+    """
+    puntos = db.func.coalesce(TablaPosicion.puntos, 0)
+    diferencia = db.func.coalesce(TablaPosicion.goles_favor - TablaPosicion.goles_contra, 0)
+
+    filas = db.session.query(Equipo.nombre, TablaPosicion).outerjoin(
+        TablaPosicion,
+        (TablaPosicion.equipo_id == Equipo.id) & (TablaPosicion.torneo_id == torneo_id)
+    ).filter(
+        Equipo.torneo_id == torneo_id
+    ).order_by(
+        puntos.desc(), diferencia.desc(), db.func.coalesce(TablaPosicion.goles_favor, 0).desc(), Equipo.id
+    ).all()
+
+    tabla = []
+    for nombre, fila in filas:
+        fila = fila or _nueva_fila(torneo_id, None)
+        tabla.append({
+            "equipo": nombre,
+            "puntos": fila.puntos,
+            "partidos_jugados": fila.partidos_jugados,
+            "ganados": fila.ganados,
+            "empatados": fila.empatados,
+            "perdidos": fila.perdidos,
+            "goles_favor": fila.goles_favor,
+            "goles_contra": fila.goles_contra,
+            "diferencia_goles": fila.diferencia_goles
+        })
+    return tabla
+
+
+# 🔹 Tablas por grupo con desempates, en una sola sentencia
+
+PUNTOS_POR_ROJA = 3  # Fair play: cada amarilla resta 1 punto y cada roja, 3
+
+
+def _lados_finalizados(torneo_id):
+    """Cada partido finalizado visto desde sus dos equipos (UNION ALL de los lados A y B)."""
+    ramas = []
+    for equipo, rival, favor, contra, amarillas, rojas in (
+        (Partido.equipo_a_id, Partido.equipo_b_id, Partido.goles_equipo_a, Partido.goles_equipo_b,
+         Partido.amarillas_equipo_a, Partido.rojas_equipo_a),
+        (Partido.equipo_b_id, Partido.equipo_a_id, Partido.goles_equipo_b, Partido.goles_equipo_a,
+         Partido.amarillas_equipo_b, Partido.rojas_equipo_b),
+    ):
+        ramas.append(select(
+            equipo.label("equipo_id"), rival.label("rival_id"),
+            func.coalesce(favor, 0).label("favor"), func.coalesce(contra, 0).label("contra"),
+            (func.coalesce(amarillas, 0) + PUNTOS_POR_ROJA * func.coalesce(rojas, 0)).label("tarjetas")
+        ).where(
+            Partido.torneo_id == torneo_id,
+            or_(Partido.estado == ESTADO_FINALIZADO, Partido.estado.is_(None))
+        ))
+    return union_all(*ramas).cte("lados")
+
+
+def _consulta_por_grupo(torneo_id):
+    lados = _lados_finalizados(torneo_id)
+
+    # Solo cuentan los partidos entre equipos del mismo grupo (no los de playoffs)
+    equipo, rival = aliased(Equipo), aliased(Equipo)
+    jugados = select(
+        lados, case((lados.c.favor > lados.c.contra, 3), (lados.c.favor == lados.c.contra, 1), else_=0).label("puntos")
+    ).select_from(lados).join(
+        equipo, equipo.id == lados.c.equipo_id
+    ).join(
+        rival, rival.id == lados.c.rival_id
+    ).where(equipo.grupo.is_not_distinct_from(rival.grupo)).cte("jugados")
+
+    def contar(condicion):
+        return func.coalesce(func.sum(case((condicion, 1), else_=0)), 0)
+
+    totales = select(
+        Equipo.id.label("equipo_id"), Equipo.nombre, Equipo.grupo,
+        func.count(jugados.c.equipo_id).label("partidos_jugados"),
+        contar(jugados.c.favor > jugados.c.contra).label("ganados"),
+        contar(jugados.c.favor == jugados.c.contra).label("empatados"),
+        contar(jugados.c.favor < jugados.c.contra).label("perdidos"),
+        func.coalesce(func.sum(jugados.c.favor), 0).label("goles_favor"),
+        func.coalesce(func.sum(jugados.c.contra), 0).label("goles_contra"),
+        func.coalesce(func.sum(jugados.c.puntos), 0).label("puntos"),
+        (-func.coalesce(func.sum(jugados.c.tarjetas), 0)).label("fair_play")
+    ).select_from(Equipo).outerjoin(
+        jugados, jugados.c.equipo_id == Equipo.id
+    ).where(Equipo.torneo_id == torneo_id).group_by(Equipo.id, Equipo.nombre, Equipo.grupo).cte("totales")
+
+    # Enfrentamientos directos: partidos entre equipos igualados en puntos, diferencia y goles
+    propio, igualado = totales.alias("propio"), totales.alias("igualado")
+    directos = select(
+        jugados.c.equipo_id,
+        func.sum(jugados.c.puntos).label("puntos"),
+        func.sum(jugados.c.favor - jugados.c.contra).label("diferencia")
+    ).select_from(jugados).join(
+        propio, propio.c.equipo_id == jugados.c.equipo_id
+    ).join(
+        igualado, igualado.c.equipo_id == jugados.c.rival_id
+    ).where(
+        propio.c.puntos == igualado.c.puntos,
+        propio.c.goles_favor - propio.c.goles_contra == igualado.c.goles_favor - igualado.c.goles_contra,
+        propio.c.goles_favor == igualado.c.goles_favor
+    ).group_by(jugados.c.equipo_id).cte("directos")
+
+    diferencia = totales.c.goles_favor - totales.c.goles_contra
+    puntos_directos = func.coalesce(directos.c.puntos, 0)
+    diferencia_directa = func.coalesce(directos.c.diferencia, 0)
+    posicion = func.rank().over(
+        partition_by=totales.c.grupo,
+        order_by=(totales.c.puntos.desc(), diferencia.desc(), totales.c.goles_favor.desc(),
+                  puntos_directos.desc(), diferencia_directa.desc(), totales.c.fair_play.desc())
+    ).label("posicion")
+
+    return select(
+        totales, diferencia.label("diferencia_goles"), puntos_directos.label("puntos_directos"), posicion,
+        # Cada partido del grupo aparece una vez por equipo
+        (func.sum(totales.c.partidos_jugados).over(partition_by=totales.c.grupo) / 2).label("partidos_del_grupo")
+    ).select_from(totales).outerjoin(
+        directos, directos.c.equipo_id == totales.c.equipo_id
+    ).order_by(totales.c.grupo, posicion, totales.c.equipo_id)
+
+
+def obtener_posiciones_por_grupo(torneo_id):
+    """
+    Tabla de cada grupo del torneo (un único grupo `None` si sus equipos no
+    tienen grupo). Orden: puntos, diferencia de gol, goles a favor,
+    enfrentamientos directos entre los empatados y fair play; los equipos que
+    siguen igualados comparten posición.
+    """
+    grupos = {}
+    for fila in db.session.execute(_consulta_por_grupo(torneo_id)):
+        grupo = grupos.setdefault(fila.grupo, {"grupo": fila.grupo, "partidos_jugados": int(fila.partidos_del_grupo), "tabla": []})
+        grupo["tabla"].append({
+            "posicion": fila.posicion,
+            "equipo_id": fila.equipo_id,
+            "equipo": fila.nombre,
+            "puntos": int(fila.puntos),
+            "partidos_jugados": fila.partidos_jugados,
+            "ganados": int(fila.ganados),
+            "empatados": int(fila.empatados),
+            "perdidos": int(fila.perdidos),
+            "goles_favor": int(fila.goles_favor),
+            "goles_contra": int(fila.goles_contra),
+            "diferencia_goles": int(fila.diferencia_goles),
+            "puntos_directos": int(fila.puntos_directos),
+            "fair_play": int(fila.fair_play)
+        })
+    return [grupos[clave] for clave in sorted(grupos, key=lambda grupo: (grupo is None, grupo or ""))]
@@ -0,0 +1,135 @@
+"""
+Subida de imágenes en segundo plano.
+
+`crear_equipo` y `crear_noticia` guardan el registro de inmediato con la imagen
+en estado "pendiente" y entregan el archivo a un pool acotado de hilos. Cuando
+la subida termina se completa `logo_url`/`imagen_url` y el estado pasa a
+"listo" (o "error").
+
+El destino de las imágenes es intercambiable: Cloudinary en producción o una
+carpeta local (`UPLOAD_BACKEND=local`), útil en desarrollo y pruebas.
+"""
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import cloudinary.uploader
+
+from api.models import db, Equipo, Noticia
+from api.cache import response_cache
+
+ESTADO_PENDIENTE = "pendiente"
+ESTADO_LISTO = "listo"
+ESTADO_ERROR = "error"
+
+# Modelo, columna de la URL, columna del estado y etiqueta de caché de cada tipo de imagen
+DESTINOS = {
+    "equipo": (Equipo, "logo_url", "logo_estado", "equipos"),
+    "noticia": (Noticia, "imagen_url", "imagen_estado", "noticias"),
+}
+
+
+class PoolLleno(Exception):
+    """No hay lugar en la cola de subidas."""
+
+
+class CloudinaryUploader:
+    def upload(self, contenido, nombre):
+        result = cloudinary.uploader.upload(contenido)
+        return result["secure_url"]
+
+
+class LocalUploader:
+    """Guarda las imágenes en una carpeta y devuelve su URL pública."""
+
+    def __init__(self, directorio, url_base):
+        self.directorio = directorio
+        self.url_base = url_base.rstrip("/")
+
+    def upload(self, contenido, nombre):
+        os.makedirs(self.directorio, exist_ok=True)
+        extension = os.path.splitext(nombre or "")[1].lower()
+        archivo = f"{uuid.uuid4().hex}{extension}"
+        with open(os.path.join(self.directorio, archivo), "wb") as f:
+            f.write(contenido)
+        return f"{self.url_base}/{archivo}"
+
+
+class UploadPool:
+    def __init__(self):
+        self.uploader = CloudinaryUploader()
+        self.app = None
+        self._executor = None
+        self._cupos = None
+
+    def init_app(self, app):
+        app.config.setdefault("UPLOAD_BACKEND", "cloudinary")
+        app.config.setdefault("UPLOAD_LOCAL_DIR", os.path.join(app.root_path, "..", "public", "uploads"))
+        app.config.setdefault("UPLOAD_LOCAL_URL", "/uploads")
+        app.config.setdefault("UPLOAD_WORKERS", 2)
+        app.config.setdefault("UPLOAD_QUEUE_SIZE", 20)
+
+        if app.config["UPLOAD_BACKEND"] == "local":
+            self.uploader = LocalUploader(app.config["UPLOAD_LOCAL_DIR"], app.config["UPLOAD_LOCAL_URL"])
+        else:
+            self.uploader = CloudinaryUploader()
+
+        self.app = app
+        workers = app.config["UPLOAD_WORKERS"]
+        # Con 0 workers la subida se hace dentro de la petición (modo síncrono para pruebas)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload") if workers else None
+        self._cupos = threading.BoundedSemaphore(workers + app.config["UPLOAD_QUEUE_SIZE"])
+
+    def submit(self, tipo, registro_id, archivo):
+        """
+        Encola la subida del `FileStorage` de la petición para el registro indicado.
+        El contenido se lee aquí porque el stream se cierra al terminar la petición.
+        Si la cola está completa marca la imagen con error y lanza PoolLleno.
+        """
+        contenido = archivo.read()
+        nombre = archivo.filename
+
+        if self._executor is None:
+            self._subir(tipo, registro_id, contenido, nombre)
+            return
+
+        if not self._cupos.acquire(blocking=False):
+            self._guardar(tipo, registro_id, None, ESTADO_ERROR)
+            raise PoolLleno()
+        try:
+            self._executor.submit(self._subir_en_contexto, tipo, registro_id, contenido, nombre)
+        except Exception:
+            self._cupos.release()
+            raise
+
+    def _subir_en_contexto(self, tipo, registro_id, contenido, nombre):
+        try:
+            with self.app.app_context():
+                self._subir(tipo, registro_id, contenido, nombre)
+        finally:
+            self._cupos.release()
+
+    def _subir(self, tipo, registro_id, contenido, nombre):
+        try:
+            url, estado = self.uploader.upload(contenido, nombre), ESTADO_LISTO
+        except Exception as e:
+            print(f"⚠️ Error al subir la imagen de {tipo} {registro_id}: {e}")
+            url, estado = None, ESTADO_ERROR
+        self._guardar(tipo, registro_id, url, estado)
+
+    def _guardar(self, tipo, registro_id, url, estado):
+        modelo, columna_url, columna_estado, etiqueta = DESTINOS[tipo]
+        try:
+            modelo.query.filter_by(id=registro_id).update(
+                {columna_url: url, columna_estado: estado}, synchronize_session=False
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ No se pudo guardar la imagen de {tipo} {registro_id}: {e}")
+        finally:
+            response_cache.invalidate(etiqueta)
+
+
+upload_pool = UploadPool()
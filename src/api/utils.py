@@ -1,6 +1,14 @@
 from flask import jsonify, url_for, request
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from datetime import datetime
+from sqlalchemy import and_, or_
+import binascii
+import json
 import re
 
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 200
+
 class APIException(Exception):
     status_code = 400
 
@@ -57,3 +65,67 @@ def get_client_ip(req=None):
         return ip.split(",")[0].strip()
     return req.environ.get("REMOTE_ADDR", "Desconocida")
 
+
+
+def get_pagination_args(req=None):
+    """
+    Lee `limit` y `cursor` de la query string. Devuelve None cuando el cliente no
+    pide paginación, para que los endpoints mantengan la respuesta completa.
+    """
+    req = req or request
+    limit = req.args.get("limit")
+    cursor = req.args.get("cursor")
+    if limit is None and cursor is None:
+        return None
+
+    try:
+        limit = int(limit) if limit is not None else DEFAULT_PAGE_LIMIT
+    except ValueError:
+        raise APIException("El parámetro limit debe ser un número entero", 400)
+    if limit < 1:
+        raise APIException("El parámetro limit debe ser mayor que cero", 400)
+
+    return min(limit, MAX_PAGE_LIMIT), cursor or None
+
+
+def encode_cursor(values):
+    """Convierte los valores de la clave de orden en un cursor opaco."""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, columns):
+    try:
+        raw = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(columns):
+            raise ValueError("Cursor con un número de claves incorrecto")
+        return [
+            datetime.fromisoformat(value) if column.type.python_type is datetime else value
+            for column, value in zip(columns, payload)
+        ]
+    except (ValueError, TypeError, binascii.Error):
+        raise APIException("Cursor inválido", 400)
+
+
+def paginate_keyset(query, columns, key, limit, cursor=None, descending=False):
+    """
+    Pagina `query` por keyset sobre `columns` (la última debe ser única, p. ej. el id).
+
+    `key` extrae de cada fila los valores de esas columnas para construir el
+    siguiente cursor. Devuelve (filas, next_cursor); next_cursor es None en la última página.
+    """
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        condiciones = []
+        for i, column in enumerate(columns):
+            previas = [columns[j] == values[j] for j in range(i)]
+            siguiente = column < values[i] if descending else column > values[i]
+            condiciones.append(and_(*previas, siguiente))
+        query = query.filter(or_(*condiciones))
+
+    orden = [c.desc() if descending else c.asc() for c in columns]
+    rows = query.order_by(None).order_by(*orden).limit(limit + 1).all()
+
+    next_cursor = encode_cursor(key(rows[limit - 1])) if len(rows) > limit else None
+    return rows[:limit], next_cursor
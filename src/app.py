@@ -2,21 +2,32 @@
 This module takes care of starting the API Server, Loading the DB and Adding the endpoints
 """
 import os
+from contextlib import contextmanager
 from flask import Flask, request, jsonify, url_for, send_from_directory
 from flask_migrate import Migrate
 from flask_swagger import swagger
 from api.utils import APIException, generate_sitemap
 from api.models import db, Jugador
 from api.routes import api
+from api.cache import response_cache
+from api.leaderboards import leaderboards
+from api.uploads import upload_pool
+from api.auth import principal_cache
+from api.passwords import password_hasher, METODO_POR_DEFECTO
+from api.attendance import attendance_buffer
+from api.metrics import query_metrics
+from api.replicas import replica_router, opciones_de_pool
+from api.events import event_bus
 from api.admin import setup_admin
 from api.commands import setup_commands
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from dotenv import load_dotenv
-from werkzeug.security import generate_password_hash
 from base64 import b64encode
 from extensions import limiter
 from flask_limiter.errors import RateLimitExceeded
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 
 load_dotenv()
 
@@ -32,6 +43,7 @@ CORS(app, resources={r"/api/*": {"origins": ["https://habbofutbol.com", "https:/
 
 
 
+app.config["RATELIMIT_ENABLED"] = os.getenv("RATELIMIT_ENABLED", "true").lower() == "true"
 limiter.init_app(app)
 
 @app.errorhandler(RateLimitExceeded)
@@ -50,8 +62,38 @@ else:
     app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:////tmp/test.db"
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opciones_de_pool("DATABASE")
+
+# Réplica de lectura opcional para los GET de la API
+app.config['DATABASE_REPLICA_URL'] = os.getenv("DATABASE_REPLICA_URL")
+app.config['DATABASE_REPLICA_ENGINE_OPTIONS'] = opciones_de_pool("DATABASE_REPLICA")
+app.config['DATABASE_REPLICA_STICKY_SECONDS'] = float(os.getenv("DATABASE_REPLICA_STICKY_SECONDS", 5))
+app.config['RESPONSE_CACHE_MAX_ENTRIES'] = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 512))
+app.config['RESPONSE_CACHE_TTL'] = int(os.getenv("RESPONSE_CACHE_TTL", 60))
+app.config['UPLOAD_BACKEND'] = os.getenv("UPLOAD_BACKEND", "cloudinary")
+app.config['UPLOAD_WORKERS'] = int(os.getenv("UPLOAD_WORKERS", 2))
+app.config['UPLOAD_QUEUE_SIZE'] = int(os.getenv("UPLOAD_QUEUE_SIZE", 20))
+app.config['PASSWORD_HASH_METHOD'] = os.getenv("PASSWORD_HASH_METHOD", METODO_POR_DEFECTO)
+app.config['PASSWORD_POOL_WORKERS'] = int(os.getenv("PASSWORD_POOL_WORKERS", 2))
+app.config['PASSWORD_POOL_QUEUE_SIZE'] = int(os.getenv("PASSWORD_POOL_QUEUE_SIZE", 32))
+app.config['ATTENDANCE_FLUSH_INTERVAL'] = float(os.getenv("ATTENDANCE_FLUSH_INTERVAL", 1.0))
+app.config['ATTENDANCE_BATCH_SIZE'] = int(os.getenv("ATTENDANCE_BATCH_SIZE", 100))
+app.config['METRICS_SERVER_TIMING'] = os.getenv("METRICS_SERVER_TIMING", "true").lower() == "true"
+app.config['EVENTS_HISTORY'] = int(os.getenv("EVENTS_HISTORY", 500))
+app.config['EVENTS_KEEPALIVE'] = float(os.getenv("EVENTS_KEEPALIVE", 15))
+app.config['EVENTS_MAX_STREAMS'] = int(os.getenv("EVENTS_MAX_STREAMS", 4))
+app.config['EVENTS_MAX_STREAM_SECONDS'] = float(os.getenv("EVENTS_MAX_STREAM_SECONDS", 300))
 MIGRATE = Migrate(app, db, compare_type=True)
 db.init_app(app)
+response_cache.init_app(app)
+leaderboards.init_app(app)
+upload_pool.init_app(app)
+principal_cache.init_app(app)
+password_hasher.init_app(app)
+attendance_buffer.init_app(app)
+query_metrics.init_app(app)
+replica_router.init_app(app)
+event_bus.init_app(app)
 
 app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY")  # Change this!
 jwt = JWTManager(app)
@@ -136,7 +178,7 @@ def crear_superadmin():
     salt = b64encode(os.urandom(32)).decode("utf-8")
 
     # Hashear la contraseña con el salt concatenado
-    hashed_password = generate_password_hash(f"{password}{salt}")
+    hashed_password = password_hasher.hash(f"{password}{salt}")
 
     print("🆕 Creando superadmin...")
     superadmin = Jugador(
@@ -151,10 +193,38 @@ def crear_superadmin():
     )
 
     db.session.add(superadmin)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Otro worker lo creó a la vez (mismo email)
+        db.session.rollback()
+        print("⚠️ Superadmin ya creado por otro proceso")
+        return
     print("✅ Superadmin creado con éxito")
 
-with app.app_context():
+
+# Clave del advisory lock de Postgres que serializa el arranque entre workers
+LOCK_DE_ARRANQUE = 7142001
+
+
+@contextmanager
+def arranque_exclusivo():
+    """
+    Cada worker de gunicorn importa la app por su cuenta: en Postgres solo uno
+    a la vez crea las tablas y el superadmin, los demás esperan el lock.
+    """
+    if db.engine.dialect.name != "postgresql":
+        yield
+        return
+    with db.engine.connect() as conexion:
+        conexion.execute(text("SELECT pg_advisory_lock(:clave)"), {"clave": LOCK_DE_ARRANQUE})
+        try:
+            yield
+        finally:
+            conexion.execute(text("SELECT pg_advisory_unlock(:clave)"), {"clave": LOCK_DE_ARRANQUE})
+
+
+with app.app_context(), arranque_exclusivo():
     db.create_all()  # Asegura que las tablas existen antes de crear el superadmin
     crear_superadmin()
 
@@ -1,9 +1,12 @@
+import os
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from redis import Redis
 
 
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+
 limiter = Limiter(
     key_func=get_remote_address,
-    storage_uri="redis://localhost:6379"
+    storage_uri=REDIS_URL
 )